@@ -0,0 +1,214 @@
+"""
+Dónde se guarda el carrito. Se elige con settings.CARRITO_ALMACENAMIENTO:
+
+    'sesion'  -> request.session (tabla django_session). Es lo de siempre:
+                 cada cambio en el carrito es un UPDATE de la sesión completa.
+    'cookie'  -> cookie firmada y compacta. No toca la base ni el cache;
+                 el límite es el tamaño de la cookie (~4 KB, unos 150 ítems).
+    'cache'   -> settings.CACHES['default'], con un token aleatorio en cookie.
+                 Necesita un cache compartido entre workers (Redis/Memcached);
+                 con LocMem cada proceso vería un carrito distinto.
+
+Los tres exponen lo mismo: cargar() -> dict del carrito, cantidad() ->
+unidades (o None si no se sabe) y guardar(cart, cantidad). La cookie la
+escribe CarritoMiddleware al final del request.
+
+Migración: con 'cookie' o 'cache', si el visitante todavía tiene un
+carrito en su sesión se copia al almacenamiento nuevo la primera vez y se
+borra de la sesión. Así nadie pierde su carrito al cambiar la configuración.
+"""
+import secrets
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+
+CART_SESSION_ID = 'cart'
+# Cantidad total de unidades, guardada aparte para el badge del navbar
+CART_COUNT_SESSION_ID = 'cart_count'
+
+NOMBRE_COOKIE = 'g59_carrito'
+SALT_COOKIE = 'carrito.almacenamiento'
+# Un carrito olvidado dura 30 días
+DURACION = 60 * 60 * 24 * 30
+
+
+class AlmacenSesion:
+    """El carrito dentro de request.session (comportamiento original)."""
+
+    def __init__(self, request):
+        self.request = request
+        self.session = request.session
+
+    def cargar(self):
+        # No escribimos nada en la sesión acá: un carrito vacío no debe
+        # marcarla como modificada (eso fuerza un UPDATE en cada página).
+        return self.session.get(CART_SESSION_ID) or {}
+
+    def cantidad(self):
+        return self.session.get(CART_COUNT_SESSION_ID)
+
+    def guardar(self, cart, cantidad):
+        self.session[CART_SESSION_ID] = cart
+        self.session[CART_COUNT_SESSION_ID] = cantidad
+        self.session.modified = True
+
+    def escribir_respuesta(self, response):
+        pass
+
+
+class _AlmacenFueraDeSesion:
+    """Base de los almacenamientos que no usan la sesión."""
+
+    def __init__(self, request):
+        self.request = request
+        self.cart = None
+        self._cantidad = None
+        self.modificado = False
+
+    def cargar(self):
+        if self.cart is None:
+            self.cart, self._cantidad = self.leer()
+            if not self.cart:
+                self._migrar_desde_sesion()
+        return self.cart
+
+    def cantidad(self):
+        self.cargar()
+        return self._cantidad
+
+    def guardar(self, cart, cantidad):
+        self.cart = cart
+        self._cantidad = cantidad
+        self.modificado = True
+        self.escribir(cart, cantidad)
+
+    def _migrar_desde_sesion(self):
+        # Solo miramos la sesión si el visitante ya tiene cookie de sesión;
+        # si no, leerla no tiene sentido (y no queremos crear una).
+        if settings.SESSION_COOKIE_NAME not in self.request.COOKIES:
+            return
+        session = self.request.session
+        cart = session.get(CART_SESSION_ID)
+        if CART_SESSION_ID in session:
+            del session[CART_SESSION_ID]
+        session.pop(CART_COUNT_SESSION_ID, None)
+        if cart:
+            self.guardar(cart, sum(item['quantity'] for item in cart.values()))
+
+    def leer(self):
+        raise NotImplementedError
+
+    def escribir(self, cart, cantidad):
+        pass
+
+    def escribir_respuesta(self, response):
+        raise NotImplementedError
+
+
+class AlmacenCookie(_AlmacenFueraDeSesion):
+    """
+    El carrito firmado en una cookie. Formato compacto para que quepa:
+        {"<producto_id>": [cantidad, "precio"], ...}
+    """
+
+    def leer(self):
+        valor = self.request.COOKIES.get(NOMBRE_COOKIE)
+        if not valor:
+            return {}, None
+        try:
+            compacto = signing.loads(valor, salt=SALT_COOKIE, max_age=DURACION)
+        except signing.BadSignature:
+            # Cookie adulterada o firmada con otra SECRET_KEY: carrito vacío
+            return {}, None
+
+        cart = {
+            product_id: {'quantity': cantidad, 'precio': precio}
+            for product_id, (cantidad, precio) in compacto.items()
+        }
+        return cart, sum(item['quantity'] for item in cart.values())
+
+    def escribir_respuesta(self, response):
+        if not self.modificado:
+            return
+        if not self.cart:
+            response.delete_cookie(NOMBRE_COOKIE, samesite='Lax')
+            return
+
+        compacto = {
+            product_id: [item['quantity'], item['precio']]
+            for product_id, item in self.cart.items()
+        }
+        response.set_cookie(
+            NOMBRE_COOKIE,
+            signing.dumps(compacto, salt=SALT_COOKIE, compress=True),
+            max_age=DURACION,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite='Lax',
+        )
+
+
+class AlmacenCache(_AlmacenFueraDeSesion):
+    """El carrito en el cache, bajo un token aleatorio guardado en cookie firmada."""
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.token = request.get_signed_cookie(NOMBRE_COOKIE, default=None, salt=SALT_COOKIE)
+        self.token_nuevo = False
+
+    def clave(self):
+        return f'carrito:{self.token}'
+
+    def leer(self):
+        if not self.token:
+            return {}, None
+        guardado = cache.get(self.clave())
+        if not guardado:
+            return {}, None
+        return guardado['cart'], guardado['cantidad']
+
+    def escribir(self, cart, cantidad):
+        if not self.token:
+            if not cart:
+                return
+            self.token = secrets.token_urlsafe(24)
+            self.token_nuevo = True
+
+        if cart:
+            cache.set(self.clave(), {'cart': cart, 'cantidad': cantidad}, DURACION)
+        else:
+            cache.delete(self.clave())
+
+    def escribir_respuesta(self, response):
+        if self.token_nuevo:
+            response.set_signed_cookie(
+                NOMBRE_COOKIE,
+                self.token,
+                salt=SALT_COOKIE,
+                max_age=DURACION,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+
+
+ALMACENES = {
+    'sesion': AlmacenSesion,
+    'cookie': AlmacenCookie,
+    'cache': AlmacenCache,
+}
+
+
+def obtener_almacen(request):
+    """
+    Devuelve el almacenamiento del carrito para este request. Es uno solo
+    por request: la vista y el context processor comparten el mismo.
+    """
+    almacen = getattr(request, '_carrito_almacen', None)
+    if almacen is None:
+        nombre = getattr(settings, 'CARRITO_ALMACENAMIENTO', 'sesion')
+        almacen = ALMACENES[nombre](request)
+        request._carrito_almacen = almacen
+    return almacen
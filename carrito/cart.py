@@ -2,16 +2,18 @@ from decimal import Decimal
 from django.conf import settings
 from productos.models import Producto
 
-CART_SESSION_ID = 'cart'
+from .almacenamiento import obtener_almacen, CART_SESSION_ID, CART_COUNT_SESSION_ID  # noqa: F401
+
+# Columnas de Producto que usan el carrito, el checkout y sus templates
+CAMPOS_PRODUCTO = ['id', 'nombre', 'precio', 'stock', 'imagen', 'imagen_variantes']
 
 
 class Cart:
     def __init__(self, request):
-        self.session = request.session
-        cart = self.session.get(CART_SESSION_ID)
-        if not cart:
-            cart = self.session[CART_SESSION_ID] = {}
-        self.cart = cart
+        # Sesión, cookie firmada o cache según settings.CARRITO_ALMACENAMIENTO
+        self.almacen = obtener_almacen(request)
+        self.cart = self.almacen.cargar()
+        self._items = None
 
     def add(self, producto, quantity=1, override_quantity=False):
         product_id = str(producto.id)
@@ -29,9 +31,12 @@ class Cart:
         self.save()
 
     def save(self):
-        # Guarda el carrito limpio en la sesión
-        self.session[CART_SESSION_ID] = self.cart
-        self.session.modified = True
+        # Guarda el carrito limpio (y el total de unidades para el badge)
+        self.almacen.guardar(
+            self.cart,
+            sum(item['quantity'] for item in self.cart.values()),
+        )
+        self._items = None
 
     def remove(self, producto):
         product_id = str(producto.id)
@@ -39,31 +44,61 @@ class Cart:
             del self.cart[product_id]
             self.save()
 
-    def __iter__(self):
-        product_ids = self.cart.keys()
-        productos = Producto.objects.filter(id__in=product_ids)
-
-        for producto in productos:
-            item = self.cart[str(producto.id)].copy()  # 👈 COPIA, NO TOCAS LA SESIÓN
-            item['producto'] = producto
-            item['precio'] = Decimal(item['precio'])  # ok
-            item['total'] = item['precio'] * item['quantity']
-            yield item
-
-        
+    @property
+    def items(self):
+        """
+        Líneas del carrito con su producto, resueltas UNA vez por instancia
+        (una sola consulta). Cada línea trae 'producto', 'quantity', 'precio'
+        y 'total' ya calculado. add/remove/clear descartan el resultado.
+        """
+        if self._items is None:
+            productos = Producto.objects.only(*CAMPOS_PRODUCTO).in_bulk(
+                [int(product_id) for product_id in self.cart]
+            )
+
+            items = []
+            # Mismo orden en que se agregaron al carrito
+            for product_id, datos in self.cart.items():
+                producto = productos.get(int(product_id))
+                if producto is None:
+                    # Producto borrado después de agregarlo: no se muestra ni se cobra
+                    continue
+                item = datos.copy()  # copia: no tocamos lo guardado
+                item['producto'] = producto
+                item['precio'] = Decimal(item['precio'])
+                item['total'] = item['precio'] * item['quantity']
+                items.append(item)
+            self._items = items
+
+        return self._items
 
+    def __iter__(self):
+        return iter(self.items)
 
     def __len__(self):
         # Cantidad total de ítems (suma de cantidades)
-        return sum(item['quantity'] for item in self.cart.values())
+        return self.cantidad_items
+
+    @property
+    def cantidad_items(self):
+        cantidad = self.almacen.cantidad()
+        if cantidad is None:
+            # Carritos guardados antes de CART_COUNT_SESSION_ID
+            cantidad = sum(item['quantity'] for item in self.cart.values())
+        return cantidad
+
+    @property
+    def total(self):
+        return sum((item['total'] for item in self.items), Decimal('0'))
 
     def get_total_price(self):
-        return sum(Decimal(item['precio']) * item['quantity'] for item in self.cart.values())
+        return self.total
 
 
     def clear(self):
         # forma 1
-        self.session[CART_SESSION_ID] = {}
-        self.session.modified = True
+        self.cart = {}
+        self._items = None
+        self.almacen.guardar({}, 0)
 
 
@@ -1,7 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
 from .cart import Cart
 
 
 def cart(request):
+    # Perezoso: el Cart (y la lectura de la sesión) solo se arma si el
+    # template realmente usa {{ cart }}.
     return {
-        'cart': Cart(request)
+        'cart': SimpleLazyObject(lambda: Cart(request))
     }
@@ -0,0 +1,87 @@
+import random
+import time
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from carrito.almacenamiento import ALMACENES
+from carrito.cart import Cart
+from carrito.middleware import CarritoMiddleware
+from productos.models import Producto
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuántas modificaciones de carrito por segundo soporta cada "
+        "almacenamiento (sesión, cookie, cache), pasando por los middlewares "
+        "reales de sesión y carrito. Las sesiones creadas se deshacen al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mutaciones', type=int, default=2_000)
+        parser.add_argument('--clientes', type=int, default=50)
+        parser.add_argument(
+            '--almacen', action='append', choices=list(ALMACENES),
+            help='Solo estos almacenamientos (se puede repetir). Por defecto, todos.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                for nombre in options['almacen'] or list(ALMACENES):
+                    with override_settings(CARRITO_ALMACENAMIENTO=nombre):
+                        self.medir(nombre, options['mutaciones'], options['clientes'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def medir(self, nombre, mutaciones, clientes):
+        rnd = random.Random(59)
+        # Productos sin guardar: Cart.add solo necesita id y precio
+        productos = [Producto(id=i, precio=1_000 * i) for i in range(1, 41)]
+        cookies = [{} for _ in range(clientes)]
+
+        def vista(request):
+            cart = Cart(request)
+            producto = rnd.choice(productos)
+            if rnd.random() < 0.2 and str(producto.id) in cart.cart:
+                cart.remove(producto)
+            else:
+                cart.add(producto, quantity=rnd.randint(1, 3))
+            return HttpResponse()
+
+        cadena = SessionMiddleware(CarritoMiddleware(vista))
+        fabrica = RequestFactory()
+
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            for i in range(mutaciones):
+                jar = cookies[i % clientes]
+                request = fabrica.post('/carrito/agregar/')
+                request.COOKIES.update(jar)
+                response = cadena(request)
+                for morsel in response.cookies.values():
+                    if morsel['max-age'] == 0:
+                        jar.pop(morsel.key, None)
+                    else:
+                        jar[morsel.key] = morsel.value
+            segundos = time.perf_counter() - inicio
+
+        tamano_cookie = max(
+            (len(jar.get('g59_carrito', '')) for jar in cookies), default=0
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{nombre:>7}: {mutaciones / segundos:8.0f} mutaciones/s  "
+            f"{len(consultas.captured_queries) / mutaciones:4.1f} consultas SQL por mutación  "
+            f"cookie máx. {tamano_cookie} bytes"
+            + (f"  (sesión en {settings.SESSION_ENGINE})" if nombre == 'sesion' else '')
+        ))
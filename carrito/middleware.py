@@ -0,0 +1,18 @@
+from .almacenamiento import obtener_almacen
+
+
+class CarritoMiddleware:
+    """
+    Escribe en la respuesta la cookie del carrito cuando el almacenamiento
+    no es la sesión (ver carrito/almacenamiento.py). Si el request no tocó
+    el carrito no hace nada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(request, '_carrito_almacen', None) is not None:
+            obtener_almacen(request).escribir_respuesta(response)
+        return response
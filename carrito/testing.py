@@ -0,0 +1,43 @@
+"""
+Ayudas para tests del carrito.
+
+    from carrito.testing import assert_consultas_productos
+
+    def test_detalle_carrito(self):
+        ...
+        with assert_consultas_productos(self, 1):
+            self.client.get(reverse('carrito:detalle'))
+"""
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from productos.models import Producto
+
+
+def consultas_productos(queries):
+    """Filtra las consultas capturadas que leen la tabla de productos."""
+    tabla = Producto._meta.db_table
+    return [
+        q['sql'] for q in queries
+        if q['sql'].lstrip().upper().startswith('SELECT') and tabla in q['sql']
+    ]
+
+
+@contextmanager
+def assert_consultas_productos(test_case, cantidad=1):
+    """
+    Falla si dentro del bloque se hacen más (o menos) de `cantidad`
+    SELECT sobre productos. Sirve para vigilar que el carrito resuelva sus
+    productos una sola vez por request aunque el template lo recorra varias.
+    """
+    with CaptureQueriesContext(connection) as contexto:
+        yield contexto
+
+    encontradas = consultas_productos(contexto.captured_queries)
+    test_case.assertEqual(
+        len(encontradas), cantidad,
+        f'Se esperaban {cantidad} consulta(s) a productos y hubo {len(encontradas)}:\n'
+        + '\n'.join(encontradas)
+    )
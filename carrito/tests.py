@@ -1,3 +1,30 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from productos.models import Categoria, Producto
+from .testing import assert_consultas_productos
+
+
+class DetalleCarritoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre='Accesorios')
+        cls.productos = [
+            Producto.objects.create(
+                nombre=f'Producto {i}', precio=1_000 * (i + 1), stock=5, categoria=categoria,
+            )
+            for i in range(3)
+        ]
+
+    def test_detalle_lee_los_productos_una_sola_vez(self):
+        for producto in self.productos:
+            self.client.post(reverse('carrito:agregar', args=[producto.id]), {'quantity': 2})
+
+        # La tabla, los totales, el badge y el context processor usan el
+        # mismo carrito: una sola consulta a productos en todo el request
+        with assert_consultas_productos(self, 1):
+            respuesta = self.client.get(reverse('carrito:detalle'))
+
+        self.assertEqual(respuesta.status_code, 200)
+        for producto in self.productos:
+            self.assertContains(respuesta, producto.nombre)
@@ -24,12 +24,13 @@ def cart_add(request, producto_id):
     existing_qty = cart.cart.get(str(producto.id), {}).get('quantity', 0)
     desired_total = existing_qty + quantity
 
-    if producto.stock <= 0:
+    # disponible = stock menos lo que otros checkouts tienen reservado
+    if producto.disponible <= 0:
         messages.warning(request, f'“{producto.nombre}” no tiene stock disponible.')
-    elif desired_total > producto.stock:
+    elif desired_total > producto.disponible:
         messages.warning(
             request,
-            f'No puedes agregar más de {producto.stock} unidades de “{producto.nombre}”.'
+            f'No puedes agregar más de {producto.disponible} unidades de “{producto.nombre}”.'
         )
     else:
         cart.add(producto=producto, quantity=quantity)
@@ -62,16 +63,16 @@ def cart_update(request, producto_id):
     if quantity < 1:
         quantity = 1
 
-    if producto.stock <= 0:
+    if producto.disponible <= 0:
         messages.warning(request, f'“{producto.nombre}” no tiene stock disponible.')
         # No actualizamos el carrito si no hay stock
         return redirect('carrito:detalle')
 
-    if quantity > producto.stock:
-        quantity = producto.stock
+    if quantity > producto.disponible:
+        quantity = producto.disponible
         messages.warning(
             request,
-            f'Solo hay {producto.stock} unidades disponibles de “{producto.nombre}”; se ajustó la cantidad.'
+            f'Solo hay {producto.disponible} unidades disponibles de “{producto.nombre}”; se ajustó la cantidad.'
         )
     else:
         messages.success(request, f'Se actualizó la cantidad de “{producto.nombre}”.')
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import CorreoSaliente
+
+
+@admin.register(CorreoSaliente)
+class CorreoSalienteAdmin(admin.ModelAdmin):
+    list_display = ('asunto', 'para', 'estado', 'intentos', 'creado', 'enviado')
+    list_filter = ('estado',)
+    search_fields = ('para', 'asunto')
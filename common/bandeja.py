@@ -0,0 +1,62 @@
+"""
+Bandejas de trabajo en la base de datos (avisos de pago, correos salientes):
+filas con `intentos` y `proximo_intento` que procesa un worker.
+
+`reclamar` toma un lote con SKIP LOCKED y lo "arrienda" (le corre el
+próximo intento) antes de soltar el bloqueo: el trabajo se hace sin
+transacciones abiertas y dos workers nunca toman la misma fila. Si un
+worker muere, la fila vuelve a estar disponible cuando vence el arriendo.
+Cada reclamo suma un intento, así `intentos` identifica el arriendo: con
+`renovar` el worker comprueba que la fila sigue siendo suya antes de un
+paso que no se puede repetir (mandar un correo).
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+# Tiempo que un worker tiene para procesar lo que tomó antes de que otro lo retome
+ARRIENDO = timedelta(minutes=5)
+
+
+def espera(intentos):
+    """Cuánto esperar antes del siguiente intento: 1, 2, 4... minutos, hasta 6 horas."""
+    return timedelta(minutes=min(2 ** max(intentos - 1, 0), 360))
+
+
+def reclamar(pendientes, lote, ahora=None):
+    """
+    Toma hasta `lote` filas del queryset `pendientes` (las que faltan por
+    procesar) cuyo próximo intento ya llegó, les suma un intento y las
+    arrienda a este worker. Devuelve las filas, en orden de id.
+    """
+    ahora = ahora or timezone.now()
+    modelo = pendientes.model
+    with transaction.atomic():
+        ids = list(
+            pendientes
+            .filter(proximo_intento__lte=ahora)
+            .select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+            .order_by('proximo_intento', 'id')
+            .values_list('id', flat=True)[:lote]
+        )
+        modelo.objects.filter(id__in=ids).update(
+            proximo_intento=ahora + ARRIENDO, intentos=F('intentos') + 1,
+        )
+    return list(modelo.objects.filter(id__in=ids).order_by('id'))
+
+
+def renovar(fila, ahora=None):
+    """
+    Extiende el arriendo de `fila` (devuelta por `reclamar`) si sigue siendo
+    de este worker. Devuelve False si el arriendo venció y otro la reclamó.
+    """
+    ahora = ahora or timezone.now()
+    renovada = type(fila).objects.filter(pk=fila.pk, intentos=fila.intentos).update(
+        proximo_intento=ahora + ARRIENDO,
+    )
+    if renovada:
+        fila.proximo_intento = ahora + ARRIENDO
+    return bool(renovada)
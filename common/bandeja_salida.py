@@ -0,0 +1,88 @@
+"""
+Worker de la bandeja de salida de correos (CorreoSaliente).
+
+Toma los correos pendientes en lotes arrendados (ver common/bandeja.py),
+así el envío se hace sin transacciones abiertas. Todo el lote sale por una
+misma conexión del backend de correo. Justo antes de mandar cada correo se
+renueva su arriendo (si un proveedor lento hizo vencer el lote y otro worker
+lo retomó, se salta) y justo después se marca enviado: si el proceso muere,
+a lo más se repite el correo que estaba saliendo. Si el proveedor falla,
+el correo se reintenta más tarde con espera creciente; después de
+MAX_INTENTOS queda 'fallido' con el error a la vista en el admin.
+"""
+from collections import Counter
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from . import bandeja
+from .models import CorreoSaliente
+
+
+TAMANO_LOTE = 100
+MAX_INTENTOS = 10
+
+
+def reclamar(lote=TAMANO_LOTE, ahora=None):
+    """Toma hasta `lote` correos listos para enviar y los arrienda a este worker."""
+    return bandeja.reclamar(CorreoSaliente.objects.filter(estado='pendiente'), lote, ahora)
+
+
+def _mensaje(correo, conexion):
+    mensaje = EmailMultiAlternatives(
+        subject=correo.asunto,
+        body=correo.texto,
+        from_email=correo.remitente,
+        to=[correo.para],
+        connection=conexion,
+    )
+    if correo.html:
+        mensaje.attach_alternative(correo.html, 'text/html')
+    return mensaje
+
+
+def _fallar(correo, error):
+    correo.error = error
+    if correo.intentos >= MAX_INTENTOS:
+        correo.estado = 'fallido'
+    else:
+        correo.proximo_intento = timezone.now() + bandeja.espera(correo.intentos)
+    correo.save(update_fields=['estado', 'proximo_intento', 'error'])
+
+
+def enviar_lote(correos, conexion):
+    """Envía los correos por `conexion` (ya abierta). Devuelve un Counter."""
+    resumen = Counter()
+    for correo in correos:
+        if not bandeja.renovar(correo):
+            # Lo tomó otro worker cuando venció el arriendo
+            resumen['retomado'] += 1
+            continue
+        try:
+            if not conexion.send_messages([_mensaje(correo, conexion)]):
+                raise RuntimeError('El backend no aceptó el mensaje.')
+        except Exception as e:
+            _fallar(correo, f'{type(e).__name__}: {e}')
+            resumen['error'] += 1
+        else:
+            CorreoSaliente.objects.filter(pk=correo.pk).update(
+                estado='enviado', enviado=timezone.now(), error='',
+            )
+            resumen['enviado'] += 1
+    return resumen
+
+
+def enviar_pendientes(lote=TAMANO_LOTE):
+    """Envía correos hasta vaciar los que están listos. Devuelve un Counter."""
+    resumen = Counter()
+    # Una sola conexión (SMTP, cliente HTTP del proveedor...) para todo
+    conexion = get_connection(fail_silently=False)
+    try:
+        conexion.open()
+        while True:
+            correos = reclamar(lote)
+            if not correos:
+                return resumen
+            resumen.update(enviar_lote(correos, conexion))
+    finally:
+        conexion.close()
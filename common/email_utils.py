@@ -1,34 +1,156 @@
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+import os
+
+import django
+from django.apps import apps
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections
+from django.template.loader import get_template, render_to_string
 from django.conf import settings
 
+from .models import CorreoSaliente
 
-def send_email(to_email, subject, template_name, context=None, from_email=None):
-    """
-    Envía un correo HTML usando el backend configurado en Django
-    (en tu caso SendGrid via API).
-    """
-    if context is None:
-        context = {}
 
-    if from_email is None:
-        from_email = settings.DEFAULT_FROM_EMAIL
+# Cuerpo de texto plano (mínimo, por compatibilidad)
+TEXT_BODY = (
+    "Este correo contiene contenido HTML. "
+    "Si no lo ves correctamente, habilita la visualización de HTML."
+)
+# Mensajes por llamada a send_messages en send_mass_email
+CHUNK_SIZE = 500
 
-    # Renderizamos el HTML del correo
-    html_body = render_to_string(template_name, context)
-
-    # Cuerpo de texto plano (mínimo, por compatibilidad)
-    text_body = context.get(
-        "text_body",
-        "Este correo contiene contenido HTML. "
-        "Si no lo ves correctamente, habilita la visualización de HTML."
-    )
 
+def _email(to_email, subject, html_body, text_body, from_email=None, connection=None):
     msg = EmailMultiAlternatives(
         subject=subject,
         body=text_body,
-        from_email=from_email,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
         to=[to_email],
+        connection=connection,
     )
     msg.attach_alternative(html_body, "text/html")
-    msg.send()
+    return msg
+
+
+def _armar_email(to_email, subject, template_name, context=None, from_email=None):
+    if context is None:
+        context = {}
+
+    # Renderizamos el HTML del correo
+    html_body = render_to_string(template_name, context)
+    return _email(to_email, subject, html_body, context.get("text_body", TEXT_BODY), from_email)
+
+
+def send_email(to_email, subject, template_name, context=None, from_email=None):
+    """
+    Envía un correo HTML usando el backend configurado en Django
+    (en tu caso SendGrid via API). Bloquea hasta que el proveedor responde:
+    en las vistas usar queue_email.
+    """
+    _armar_email(to_email, subject, template_name, context, from_email).send()
+
+
+def queue_email(to_email, subject, template_name, context=None, from_email=None):
+    """
+    Igual que send_email, pero deja el correo ya renderizado en la bandeja
+    de salida (un INSERT, sin llamar al proveedor). Si se llama dentro de
+    una transacción, el correo sale solo si esa transacción hace commit.
+    Lo envía `manage.py enviar_correos`.
+    """
+    msg = _armar_email(to_email, subject, template_name, context, from_email)
+    return CorreoSaliente.objects.create(
+        para=to_email,
+        remitente=msg.from_email,
+        asunto=msg.subject,
+        texto=msg.body,
+        html=msg.alternatives[0][0],
+    )
+
+
+# ---------- Envíos masivos ----------
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _init_worker():
+    # Con 'spawn' (macOS, Windows) el proceso hijo parte sin Django configurado
+    if not apps.ready:
+        django.setup()
+
+
+@lru_cache(maxsize=None)
+def _worker_template(template_name):
+    # Una vez por proceso del pool (el pool vive lo que dura un envío)
+    return get_template(template_name)
+
+
+def _render_chunk(template_name, contexts):
+    template = _worker_template(template_name)
+    return [template.render(context) for context in contexts]
+
+
+def _rendered_chunks(template_name, chunks, processes):
+    """(chunk, [html...]) en el mismo orden que `chunks`."""
+    if processes <= 1:
+        template = get_template(template_name)
+        for chunk in chunks:
+            yield chunk, [template.render(context) for _, context in chunk]
+        return
+
+    # Los procesos hijos no deben compartir las conexiones a la base del padre
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        # Solo unos pocos chunks adelantados, para no tener todo en memoria
+        pending = deque()
+        for chunk in chunks:
+            contexts = [context for _, context in chunk]
+            pending.append((chunk, pool.submit(_render_chunk, template_name, contexts)))
+            if len(pending) > processes * 2:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+def send_mass_email(recipients, subject, template_name, from_email=None,
+                    chunk_size=CHUNK_SIZE, processes=None, connection=None):
+    """
+    Envía el mismo correo a muchos destinatarios (avisos de envío,
+    newsletters...). `recipients` es un iterable de (to_email, context).
+
+    La plantilla se carga una sola vez y, con processes > 1 (por defecto uno
+    por CPU), los contextos se renderizan en paralelo en otros procesos: deben
+    poder picklearse. Los mensajes salen en tandas de `chunk_size` por una
+    sola conexión del backend (send_messages). Devuelve cuántos se enviaron.
+
+    Bloquea hasta terminar: para comandos y tareas, no para vistas.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    own_connection = connection is None
+    if own_connection:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+
+    sent = 0
+    try:
+        chunks = _chunks(recipients, chunk_size)
+        for chunk, html_bodies in _rendered_chunks(template_name, chunks, processes):
+            messages = [
+                _email(to_email, subject, html_body,
+                       context.get("text_body", TEXT_BODY), from_email, connection)
+                for (to_email, context), html_body in zip(chunk, html_bodies)
+            ]
+            sent += connection.send_messages(messages) or 0
+    finally:
+        if own_connection:
+            connection.close()
+    return sent
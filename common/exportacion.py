@@ -0,0 +1,20 @@
+"""
+Descargas CSV en streaming: cada fila se escribe y se manda al navegador
+apenas se genera, sin armar el archivo en memoria.
+"""
+import csv
+
+
+class Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def csv_streaming(filas):
+    """Genera las líneas CSV de `filas` (un iterable de listas), de a una."""
+    escritor = csv.writer(Eco())
+    yield '\ufeff'  # BOM para que Excel lea bien los tildes
+    for fila in filas:
+        yield escritor.writerow(fila)
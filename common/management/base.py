@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class ComandoBandeja(BaseCommand):
+    """
+    Worker de una bandeja (ver common/bandeja.py): procesa lo pendiente y
+    termina (cron), o con --continuo vuelve a revisar cada --pausa segundos.
+    Las subclases definen `lote`, `descripcion` y `procesar(lote)`, que
+    devuelve un Counter con lo que se hizo.
+    """
+    lote = 50
+    descripcion = 'fila(s) procesada(s)'
+
+    def procesar(self, lote):
+        raise NotImplementedError
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=self.lote)
+        parser.add_argument('--continuo', action='store_true',
+                            help='No termina: vuelve a revisar la bandeja cada --pausa segundos.')
+        parser.add_argument('--pausa', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            inicio = time.perf_counter()
+            try:
+                resumen = self.procesar(options['lote'])
+            except Exception as e:
+                if not options['continuo']:
+                    raise
+                # Base o proveedor caídos: el proceso sigue y reintenta
+                self.stderr.write(self.style.ERROR(f'{type(e).__name__}: {e}'))
+                time.sleep(options['pausa'])
+                continue
+            segundos = time.perf_counter() - inicio
+
+            if resumen or not options['continuo']:
+                detalle = ', '.join(f'{clave}: {n}' for clave, n in sorted(resumen.items()))
+                self.stdout.write(self.style.SUCCESS(
+                    f"{sum(resumen.values())} {self.descripcion} en {segundos:.2f} s"
+                    + (f" ({detalle})" if detalle else "") + "."
+                ))
+            if not options['continuo']:
+                return
+            time.sleep(options['pausa'])
@@ -0,0 +1,78 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from common.email_utils import send_email, send_mass_email, CHUNK_SIZE
+from common.smtp_falso import SMTPFalso
+
+
+PLANTILLA = 'emails/pedido_confirmacion.html'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuántos correos por segundo salen para muchos destinatarios: "
+        "send_email uno por uno (como antes) contra send_mass_email "
+        "(plantilla cargada una vez, render en un pool de procesos, tandas por "
+        "una sola conexión). Usa un servidor SMTP local que no entrega nada, o "
+        "el backend en memoria (--backend locmem). No manda correos reales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destinatarios', type=int, default=10_000)
+        parser.add_argument('--muestra', type=int, default=200,
+                            help='Destinatarios para el envío uno por uno (es lento).')
+        parser.add_argument('--tanda', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--backend', choices=['smtp', 'locmem'], default='smtp')
+        parser.add_argument('--latencia-conexion', type=float, default=0.05,
+                            help='Segundos extra por conexión SMTP nueva (saludo, TLS).')
+
+    def handle(self, *args, **options):
+        destinatarios = [
+            (f'cliente{i}@ejemplo.cl', {'pedido': {'id': 100_000 + i, 'total': 1_990 + i}})
+            for i in range(options['destinatarios'])
+        ]
+        muestra = destinatarios[:options['muestra']]
+
+        with SMTPFalso(latencia_conexion=options['latencia_conexion']) as falso:
+            if options['backend'] == 'smtp':
+                ajustes = {
+                    'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+                    'EMAIL_HOST': falso.host,
+                    'EMAIL_PORT': falso.port,
+                    'EMAIL_USE_TLS': False,
+                    'EMAIL_HOST_USER': '',
+                    'EMAIL_HOST_PASSWORD': '',
+                }
+            else:
+                ajustes = {'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend'}
+
+            with override_settings(**ajustes):
+                self.medir('uno por uno', len(muestra), falso, lambda: [
+                    send_email(para, 'Confirmación de compra', PLANTILLA, contexto)
+                    for para, contexto in muestra
+                ])
+                procesos = sorted({1, options['procesos']})
+                for n in procesos:
+                    self.medir(f'masivo, {n} proceso(s)', len(destinatarios), falso, lambda: send_mass_email(
+                        destinatarios, 'Confirmación de compra', PLANTILLA,
+                        chunk_size=options['tanda'], processes=n,
+                    ))
+
+    def medir(self, nombre, cantidad, falso, funcion):
+        antes = falso.cuenta.copy()
+        inicio = time.perf_counter()
+        funcion()
+        segundos = time.perf_counter() - inicio
+
+        mensajes = falso.cuenta['mensajes'] - antes['mensajes']
+        if falso.cuenta['conexiones'] and mensajes != cantidad:
+            raise CommandError(f'{nombre}: el servidor recibió {mensajes} de {cantidad} correos.')
+        self.stdout.write(
+            f"{nombre:>22}: {cantidad} correos en {segundos:.2f} s "
+            f"({cantidad / segundos:,.0f} correos/s), "
+            f"{falso.cuenta['conexiones'] - antes['conexiones']} conexión(es) SMTP"
+        )
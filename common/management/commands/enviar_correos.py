@@ -0,0 +1,16 @@
+from common.bandeja_salida import enviar_pendientes, TAMANO_LOTE
+from common.management.base import ComandoBandeja
+
+
+class Command(ComandoBandeja):
+    help = (
+        "Envía los correos de la bandeja de salida (confirmaciones de compra, "
+        "activación de cuentas...) por una sola conexión al proveedor, con "
+        "reintentos si falla. Se puede correr desde cron o dejar corriendo con "
+        "--continuo; varios procesos a la vez no mandan dos veces el mismo correo."
+    )
+    lote = TAMANO_LOTE
+    descripcion = 'correo(s) procesado(s)'
+
+    def procesar(self, lote):
+        return enviar_pendientes(lote=lote)
@@ -0,0 +1,42 @@
+from django.db import models
+from django.utils import timezone
+
+
+class CorreoSaliente(models.Model):
+    """
+    Bandeja de salida de correos: la vista solo inserta la fila (ya
+    renderizada), en la misma transacción que el cambio que la origina, y
+    `manage.py enviar_correos` la despacha después (ver common/bandeja_salida.py).
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('enviado', 'Enviado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    para = models.EmailField()
+    remitente = models.CharField(max_length=254)
+    asunto = models.CharField(max_length=255)
+    texto = models.TextField()
+    html = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    # Estado del envío
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    enviado = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Lo que el worker tiene que tomar: pendientes, por orden de turno
+            models.Index(
+                fields=['proximo_intento'],
+                condition=models.Q(estado='pendiente'),
+                name='correo_pendiente_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.asunto} -> {self.para} ({self.get_estado_display()})'
@@ -0,0 +1,60 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def codificar_cursor(fecha, pk):
+    """
+    Arma el cursor opaco que va en la URL (?cursor=...) a partir de la
+    última fila mostrada: fecha + id.
+    """
+    crudo = f'{fecha.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """
+    Devuelve (fecha, id) o None si el cursor viene vacío o manipulado.
+    """
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        crudo = base64.urlsafe_b64decode(cursor + relleno).decode()
+        fecha_txt, pk_txt = crudo.split('|')
+        return datetime.fromisoformat(fecha_txt), int(pk_txt)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def paginar_keyset(queryset, cursor, por_pagina, campo='creado_en'):
+    """
+    Paginación por cursor (keyset) en orden descendente por (campo, id).
+
+    En vez de OFFSET, filtra "lo que viene después de la última fila vista",
+    así la página N cuesta lo mismo que la página 1 si hay índice sobre
+    (campo, id).
+
+    Retorna (items, siguiente_cursor). siguiente_cursor es None en la última
+    página.
+    """
+    queryset = queryset.order_by(f'-{campo}', '-id')
+
+    posicion = decodificar_cursor(cursor)
+    if posicion:
+        fecha, pk = posicion
+        queryset = queryset.filter(
+            Q(**{f'{campo}__lt': fecha}) |
+            Q(**{campo: fecha, 'id__lt': pk})
+        )
+
+    # Pedimos una fila extra solo para saber si existe otra página
+    items = list(queryset[:por_pagina + 1])
+    siguiente_cursor = None
+    if len(items) > por_pagina:
+        items = items[:por_pagina]
+        ultimo = items[-1]
+        siguiente_cursor = codificar_cursor(getattr(ultimo, campo), ultimo.pk)
+
+    return items, siguiente_cursor
@@ -0,0 +1,80 @@
+"""
+Servidor SMTP local que acepta todo y no entrega nada, para los
+benchmarks de correo (benchmark_correos). Levanta un servidor en 127.0.0.1
+en un puerto libre; basta con apuntar el backend SMTP de Django a él:
+
+    with SMTPFalso() as falso, override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST=falso.host, EMAIL_PORT=falso.port,
+    ):
+        ...
+
+Cuenta conexiones y mensajes recibidos. Puede agregar latencia a cada
+conexión nueva (saludo, TLS) y a cada mensaje, como un proveedor real.
+Nunca se usa fuera de las pruebas.
+"""
+import socketserver
+import threading
+import time
+from collections import Counter
+
+
+class _Manejador(socketserver.StreamRequestHandler):
+    falso = None  # lo asigna SMTPFalso
+    # Respuestas de una línea: sin Nagle, el delayed ACK no suma ~40 ms a cada una
+    disable_nagle_algorithm = True
+
+    def _decir(self, linea):
+        self.wfile.write(linea.encode() + b'\r\n')
+        self.wfile.flush()
+
+    def handle(self):
+        with self.falso.candado:
+            self.falso.cuenta['conexiones'] += 1
+        time.sleep(self.falso.latencia_conexion)
+        self._decir('220 smtp-falso listo')
+
+        while linea := self.rfile.readline():
+            comando = linea.decode('latin-1').strip().upper()
+            if comando.startswith(('EHLO', 'HELO')):
+                self._decir('250-smtp-falso')
+                self._decir('250 8BITMIME')
+            elif comando == 'DATA':
+                self._decir('354 fin con <CRLF>.<CRLF>')
+                while (linea := self.rfile.readline()) not in (b'.\r\n', b''):
+                    pass
+                time.sleep(self.falso.latencia)
+                with self.falso.candado:
+                    self.falso.cuenta['mensajes'] += 1
+                self._decir('250 recibido')
+            elif comando == 'QUIT':
+                self._decir('221 chao')
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP...
+                self._decir('250 OK')
+
+
+class _Servidor(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPFalso:
+    def __init__(self, latencia=0.0, latencia_conexion=0.0):
+        self.latencia = latencia
+        self.latencia_conexion = latencia_conexion
+        self.cuenta = Counter()
+        self.candado = threading.Lock()
+        self._servidor = None
+
+    def __enter__(self):
+        manejador = type('Manejador', (_Manejador,), {'falso': self})
+        self._servidor = _Servidor(('127.0.0.1', 0), manejador)
+        self.host, self.port = self._servidor.server_address
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
@@ -0,0 +1,51 @@
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+
+from . import bandeja
+from .bandeja_salida import enviar_lote, reclamar
+from .models import CorreoSaliente
+
+
+class Caida(BaseException):
+    """El proceso muere a mitad del lote (no la atrapa enviar_lote)."""
+
+
+class BackendQueSeCae(EmailBackend):
+    def send_messages(self, mensajes):
+        if len(mail.outbox) == 2:
+            raise Caida
+        return super().send_messages(mensajes)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class BandejaSalidaTests(TestCase):
+    def setUp(self):
+        CorreoSaliente.objects.bulk_create(
+            CorreoSaliente(para=f'c{i}@prueba.cl', remitente='tienda@prueba.cl',
+                           asunto=f'Correo {i}', texto='Hola')
+            for i in range(4)
+        )
+
+    def test_cada_correo_queda_enviado_apenas_sale(self):
+        correos = reclamar()
+        with self.assertRaises(Caida):
+            enviar_lote(correos, BackendQueSeCae())
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            list(CorreoSaliente.objects.order_by('id').values_list('estado', flat=True)),
+            ['enviado', 'enviado', 'pendiente', 'pendiente'],
+        )
+
+    def test_no_envia_lo_que_otro_worker_retomo(self):
+        correos = reclamar()
+        # El arriendo venció (proveedor lento) y otro worker reclamó el último
+        otro = CorreoSaliente.objects.filter(pk=correos[-1].pk)
+        self.assertEqual(len(bandeja.reclamar(otro, 1, ahora=correos[-1].proximo_intento)), 1)
+
+        resumen = enviar_lote(correos, EmailBackend())
+
+        self.assertEqual(resumen, {'enviado': 3, 'retomado': 1})
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(otro.get().estado, 'pendiente')
@@ -58,6 +58,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'common',
     'productos.apps.ProductosConfig',
     'carrito',
     'pedidos',
@@ -76,6 +77,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'carrito.middleware.CarritoMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -162,6 +164,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Las acciones masivas del panel de productos mandan un checkbox por producto;
+# el máximo de Django (1000 campos) no alcanza para catálogos grandes.
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 20_000
+
 # Después de login, manda al home
 LOGIN_REDIRECT_URL = '/'
 
@@ -173,6 +179,13 @@ LOGOUT_REDIRECT_URL = '/'
 
 MP_PUBLIC_KEY = os.getenv("MP_PUBLIC_KEY")
 MP_ACCESS_TOKEN = os.getenv("MP_ACCESS_TOKEN")
+# Base de la API REST (se cambia solo para apuntar al simulador local)
+MP_API_URL = os.getenv("MP_API_URL", "https://api.mercadopago.com")
+# Webhook de pagos (pagos/webhooks.py): clave secreta para validar la firma
+# x-signature y URL pública que se manda en cada preferencia. Si la URL no
+# está, se usa la configurada en el panel de MercadoPago.
+MP_WEBHOOK_SECRET = os.getenv("MP_WEBHOOK_SECRET")
+MP_WEBHOOK_URL = os.getenv("MP_WEBHOOK_URL")
 
 
 # Comisiones de medios de pago
@@ -199,6 +212,35 @@ STORAGES = {
 
 
 
+# Cache de páginas del catálogo (productos/cache.py).
+# LocMem es por proceso, pero la versión del catálogo vive en la base de datos,
+# así que invalidar funciona igual en todos los workers de gunicorn (cada uno
+# la relee a lo más cada cache.VIGENCIA_VERSION segundos).
+# Para compartir el cache entre workers se puede cambiar a Redis/Memcached.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "g59store",
+    }
+}
+
+# Dónde vive el carrito: "sesion" (django_session), "cookie" (cookie firmada)
+# o "cache" (CACHES["default"], necesita Redis/Memcached con varios workers).
+# Ver carrito/almacenamiento.py; los carritos en sesión se migran solos.
+CARRITO_ALMACENAMIENTO = os.getenv("CARRITO_ALMACENAMIENTO", "sesion")
+
+# Minutos que el checkout aparta el stock de un pedido sin pagar
+# (pedidos/reservas.py; las vencidas las devuelve `manage.py liberar_reservas`)
+RESERVA_STOCK_MINUTOS = 30
+
+# Recalcular el resumen de ventas del día apenas se paga un pedido
+# (panel/ventas.py). Sin esto el dashboard se pone al día con
+# `manage.py actualizar_ventas` desde cron.
+VENTAS_REFRESCO_AL_PAGAR = os.getenv("VENTAS_REFRESCO_AL_PAGAR", "0") == "1"
+
+
+
+
 #  SENDGRID VIA SMTP
 
 # EMAIL_HOST = "smtp.sendgrid.net"
@@ -230,3 +272,16 @@ DATABASES = {
     )
 }
 
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # Con varias escrituras a la vez (confirmaciones de pago, reservas de
+    # stock) SQLite necesita WAL y transacciones IMMEDIATE: así cada
+    # escritura espera su turno en vez de fallar con "database is locked".
+    DATABASES["default"].setdefault("OPTIONS", {}).update({
+        "transaction_mode": "IMMEDIATE",
+        "init_command": "PRAGMA journal_mode=WAL;",
+        "timeout": 20,
+    })
+    # Los tests de concurrencia usan varias conexiones a la vez: la base de
+    # prueba va en un archivo (en memoria cada hilo vería otra base)
+    DATABASES["default"]["TEST"] = {"NAME": BASE_DIR / "test_db.sqlite3"}
+
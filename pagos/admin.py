@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import EventoPago
+
+
+@admin.register(EventoPago)
+class EventoPagoAdmin(admin.ModelAdmin):
+    list_display = ('pago_id', 'pedido', 'estado_pago', 'intentos', 'recibido', 'procesado')
+    list_filter = ('estado_pago',)
+    search_fields = ('pago_id', 'pedido__id')
+    raw_id_fields = ('pedido',)
@@ -0,0 +1,133 @@
+"""
+Conciliación de pedidos que quedaron con el pago pendiente (el comprador
+cerró la pestaña, el aviso de MercadoPago nunca llegó...).
+
+    1. Toma los pedidos de MercadoPago con estado_pago 'pendiente' que no
+       se mueven hace más de `minutos` (índice estado_pago + actualizado).
+    2. Busca en la API los pagos creados desde el pedido más antiguo (y a
+       lo más `dias` atrás), en páginas: la primera dice cuántas hay y el
+       resto se piden en paralelo con un máximo de `hilos` llamadas a la
+       vez. De cada página se guardan solo los pagos de esos pedidos.
+    3. Agrupa los pagos por external_reference (el id del pedido) y aplica
+       en bloque:
+           algún pago approved      -> va a la bandeja de avisos y lo
+                                       confirma procesar_pendientes, igual
+                                       que un webhook (monto, stock, correo);
+                                       si ya se procesó aprobado (monto menor
+                                       al total) no se vuelve a encolar
+           todos rejected/cancelled -> estado_pago 'rechazado' en un solo
+                                       UPDATE y se libera su stock
+           pending o sin pagos      -> no se toca
+"""
+import itertools
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from pedidos.models import Pedido
+from pedidos.reservas import liberar_pedidos
+from .mercadopago_api import buscar_pagos
+from .models import EventoPago
+from .webhooks import ESTADOS_RECHAZO, es_id, procesar_pendientes
+
+
+POR_PAGINA = 100
+HILOS = 4
+
+
+def pedidos_pendientes(minutos=30, dias=3, ahora=None):
+    ahora = ahora or timezone.now()
+    return Pedido.objects.filter(
+        estado_pago='pendiente',
+        actualizado__gte=ahora - timedelta(days=dias),
+        actualizado__lt=ahora - timedelta(minutes=minutos),
+        metodo_pago='mercadopago',
+        pagado=False,
+    ).order_by()
+
+
+def pagos_por_pedido(ids, desde, hasta, hilos=HILOS, por_pagina=POR_PAGINA):
+    """
+    {pedido_id: [pagos]} para los pedidos de `ids`, recorriendo todas las
+    páginas de la búsqueda. Devuelve también cuántas páginas se pidieron.
+    """
+    primera = buscar_pagos(desde, hasta, 0, por_pagina)
+    total = primera.get('paging', {}).get('total', 0)
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resto = pool.map(
+            lambda offset: buscar_pagos(desde, hasta, offset, por_pagina),
+            range(por_pagina, total, por_pagina),
+        )
+        paginas = itertools.chain([primera], resto)
+
+        pagos = defaultdict(list)
+        # Las páginas se recorren a medida que llegan, sin juntarlas todas
+        for pagina in paginas:
+            for pago in pagina.get('results', []):
+                referencia = str(pago.get('external_reference') or '')
+                if es_id(referencia) and int(referencia) in ids:
+                    pagos[int(referencia)].append(pago)
+    return pagos, 1 + len(range(por_pagina, total, por_pagina))
+
+
+def conciliar(minutos=30, dias=3, hilos=HILOS, por_pagina=POR_PAGINA, procesar=True):
+    """Concilia los pedidos pendientes. Devuelve un Counter con el resumen."""
+    ahora = timezone.now()
+    pendientes = dict(pedidos_pendientes(minutos, dias, ahora).values_list('id', 'creado'))
+    resumen = Counter(pedidos=len(pendientes))
+    if not pendientes:
+        return resumen
+
+    # Un pedido puede ser de hace meses aunque se haya movido hace poco: la
+    # búsqueda no va más atrás que el plazo de los pedidos que se revisan
+    desde = max(min(pendientes.values()), ahora - timedelta(days=dias))
+    pagos, resumen['paginas'] = pagos_por_pedido(set(pendientes), desde, ahora, hilos, por_pagina)
+    resumen['pagos'] = sum(len(lista) for lista in pagos.values())
+
+    aprobados, rechazados = {}, []
+    for pedido_id, lista in pagos.items():
+        aprobado = next((p for p in lista if p.get('status') == 'approved'), None)
+        if aprobado:
+            aprobados[pedido_id] = str(aprobado['id'])
+        elif all(p.get('status') in ESTADOS_RECHAZO for p in lista):
+            rechazados.append(pedido_id)
+    resumen['sin_resolver'] = len(pendientes) - len(aprobados) - len(rechazados)
+
+    if rechazados:
+        with transaction.atomic():
+            # Solo los que siguen pendientes: un webhook pudo llegar mientras tanto
+            ids = list(
+                Pedido.objects
+                .filter(pk__in=rechazados, estado_pago='pendiente', pagado=False)
+                .select_for_update()
+                .values_list('id', flat=True)
+            )
+            Pedido.objects.filter(pk__in=ids).update(estado_pago='rechazado', actualizado=ahora)
+            liberar_pedidos(ids)
+        resumen['rechazados'] = len(ids)
+
+    if aprobados:
+        # Mismo camino que un webhook; si el aviso ya estaba (y se dio por
+        # perdido), se vuelve a poner en la cola. Uno que ya se procesó como
+        # approved y el pedido sigue pendiente no pasó el control de monto:
+        # reencolarlo lo volvería a rechazar en cada pasada
+        EventoPago.objects.bulk_create(
+            [
+                EventoPago(pago_id=pago_id, tipo='payment', datos={'origen': 'conciliacion'})
+                for pago_id in aprobados.values()
+            ],
+            ignore_conflicts=True,
+        )
+        (
+            EventoPago.objects
+            .filter(pago_id__in=aprobados.values())
+            .exclude(procesado__isnull=False, estado_pago='approved')
+            .update(procesado=None, proximo_intento=ahora, intentos=0)
+        )
+        resumen['aprobados'] = len(aprobados)
+        if procesar:
+            resumen['confirmados'] = procesar_pendientes()['confirmado']
+    return resumen
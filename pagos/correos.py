@@ -0,0 +1,27 @@
+from common.email_utils import queue_email
+
+
+def encolar_correo_confirmacion_pedido(pedido):
+    """
+    Deja en la bandeja de salida el correo de confirmación de pedido
+    (queue_email). Intenta usar el email del cliente asociado al pedido.
+    """
+    # buscamos un correo razonable
+    to_email = None
+
+    cliente = getattr(pedido, "cliente", None)
+    if cliente and getattr(cliente, "email", None):
+        to_email = cliente.email
+    elif getattr(pedido, "email", None):
+        to_email = pedido.email
+
+    if not to_email:
+        # si no hay correo, no encolamos nada
+        return
+
+    queue_email(
+        to_email=to_email,
+        subject=f"Confirmación de compra #{pedido.id}",
+        template_name="emails/pedido_confirmacion.html",
+        context={"pedido": pedido},
+    )
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pagos.conciliacion import conciliar, HILOS, POR_PAGINA
+
+
+class Command(BaseCommand):
+    help = (
+        "Concilia con MercadoPago los pedidos que siguen con el pago pendiente "
+        "hace más de --minutos (aviso perdido, comprador que no volvió a la "
+        "tienda): busca sus pagos en la API y confirma o rechaza los que ya se "
+        "resolvieron. Pensado para cron, p. ej. cada 15 minutos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutos', type=int, default=30,
+                            help='Solo pedidos sin movimiento hace al menos estos minutos.')
+        parser.add_argument('--dias', type=int, default=3,
+                            help='Ni pedidos sin movimiento hace más de estos días.')
+        parser.add_argument('--hilos', type=int, default=HILOS,
+                            help='Páginas de la búsqueda que se piden a la vez.')
+        parser.add_argument('--por-pagina', type=int, default=POR_PAGINA)
+        parser.add_argument('--sin-procesar', action='store_true',
+                            help='Deja los pagos aprobados en la bandeja para procesar_pagos.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resumen = conciliar(
+            minutos=options['minutos'],
+            dias=options['dias'],
+            hilos=options['hilos'],
+            por_pagina=options['por_pagina'],
+            procesar=not options['sin_procesar'],
+        )
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['pedidos']} pedido(s) pendiente(s) revisado(s) en {segundos:.2f} s "
+            f"({resumen['pedidos'] / segundos:.0f} pedidos/s, {resumen['paginas']} página(s) "
+            f"de la API, {resumen['pagos']} pago(s) encontrado(s)): "
+            f"{resumen['aprobados']} aprobado(s), {resumen['confirmados']} confirmado(s), "
+            f"{resumen['rechazados']} rechazado(s), {resumen['sin_resolver']} sin resolver."
+        ))
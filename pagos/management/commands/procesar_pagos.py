@@ -0,0 +1,16 @@
+from common.management.base import ComandoBandeja
+from pagos.webhooks import procesar_pendientes, TAMANO_LOTE
+
+
+class Command(ComandoBandeja):
+    help = (
+        "Procesa los avisos de pago de MercadoPago guardados por el webhook: "
+        "consulta cada pago en la API y confirma o rechaza su pedido. Se puede "
+        "correr desde cron o dejar corriendo con --continuo; varios procesos a "
+        "la vez no se pisan."
+    )
+    lote = TAMANO_LOTE
+    descripcion = 'aviso(s) de pago procesado(s)'
+
+    def procesar(self, lote):
+        return procesar_pendientes(lote=lote)
@@ -0,0 +1,123 @@
+"""
+Cliente HTTP de la API REST de MercadoPago.
+
+Uno por proceso (se crea la primera vez que se usa, ya dentro del worker
+de gunicorn): una requests.Session con keep-alive y un pool de conexiones,
+así cada llamada reutiliza la conexión TLS abierta en vez de abrir otra.
+Cada llamada tiene timeouts estrictos de conexión y lectura y un par de
+reintentos cortos ante errores de conexión o 429/5xx, para que un MercadoPago
+lento no deje un worker colgado.
+
+La URL de la API sale de MP_API_URL (el SDK oficial la tiene fija), así los
+tests pueden apuntar al simulador local (pagos/mp_falso.py).
+"""
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+
+# (conexión, lectura) en segundos
+TIMEOUT = (2, 5)
+REINTENTOS = 2
+CONEXIONES = 10
+
+_sesion = None
+_candado = threading.Lock()
+
+
+class ErrorMercadoPago(Exception):
+    """Error HTTP de la API, o `status` None si no hubo respuesta (timeout, red)."""
+
+    def __init__(self, status, detalle=''):
+        self.status = status
+        self.detalle = detalle
+        if status is None:
+            super().__init__(f'Sin respuesta de MercadoPago: {detalle}')
+        else:
+            super().__init__(f'MercadoPago respondió {status}: {detalle}')
+
+
+def sesion():
+    """La requests.Session del proceso, con pool y reintentos."""
+    global _sesion
+    if _sesion is None:
+        with _candado:
+            if _sesion is None:
+                nueva = requests.Session()
+                adaptador = HTTPAdapter(
+                    pool_connections=CONEXIONES,
+                    pool_maxsize=CONEXIONES,
+                    max_retries=Retry(
+                        total=REINTENTOS,
+                        # Un timeout de lectura ya costó TIMEOUT[1]: no se repite
+                        read=0,
+                        backoff_factor=0.2,
+                        status_forcelist=[429, 500, 502, 503, 504],
+                        # POST también: las preferencias van con X-Idempotency-Key
+                        allowed_methods=['GET', 'POST'],
+                        raise_on_status=False,
+                    ),
+                )
+                nueva.mount('https://', adaptador)
+                nueva.mount('http://', adaptador)
+                _sesion = nueva
+    return _sesion
+
+
+def _url(ruta):
+    return settings.MP_API_URL.rstrip('/') + ruta
+
+
+def _cabeceras(extra=None):
+    cabeceras = {'Authorization': f'Bearer {settings.MP_ACCESS_TOKEN}'}
+    cabeceras.update(extra or {})
+    return cabeceras
+
+
+def _llamar(metodo, ruta, esperados=(200,), **kwargs):
+    try:
+        respuesta = sesion().request(metodo, _url(ruta), timeout=TIMEOUT, **kwargs)
+    except requests.RequestException as e:
+        raise ErrorMercadoPago(None, f'{type(e).__name__}: {e}') from e
+    if respuesta.status_code not in esperados:
+        raise ErrorMercadoPago(respuesta.status_code, respuesta.text[:500])
+    try:
+        return respuesta.json()
+    except ValueError as e:
+        # Un 200 que no es JSON: página de error de un proxy, cuerpo cortado...
+        raise ErrorMercadoPago(respuesta.status_code, f'respuesta que no es JSON: {respuesta.text[:500]}') from e
+
+
+def obtener_pago(pago_id):
+    """El pago tal como lo tiene MercadoPago (status, external_reference, monto...)."""
+    return _llamar('GET', f'/v1/payments/{pago_id}', headers=_cabeceras())
+
+
+def buscar_pagos(desde, hasta, offset=0, limite=100):
+    """
+    Una página de /v1/payments/search con los pagos creados entre `desde` y
+    `hasta`, del más antiguo al más nuevo. Trae 'results' y 'paging' (total).
+    """
+    return _llamar('GET', '/v1/payments/search', headers=_cabeceras(), params={
+        'sort': 'date_created',
+        'criteria': 'asc',
+        'range': 'date_created',
+        'begin_date': desde.isoformat(timespec='milliseconds'),
+        'end_date': hasta.isoformat(timespec='milliseconds'),
+        'offset': offset,
+        'limit': limite,
+    })
+
+
+def crear_preferencia(datos, clave_idempotencia):
+    """
+    Crea una preferencia de Checkout Pro. Con la misma `clave_idempotencia`
+    MercadoPago no crea otra aunque la llamada se reintente.
+    """
+    return _llamar(
+        'POST', '/checkout/preferences', esperados=(200, 201),
+        json=datos, headers=_cabeceras({'X-Idempotency-Key': clave_idempotencia}),
+    )
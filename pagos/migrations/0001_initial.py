@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('pedidos', '0011_secuenciafolio_documento_folio_unico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoPago',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pago_id', models.CharField(max_length=64, unique=True)),
+                ('tipo', models.CharField(blank=True, max_length=30)),
+                ('datos', models.JSONField(blank=True, default=dict)),
+                ('recibido', models.DateTimeField(auto_now_add=True)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('procesado', models.DateTimeField(blank=True, null=True)),
+                ('estado_pago', models.CharField(blank=True, max_length=30)),
+                ('error', models.TextField(blank=True)),
+                ('pedido', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos_pago', to='pedidos.pedido')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('procesado__isnull', True)), fields=['proximo_intento'], name='evento_pago_pendiente_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagos', '0001_initial'),
+        ('pedidos', '0011_secuenciafolio_documento_folio_unico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreferenciaPago',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('preferencia_id', models.CharField(blank=True, max_length=100)),
+                ('url', models.URLField(max_length=500)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='preferencias_pago', to='pedidos.pedido')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('pedido', 'total'), name='preferencia_pedido_total_unica')],
+            },
+        ),
+    ]
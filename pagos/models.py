@@ -1,3 +1,69 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from pedidos.models import Pedido
+
+
+class EventoPago(models.Model):
+    """
+    Bandeja de entrada de los avisos de pago de MercadoPago: una fila por
+    pago, escrita tal cual llega al webhook. La procesa en lotes
+    `manage.py procesar_pagos` (ver pagos/webhooks.py).
+    """
+    pago_id = models.CharField(max_length=64, unique=True)
+    tipo = models.CharField(max_length=30, blank=True)
+    datos = models.JSONField(default=dict, blank=True)
+    recibido = models.DateTimeField(auto_now_add=True)
+
+    # Estado del procesamiento
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    procesado = models.DateTimeField(null=True, blank=True)
+    # Último `status` del pago según la API (approved, pending, rejected...)
+    estado_pago = models.CharField(max_length=30, blank=True)
+    pedido = models.ForeignKey(
+        Pedido,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='eventos_pago',
+    )
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Lo que el worker tiene que tomar: pendientes, por orden de turno
+            models.Index(
+                fields=['proximo_intento'],
+                condition=models.Q(procesado__isnull=True),
+                name='evento_pago_pendiente_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Pago MP {self.pago_id} ({self.estado_pago or "sin consultar"})'
+
+
+class PreferenciaPago(models.Model):
+    """
+    Preferencia de Checkout Pro ya creada para un pedido con un total dado.
+    Recargar la página de pago o hacer doble clic reutiliza esta en vez de
+    crear otra en MercadoPago (ver pagos/preferencias.py).
+    """
+    pedido = models.ForeignKey(
+        Pedido,
+        on_delete=models.CASCADE,
+        related_name='preferencias_pago',
+    )
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    preferencia_id = models.CharField(max_length=100, blank=True)
+    url = models.URLField(max_length=500)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pedido', 'total'], name='preferencia_pedido_total_unica'),
+        ]
+
+    def __str__(self):
+        return f'Preferencia {self.preferencia_id} (pedido {self.pedido_id}, {self.total})'
@@ -0,0 +1,151 @@
+"""
+Simulador local de la API de MercadoPago, para los tests de pagos.
+Levanta un servidor HTTP en 127.0.0.1 en un puerto libre; basta con
+apuntar MP_API_URL a `falso.url`:
+
+    with MercadoPagoFalso() as falso, override_settings(MP_API_URL=falso.url):
+        falso.agregar_pago('123', 'approved', pedido_id=7, monto=1990)
+        ...
+
+Responde lo mismo que la API real en los campos que usa la tienda. Puede
+agregar latencia a cada respuesta, a cada conexión nueva (lo que cuesta el
+handshake TLS contra la API real), dejar colgada de vez en cuando alguna
+respuesta o contestar con una página HTML, como un proxy caído. Nunca se
+usa fuera de las pruebas.
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from django.utils import timezone
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    falso = None  # lo asigna MercadoPagoFalso
+    # keep-alive: la conexión queda abierta entre requests. Cabeceras y
+    # cuerpo salen en un solo paquete (si no, el delayed ACK suma ~40 ms)
+    protocol_version = 'HTTP/1.1'
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.falso.consultas['conexiones'] += 1
+        if self.falso.latencia_conexion:
+            time.sleep(self.falso.latencia_conexion)
+
+    def _esperar(self):
+        with self.falso.candado:
+            self.falso.llamadas += 1
+            colgar = self.falso.colgar_cada and self.falso.llamadas % self.falso.colgar_cada == 0
+        time.sleep(self.falso.colgada if colgar else self.falso.latencia)
+
+    def _responder(self, status, cuerpo):
+        tipo = 'application/json'
+        contenido = json.dumps(cuerpo).encode()
+        if self.falso.html:
+            status, tipo = 200, 'text/html'
+            contenido = b'<html><body>502 Bad Gateway</body></html>'
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def do_GET(self):
+        self.falso.consultas['GET'] += 1
+        self._esperar()
+
+        url = urlsplit(self.path)
+        if url.path == '/v1/payments/search':
+            return self._responder(200, self._buscar(parse_qs(url.query)))
+        encontrado = re.fullmatch(r'/v1/payments/(\w+)', url.path)
+        if encontrado and encontrado.group(1) in self.falso.pagos:
+            return self._responder(200, self.falso.pagos[encontrado.group(1)])
+        return self._responder(404, {'message': 'not_found', 'status': 404})
+
+    def _buscar(self, params):
+        desde = datetime.fromisoformat(params['begin_date'][0])
+        hasta = datetime.fromisoformat(params['end_date'][0])
+        offset = int(params.get('offset', ['0'])[0])
+        limite = int(params.get('limit', ['30'])[0])
+        pagos = sorted(
+            (p for p in list(self.falso.pagos.values())
+             if desde <= datetime.fromisoformat(p['date_created']) <= hasta),
+            key=lambda p: (p['date_created'], p['id']),
+        )
+        return {
+            'paging': {'total': len(pagos), 'offset': offset, 'limit': limite},
+            'results': pagos[offset:offset + limite],
+        }
+
+    def do_POST(self):
+        self.falso.consultas['POST'] += 1
+        datos = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        self._esperar()
+
+        if self.path != '/checkout/preferences':
+            return self._responder(404, {'message': 'not_found', 'status': 404})
+        clave = self.headers.get('X-Idempotency-Key') or str(len(self.falso.preferencias))
+        with self.falso.candado:
+            # Misma clave de idempotencia, misma preferencia
+            preferencia = self.falso.preferencias.setdefault(clave, {
+                'id': f'pref-{len(self.falso.preferencias) + 1}',
+                'external_reference': datos.get('external_reference', ''),
+            })
+        preferencia['init_point'] = f'https://www.mercadopago.cl/checkout/v1/redirect?pref_id={preferencia["id"]}'
+        return self._responder(201, preferencia)
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # El cliente cortó por timeout mientras la respuesta estaba colgada
+        pass
+
+
+class MercadoPagoFalso:
+    def __init__(self, latencia=0.0, latencia_conexion=0.0, colgar_cada=0, colgada=30.0):
+        self.latencia = latencia
+        self.latencia_conexion = latencia_conexion
+        # Una de cada `colgar_cada` respuestas tarda `colgada` segundos
+        self.colgar_cada = colgar_cada
+        self.colgada = colgada
+        # Todas las respuestas son un 200 con HTML en vez de JSON
+        self.html = False
+        self.pagos = {}
+        self.preferencias = {}
+        self.consultas = Counter()
+        self.llamadas = 0
+        self.candado = threading.Lock()
+        self._servidor = None
+
+    def agregar_pago(self, pago_id, status, pedido_id, monto, creado=None):
+        self.pagos[str(pago_id)] = {
+            'id': int(pago_id),
+            'status': status,
+            'external_reference': str(pedido_id),
+            'transaction_amount': float(monto),
+            'currency_id': 'CLP',
+            'date_created': (creado or timezone.now()).isoformat(timespec='milliseconds'),
+        }
+
+    def __enter__(self):
+        manejador = type('Manejador', (_Manejador,), {'falso': self})
+        self._servidor = _Servidor(('127.0.0.1', 0), manejador)
+        self.url = f'http://127.0.0.1:{self._servidor.server_address[1]}'
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
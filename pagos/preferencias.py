@@ -0,0 +1,69 @@
+"""
+Preferencias de Checkout Pro: una por (pedido, total).
+
+Si el comprador recarga la página de pago o hace doble clic, se reutiliza
+la preferencia guardada (una consulta por índice, sin llamar a MercadoPago).
+Si cambia el total del pedido (volvió al carrito y agregó algo) se crea
+otra. Dos requests simultáneos del mismo pedido mandan la misma clave de
+idempotencia, y la restricción única deja una sola fila.
+"""
+from django.urls import reverse
+
+from .mercadopago_api import crear_preferencia, ErrorMercadoPago
+from .models import PreferenciaPago
+
+
+def datos_preferencia(pedido, urls):
+    return {
+        "items": [
+            {
+                "title": f"Pedido #{pedido.id}",
+                "quantity": 1,
+                "currency_id": "CLP",
+                "unit_price": float(pedido.total),
+            }
+        ],
+        "back_urls": urls,
+        "auto_return": "approved",
+        # El webhook y el worker identifican el pedido con esto (pagos/webhooks.py)
+        "external_reference": str(pedido.id),
+    }
+
+
+def urls_retorno(request):
+    return {
+        "success": request.build_absolute_uri(reverse("pagos:mp_exito")),
+        "failure": request.build_absolute_uri(reverse("pagos:mp_fallo")),
+        "pending": request.build_absolute_uri(reverse("pagos:mp_pendiente")),
+    }
+
+
+def url_checkout(pedido, urls, notificacion=None):
+    """
+    URL de pago de MercadoPago para el pedido. Lanza ErrorMercadoPago si
+    hay que crear la preferencia y la API falla o no responde a tiempo.
+    """
+    guardada = (
+        PreferenciaPago.objects
+        .filter(pedido=pedido, total=pedido.total)
+        .values_list('url', flat=True)
+        .first()
+    )
+    if guardada:
+        return guardada
+
+    datos = datos_preferencia(pedido, urls)
+    if notificacion:
+        datos["notification_url"] = notificacion
+    respuesta = crear_preferencia(datos, clave_idempotencia=f"g59-pedido-{pedido.id}-{pedido.total}")
+
+    # Intentamos usar init_point o sandbox_init_point
+    url = respuesta.get("init_point") or respuesta.get("sandbox_init_point")
+    if not url:
+        raise ErrorMercadoPago(200, f"No se recibió URL de checkout. Respuesta: {respuesta}")
+
+    PreferenciaPago.objects.bulk_create(
+        [PreferenciaPago(pedido=pedido, total=pedido.total, preferencia_id=respuesta.get("id", ""), url=url)],
+        ignore_conflicts=True,
+    )
+    return url
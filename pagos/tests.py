@@ -1,3 +1,272 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from pedidos.models import Pedido, PedidoDetalle, ReservaStock
+from pedidos.reservas import reservar
+from productos.models import Producto, Categoria
+from . import mercadopago_api, preferencias
+from .conciliacion import conciliar
+from .models import EventoPago
+from .mp_falso import MercadoPagoFalso
+from .webhooks import procesar_pendientes
+
+
+class PagosTestCase(TestCase):
+    """Pedidos de MercadoPago de $1.000 sobre un producto con stock 10."""
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre='Prueba pagos')
+        cls.producto = Producto.objects.create(
+            nombre='Prueba pago', precio=1_000, stock=10, categoria=categoria, activo=False,
+        )
+
+    def setUp(self):
+        # Cada test con su propia API de MercadoPago, sin tocar la real
+        self.falso = self.enterContext(MercadoPagoFalso())
+        self.enterContext(override_settings(
+            MP_API_URL=self.falso.url, MP_ACCESS_TOKEN='prueba', MP_WEBHOOK_SECRET=None,
+        ))
+
+    def pedido(self):
+        pedido = Pedido.objects.create(estado='pendiente_pago', total=1_000, metodo_pago='mercadopago')
+        PedidoDetalle.objects.create(
+            pedido=pedido, producto=self.producto, cantidad=1, precio_unitario=1_000,
+        )
+        return pedido
+
+
+class WebhookTests(PagosTestCase):
+    def avisar(self, pago_id, cabeceras=None):
+        cuerpo = {'action': 'payment.updated', 'type': 'payment', 'data': {'id': pago_id}}
+        return self.client.post(
+            f"{reverse('pagos:mp_webhook')}?data.id={pago_id}&type=payment",
+            data=json.dumps(cuerpo), content_type='application/json', headers=cabeceras or {},
+        )
+
+    def test_aviso_repetido_se_guarda_una_vez_con_un_insert(self):
+        for _ in range(3):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.avisar('123').status_code, 200)
+        self.assertEqual(EventoPago.objects.filter(pago_id='123').count(), 1)
+
+    def test_ignora_otros_temas_y_ids_raros(self):
+        respuesta = self.client.post(
+            reverse('pagos:mp_webhook') + '?topic=merchant_order&id=9',
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self.avisar('²').status_code, 200)
+        self.assertFalse(EventoPago.objects.exists())
+
+    def test_firma(self):
+        secreto = 'secreto'
+        plantilla = 'id:456;request-id:req-1;ts:1700000000;'
+        firma = hmac.new(secreto.encode(), plantilla.encode(), hashlib.sha256).hexdigest()
+        mala = {'x-signature': 'ts=1700000000,v1=malo', 'x-request-id': 'req-1'}
+        buena = {'x-signature': f'ts=1700000000,v1={firma}', 'x-request-id': 'req-1'}
+        with override_settings(MP_WEBHOOK_SECRET=secreto):
+            self.assertEqual(self.avisar('456').status_code, 401)
+            self.assertEqual(self.avisar('456', mala).status_code, 401)
+            self.assertEqual(self.avisar('456', buena).status_code, 200)
+        self.assertEqual(EventoPago.objects.filter(pago_id='456').count(), 1)
+
+    def test_aplica_cada_pago_una_sola_vez(self):
+        aprobado, rechazado, pendiente = self.pedido(), self.pedido(), self.pedido()
+        self.falso.agregar_pago('1', 'approved', aprobado.pk, 1_000)
+        self.falso.agregar_pago('2', 'rejected', rechazado.pk, 1_000)
+        self.falso.agregar_pago('3', 'pending', pendiente.pk, 1_000)
+        for pago_id in ['1', '2', '3'] * 2:
+            self.avisar(pago_id)
+
+        resumen = procesar_pendientes()
+        self.assertEqual(resumen, {'confirmado': 1, 'rechazado': 1, 'pendiente': 1})
+
+        # El pendiente se aprueba después: se fuerza su reintento
+        self.falso.pagos['3']['status'] = 'approved'
+        EventoPago.objects.filter(pago_id='3').update(proximo_intento=timezone.now())
+        self.assertEqual(procesar_pendientes(), {'confirmado': 1})
+        self.assertEqual(procesar_pendientes(), {})
+
+        estados = dict(Pedido.objects.values_list('pk', 'estado_pago'))
+        self.assertEqual(estados, {
+            aprobado.pk: 'aprobado', rechazado.pk: 'rechazado', pendiente.pk: 'aprobado',
+        })
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 8)
+        # Dos llamadas a la API por el pendiente, una por cada otro pago
+        self.assertEqual(self.falso.consultas['GET'], 4)
+
+    def test_monto_menor_no_confirma(self):
+        pedido = self.pedido()
+        self.falso.agregar_pago('7', 'approved', pedido.pk, 500)
+        self.avisar('7')
+
+        self.assertEqual(procesar_pendientes(), {'monto_distinto': 1})
+        pedido.refresh_from_db()
+        self.assertFalse(pedido.pagado)
+        self.assertIn('menor al total', EventoPago.objects.get(pago_id='7').error)
+
+    def test_api_caida_reprograma(self):
+        self.avisar('8')
+        with override_settings(MP_API_URL='http://127.0.0.1:1'):
+            self.assertEqual(procesar_pendientes(), {'error': 1})
+
+        evento = EventoPago.objects.get(pago_id='8')
+        self.assertIsNone(evento.procesado)
+        self.assertEqual(evento.intentos, 1)
+        self.assertGreater(evento.proximo_intento, timezone.now())
+        self.assertIn('ErrorMercadoPago', evento.error)
+
+
+class ConciliacionTests(PagosTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hace_una_hora = timezone.now() - timedelta(hours=1)
+
+    def pedido_viejo(self):
+        pedido = self.pedido()
+        # Sin movimiento hace una hora (update() no toca el auto_now)
+        Pedido.objects.filter(pk=pedido.pk).update(
+            creado=self.hace_una_hora, actualizado=self.hace_una_hora,
+        )
+        return pedido
+
+    def pago(self, pago_id, status, pedido_id, minutos=1):
+        self.falso.agregar_pago(
+            pago_id, status, pedido_id, 1_000,
+            creado=self.hace_una_hora + timedelta(minutes=minutos),
+        )
+
+    def test_concilia_los_pendientes_viejos(self):
+        aprobado, rechazado, reintentado = self.pedido_viejo(), self.pedido_viejo(), self.pedido_viejo()
+        pendiente, sin_pago = self.pedido_viejo(), self.pedido_viejo()
+        reciente = self.pedido()
+        reservar(rechazado, [(self.producto.pk, 1)])
+
+        self.pago('11', 'approved', aprobado.pk)
+        self.pago('12', 'rejected', rechazado.pk)
+        # Primero rechazado y después aprobado: vale el aprobado
+        self.pago('13', 'rejected', reintentado.pk, minutos=2)
+        self.pago('14', 'approved', reintentado.pk, minutos=3)
+        self.pago('15', 'pending', pendiente.pk)
+        # De otra tienda y de un pedido que todavía puede recibir su aviso
+        self.pago('16', 'approved', 'otra-tienda')
+        self.pago('17', 'approved', reciente.pk)
+
+        resumen = conciliar(hilos=3, por_pagina=2)
+
+        self.assertEqual(resumen['pedidos'], 5)
+        # 7 pagos de a 2 por página
+        self.assertEqual(resumen['paginas'], 4)
+        self.assertEqual(self.falso.consultas['GET'], 4 + 2)  # + consulta de cada aprobado
+        self.assertEqual(resumen['aprobados'], 2)
+        self.assertEqual(resumen['confirmados'], 2)
+        self.assertEqual(resumen['rechazados'], 1)
+        self.assertEqual(resumen['sin_resolver'], 2)
+
+        estados = dict(Pedido.objects.values_list('pk', 'estado_pago'))
+        self.assertEqual(estados, {
+            aprobado.pk: 'aprobado', rechazado.pk: 'rechazado', reintentado.pk: 'aprobado',
+            pendiente.pk: 'pendiente', sin_pago.pk: 'pendiente', reciente.pk: 'pendiente',
+        })
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 8)
+        # El stock apartado por el pedido rechazado volvió
+        self.assertEqual(self.producto.reservado, 0)
+        self.assertFalse(ReservaStock.objects.exists())
+
+        # Una segunda pasada no encuentra nada nuevo que aplicar
+        otra = conciliar(hilos=3, por_pagina=2)
+        self.assertEqual(otra['pedidos'], 2)
+        self.assertEqual(otra['aprobados'] + otra['rechazados'], 0)
+
+    def test_reencola_un_aviso_que_se_dio_por_perdido(self):
+        pedido = self.pedido_viejo()
+        self.pago('21', 'approved', pedido.pk)
+        EventoPago.objects.create(
+            pago_id='21', tipo='payment', intentos=12, procesado=timezone.now(),
+            error='Se dejó de consultar: el pago sigue sin resolverse.',
+        )
+
+        self.assertEqual(conciliar()['confirmados'], 1)
+
+        pedido.refresh_from_db()
+        self.assertTrue(pedido.pagado)
+        self.assertEqual(EventoPago.objects.get(pago_id='21').error, '')
+
+    def test_no_busca_mas_atras_que_el_plazo(self):
+        # Pedido de hace dos meses que se movió hace una hora
+        pedido = self.pedido_viejo()
+        Pedido.objects.filter(pk=pedido.pk).update(creado=timezone.now() - timedelta(days=60))
+        self.falso.agregar_pago('31', 'approved', 'otra-tienda', 1_000,
+                                creado=timezone.now() - timedelta(days=30))
+        self.pago('32', 'approved', pedido.pk)
+
+        resumen = conciliar(dias=3, por_pagina=1)
+
+        # Solo la página del pago reciente: el de hace 30 días no se pide
+        self.assertEqual(resumen['paginas'], 1)
+        self.assertEqual(resumen['confirmados'], 1)
+
+    def test_no_reencola_un_pago_con_monto_menor(self):
+        pedido = self.pedido_viejo()
+        self.falso.agregar_pago('41', 'approved', pedido.pk, 500,
+                                creado=self.hace_una_hora + timedelta(minutes=1))
+
+        self.assertEqual(conciliar()['aprobados'], 1)
+        evento = EventoPago.objects.get(pago_id='41')
+        self.assertIn('menor al total', evento.error)
+        consultas = self.falso.consultas['GET']
+
+        # Las pasadas siguientes lo encuentran, pero no lo vuelven a procesar
+        self.assertEqual(conciliar()['confirmados'], 0)
+        self.assertEqual(self.falso.consultas['GET'], consultas + 1)  # solo la búsqueda
+        self.assertEqual(EventoPago.objects.get(pago_id='41').procesado, evento.procesado)
+
+    def test_sin_pendientes_no_llama_a_la_api(self):
+        self.pedido()
+        self.assertEqual(conciliar(), {'pedidos': 0})
+        self.assertEqual(self.falso.consultas['GET'], 0)
+
+
+class PreferenciaTests(PagosTestCase):
+    URLS = {'success': 'https://tienda.cl/exito/', 'failure': 'https://tienda.cl/fallo/',
+            'pending': 'https://tienda.cl/pendiente/'}
+
+    def test_recarga_reutiliza_la_preferencia_y_la_conexion(self):
+        pedido = self.pedido()
+        urls = {preferencias.url_checkout(pedido, self.URLS) for _ in range(3)}
+        self.assertEqual(len(urls), 1)
+        self.assertEqual(self.falso.consultas['POST'], 1)
+
+        # Cambió el total (volvió al carrito): otra preferencia
+        pedido.total = 1_500
+        preferencias.url_checkout(pedido, self.URLS)
+        self.assertEqual(self.falso.consultas['POST'], 2)
+        self.assertEqual(self.falso.consultas['conexiones'], 1)
+
+    def test_respuesta_colgada_corta_por_timeout(self):
+        self.falso.colgar_cada, self.falso.colgada = 1, 3.0
+        inicio = time.perf_counter()
+        with mock.patch.object(mercadopago_api, 'TIMEOUT', (1, 0.3)):
+            with self.assertRaises(mercadopago_api.ErrorMercadoPago) as error:
+                preferencias.url_checkout(self.pedido(), self.URLS)
+        self.assertIsNone(error.exception.status)
+        self.assertLess(time.perf_counter() - inicio, 2)
+
+    def test_respuesta_que_no_es_json(self):
+        self.falso.html = True
+        with self.assertRaises(mercadopago_api.ErrorMercadoPago):
+            mercadopago_api.obtener_pago('1')
+
+        # La página de pago avisa y vuelve al checkout en vez de dar 500
+        respuesta = self.client.get(reverse('pagos:pagar_mercadopago', args=[self.pedido().pk]))
+        self.assertRedirects(respuesta, reverse('pedidos:pedido_crear'), fetch_redirect_response=False)
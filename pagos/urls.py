@@ -9,6 +9,7 @@ urlpatterns = [
     path('mercadopago/exito/', views.mp_exito, name='mp_exito'),
     path('mercadopago/fallo/', views.mp_fallo, name='mp_fallo'),
     path('mercadopago/pendiente/', views.mp_pendiente, name='mp_pendiente'),
+    path('mercadopago/webhook/', views.mp_webhook, name='mp_webhook'),
 
     # Transbank (luego lo ordenamos igual)
     path('transbank/<int:pedido_id>/', views.transbank_iniciar, name='transbank_iniciar'),
@@ -1,101 +1,52 @@
-import mercadopago
 from django.conf import settings
 from django.shortcuts import redirect, get_object_or_404
-from django.urls import reverse
 from django.http import HttpResponse
 from django.contrib import messages
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
+from pedidos import estados
 from pedidos.models import Pedido
+from pedidos.reservas import liberar
+from pedidos.confirmacion import confirmar_pedido, SIN_STOCK
 from carrito.cart import Cart
 
-from common.email_utils import send_email
 from django.shortcuts import render
 
+from . import preferencias, webhooks
+from .mercadopago_api import ErrorMercadoPago
+
 
 
 def pagar_mercadopago(request, pedido_id):
-    pedido = get_object_or_404(Pedido, id=pedido_id, pagado=False)
+    # Un pedido 'fallido' no se vuelve a cobrar: confirmar_pedido lo rechazaría
+    # con el dinero ya tomado
+    pedido = get_object_or_404(Pedido, id=pedido_id, pagado=False, estado__in=estados.EN_CURSO)
     # Guardamos el id del pedido en sesión para las vistas de exito/fallo/pendiente
     request.session["checkout_pedido_id"] = pedido.id
 
-    # Si tu modelo Pedido tiene campo metodo_pago, lo dejamos seteado
-    if hasattr(pedido, "metodo_pago"):
+    if pedido.metodo_pago != "mercadopago":
         pedido.metodo_pago = "mercadopago"
         pedido.save(update_fields=["metodo_pago"])
 
-    # SDK Mercado Pago con el Access Token de settings
-    sdk = mercadopago.SDK(settings.MP_ACCESS_TOKEN)
-
-    preference_data = {
-        "items": [
-            {
-                "title": f"Pedido #{pedido.id}",
-                "quantity": 1,
-                "currency_id": "CLP",
-                "unit_price": float(pedido.total),
-            }
-        ],
-        "back_urls": {
-            "success": request.build_absolute_uri(reverse("pagos:mp_exito")),
-            "failure": request.build_absolute_uri(reverse("pagos:mp_fallo")),
-            "pending": request.build_absolute_uri(reverse("pagos:mp_pendiente")),
-        },
-        "auto_return": "approved",
-    }
-
-    preference = sdk.preference().create(preference_data)
-
-    # 👇 Para ver qué está devolviendo Mercado Pago en la terminal
-    print("MP preference response:", preference)
-
-    resp = preference.get("response") or {}
-
-    # Intentamos usar init_point o sandbox_init_point
-    checkout_url = resp.get("init_point") or resp.get("sandbox_init_point")
-
-    if not checkout_url:
-        # Nada de KeyError: ahora respondemos con el error que devuelva MP
-        return HttpResponse(
-            f"No se recibió URL de checkout desde Mercado Pago. Respuesta: {resp}",
-            status=500,
+    # Reutiliza la preferencia si ya existe para este total (ver pagos/preferencias.py)
+    try:
+        checkout_url = preferencias.url_checkout(
+            pedido, preferencias.urls_retorno(request), notificacion=settings.MP_WEBHOOK_URL,
         )
+    except ErrorMercadoPago:
+        messages.error(request, "No pudimos conectar con Mercado Pago. Intenta de nuevo en unos minutos.")
+        return redirect("pedidos:pedido_crear")
 
     return redirect(checkout_url)
 
 
 
-def enviar_correo_confirmacion_pedido(pedido):
-    """
-    Envía el correo de confirmación de pedido usando la función común send_email.
-    Intenta usar el email del cliente asociado al pedido.
-    """
-    # buscamos un correo razonable
-    to_email = None
-
-    cliente = getattr(pedido, "cliente", None)
-    if cliente and getattr(cliente, "email", None):
-        to_email = cliente.email
-    elif getattr(pedido, "email", None):
-        to_email = pedido.email
-
-    if not to_email:
-        # si no hay correo, no intentamos mandar nada
-        return
-
-    send_email(
-        to_email=to_email,
-        subject=f"Confirmación de compra #{pedido.id}",
-        template_name="emails/pedido_confirmacion.html",
-        context={"pedido": pedido},
-    )
-
-
-
-
 def mp_exito(request):
     """
-    Mercado Pago redirige acá cuando el pago se aprueba.
-    Marcamos el pedido como pagado y vaciamos el carrito.
+    Mercado Pago redirige acá cuando el pago se aprueba. La redirección no
+    confirma nada: se deja el pago en la bandeja de avisos (igual que el
+    webhook) y `manage.py procesar_pagos` lo confirma contra la API.
     """
 
     pedido_id = request.session.get("checkout_pedido_id")
@@ -109,22 +60,39 @@ def mp_exito(request):
     pedido = get_object_or_404(Pedido, id=pedido_id)
 
     payment_id = request.GET.get("payment_id", "")
-
-    pedido.estado_pago = "aprobado"
-    pedido.pagado = True
-    pedido.transaccion_id = payment_id or f"mp-sim-{pedido.id}"
-    pedido.save()
-
-    # 🔔 Enviar correo de confirmación de pedido
-    enviar_correo_confirmacion_pedido(pedido)
+    if payment_id.isascii() and payment_id.isdigit():
+        webhooks.registrar_aviso(payment_id, "payment", {"origen": "redireccion"})
 
     cart = Cart(request)
     cart.clear()
 
-    messages.success(request, "Tu pago en Mercado Pago fue aprobado.")
+    if pedido.pagado:
+        messages.success(request, "Tu pago en Mercado Pago fue aprobado.")
+    else:
+        messages.info(request, "Recibimos tu pago. Te avisaremos por correo apenas se confirme.")
     return render(request, "pagos/mercadopago_exito.html", {"pedido": pedido})
 
 
+@csrf_exempt
+@require_POST
+def mp_webhook(request):
+    """
+    Aviso de pago de MercadoPago: solo se guarda en la bandeja y se responde
+    200 al tiro. Lo procesa `manage.py procesar_pagos` (ver pagos/webhooks.py).
+    """
+    aviso = webhooks.extraer_aviso(request)
+    if aviso is None:
+        # Otros temas (merchant_order, etc.): no nos interesan
+        return HttpResponse(status=200)
+
+    pago_id, tipo, datos = aviso
+    if not webhooks.firma_valida(request, pago_id):
+        return HttpResponse(status=401)
+
+    webhooks.registrar_aviso(pago_id, tipo, datos)
+    return HttpResponse(status=200)
+
+
 
 def mp_fallo(request):
     """
@@ -136,6 +104,8 @@ def mp_fallo(request):
         pedido = get_object_or_404(Pedido, id=pedido_id)
         pedido.estado_pago = "rechazado"
         pedido.save()
+        # El stock apartado para este pedido vuelve a estar disponible
+        liberar(pedido.id)
 
     messages.error(request, "Tu pago fue rechazado o hubo un problema.")
     return redirect('pedidos:pedido_crear')
@@ -158,17 +128,24 @@ def mp_pendiente(request):
 
 
 def transbank_iniciar(request, pedido_id):
-    pedido = get_object_or_404(Pedido, id=pedido_id, pagado=False)
+    pedido = get_object_or_404(Pedido, id=pedido_id, pagado=False, estado__in=estados.EN_CURSO)
 
     # 🔹 AQUÍ iría la integración real con Webpay (Transbank):
     # - Crear transacción
     # - Redirigir a la URL de Webpay
 
     # Por ahora: simulamos pago aprobado
-    pedido.estado_pago = "aprobado"
-    pedido.pagado = True
-    pedido.transaccion_id = f'tbk-sim-{pedido.id}'
-    pedido.save()
+    resultado = confirmar_pedido(pedido.id, f'tbk-sim-{pedido.id}')
+    pedido = resultado.pedido
+
+    if resultado.estado == SIN_STOCK:
+        messages.error(
+            request,
+            "El pedido no se pudo completar por falta de stock"
+            + (f" ({', '.join(resultado.faltantes)})" if resultado.faltantes else "")
+            + "."
+        )
+        return redirect("carrito:detalle")
 
     cart = Cart(request)
     cart.clear()
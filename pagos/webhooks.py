@@ -0,0 +1,195 @@
+"""
+Avisos de pago de MercadoPago: bandeja de entrada + worker.
+
+El webhook solo guarda el aviso en EventoPago (un INSERT que choca con el
+índice único de pago_id si el aviso viene repetido) y responde 200 al
+tiro, sin llamar a nadie. Así la latencia del webhook no depende de la
+API ni del correo, aunque lleguen muchos pagos juntos.
+
+`manage.py procesar_pagos` toma los avisos pendientes en lotes arrendados
+(ver common/bandeja.py): las llamadas a la API se hacen sin transacciones
+abiertas y dos workers nunca toman el mismo aviso. Por cada pago consulta
+su estado real en la API y aplica:
+
+    approved                -> confirmar_pedido (idempotente) + correo a la
+                               bandeja de salida, en la misma transacción
+    rejected, cancelled...  -> estado_pago 'rechazado' y se libera el stock
+    pending, in_process...  -> se vuelve a consultar más tarde (backoff)
+
+Nunca se confía en lo que dice el aviso o la redirección del comprador.
+"""
+import hashlib
+import hmac
+import json
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from common import bandeja
+from pedidos.confirmacion import confirmar_pedido, CONFIRMADO
+from pedidos.models import Pedido
+from pedidos.reservas import liberar
+from .correos import encolar_correo_confirmacion_pedido
+from .mercadopago_api import obtener_pago
+from .models import EventoPago
+
+
+TAMANO_LOTE = 50
+MAX_INTENTOS = 12
+
+ESTADOS_RECHAZO = {'rejected', 'cancelled', 'refunded', 'charged_back'}
+
+
+# ---------- Webhook ----------
+
+def es_id(texto):
+    """Dígitos ASCII que caben en un id (bigint): '²' o '٣' no son ids."""
+    return texto.isascii() and texto.isdecimal() and int(texto) < 2 ** 63
+
+
+def extraer_aviso(request):
+    """
+    (pago_id, tipo, datos) de un aviso de pago, o None si es de otro tema.
+    Entiende el formato de webhooks (?type=payment&data.id=N y el JSON
+    {"type": "payment", "data": {"id": N}}) y el de IPN (?topic=payment&id=N).
+    """
+    try:
+        datos = json.loads(request.body or b'{}')
+    except ValueError:
+        datos = {}
+    if not isinstance(datos, dict):
+        datos = {}
+
+    tipo = (
+        request.GET.get('type') or request.GET.get('topic')
+        or datos.get('type') or datos.get('topic') or ''
+    )
+    cuerpo = datos.get('data') if isinstance(datos.get('data'), dict) else {}
+    pago_id = str(request.GET.get('data.id') or cuerpo.get('id') or '')
+    if not pago_id and request.GET.get('topic') == 'payment':
+        pago_id = request.GET.get('id', '')
+
+    if tipo != 'payment' or not (pago_id.isascii() and pago_id.isalnum()) or len(pago_id) > 64:
+        return None
+    return pago_id, tipo, datos
+
+
+def firma_valida(request, pago_id):
+    """
+    Valida la cabecera x-signature (ts=...,v1=...) con MP_WEBHOOK_SECRET.
+    Sin clave configurada no se valida (desarrollo).
+    """
+    secreto = getattr(settings, 'MP_WEBHOOK_SECRET', None)
+    if not secreto:
+        return True
+
+    partes = dict(
+        parte.strip().split('=', 1)
+        for parte in request.headers.get('x-signature', '').split(',')
+        if '=' in parte
+    )
+    if not partes.get('ts') or not partes.get('v1'):
+        return False
+
+    plantilla = f"id:{pago_id.lower()};"
+    if request.headers.get('x-request-id'):
+        plantilla += f"request-id:{request.headers['x-request-id']};"
+    plantilla += f"ts:{partes['ts']};"
+    esperada = hmac.new(secreto.encode(), plantilla.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(esperada, partes['v1'])
+
+
+def registrar_aviso(pago_id, tipo='payment', datos=None):
+    """Guarda el aviso si es el primero de ese pago. Una sola consulta."""
+    EventoPago.objects.bulk_create(
+        [EventoPago(pago_id=pago_id, tipo=tipo, datos=datos or {})],
+        ignore_conflicts=True,
+    )
+
+
+# ---------- Worker ----------
+
+def reclamar(lote=TAMANO_LOTE, ahora=None):
+    """Toma hasta `lote` avisos listos para procesar y los arrienda a este worker."""
+    return bandeja.reclamar(EventoPago.objects.filter(procesado__isnull=True), lote, ahora)
+
+
+def _terminar(evento, error=''):
+    evento.procesado = timezone.now()
+    evento.error = error
+    evento.save(update_fields=['procesado', 'error', 'estado_pago', 'pedido'])
+
+
+def _reprogramar(evento, error=''):
+    if evento.intentos >= MAX_INTENTOS:
+        return _terminar(evento, error or 'Se dejó de consultar: el pago sigue sin resolverse.')
+    evento.proximo_intento = timezone.now() + bandeja.espera(evento.intentos)
+    evento.error = error
+    evento.save(update_fields=['proximo_intento', 'error', 'estado_pago', 'pedido'])
+
+
+def procesar_evento(evento):
+    """Consulta el pago en la API y lo aplica al pedido. Devuelve qué se hizo."""
+    pago = obtener_pago(evento.pago_id)
+    evento.estado_pago = pago.get('status') or ''
+
+    referencia = str(pago.get('external_reference') or '')
+    pedido = Pedido.objects.filter(pk=referencia).first() if es_id(referencia) else None
+    if pedido is None:
+        _terminar(evento, f'El pago no corresponde a ningún pedido (external_reference={referencia!r}).')
+        return 'sin_pedido'
+    evento.pedido = pedido
+
+    if evento.estado_pago == 'approved':
+        monto = Decimal(str(pago.get('transaction_amount') or 0))
+        # MercadoPago cobra CLP sin decimales: se tolera el redondeo
+        if monto < pedido.total - 1:
+            _terminar(evento, f'Monto pagado {monto} menor al total del pedido {pedido.total}.')
+            return 'monto_distinto'
+
+        with transaction.atomic():
+            resultado = confirmar_pedido(pedido.pk, evento.pago_id)
+            if resultado.estado == CONFIRMADO:
+                # Lo envía `manage.py enviar_correos`; sale solo si el pago se confirmó
+                encolar_correo_confirmacion_pedido(resultado.pedido)
+        _terminar(evento)
+        return resultado.estado
+
+    if evento.estado_pago in ESTADOS_RECHAZO:
+        with transaction.atomic():
+            rechazado = (
+                Pedido.objects
+                .filter(pk=pedido.pk, pagado=False)
+                .update(estado_pago='rechazado', actualizado=timezone.now())
+            )
+            if rechazado:
+                # El stock apartado para este pedido vuelve a estar disponible
+                liberar(pedido.pk)
+        _terminar(evento)
+        return 'rechazado'
+
+    # pending, in_process, authorized...: todavía no hay nada que aplicar
+    _reprogramar(evento)
+    return 'pendiente'
+
+
+def procesar_pendientes(lote=TAMANO_LOTE):
+    """
+    Procesa avisos hasta vaciar los que están listos. Devuelve un Counter
+    con lo que se hizo con cada uno ('confirmado', 'rechazado', 'error'...).
+    """
+    resumen = Counter()
+    while True:
+        eventos = reclamar(lote)
+        if not eventos:
+            return resumen
+        for evento in eventos:
+            try:
+                resumen[procesar_evento(evento)] += 1
+            except Exception as e:
+                # API caída, timeout...: se reintenta más tarde
+                _reprogramar(evento, f'{type(e).__name__}: {e}')
+                resumen['error'] += 1
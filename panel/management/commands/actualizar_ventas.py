@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from panel.ventas import actualizar, DIAS_POR_LOTE
+
+
+class Command(BaseCommand):
+    help = (
+        "Actualiza los resúmenes diarios de ventas del panel: recalcula solo "
+        "los días con pedidos modificados desde la última corrida. Pensado "
+        "para correr cada pocos minutos desde cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=DIAS_POR_LOTE,
+                            help='Días recalculados por transacción.')
+        parser.add_argument(
+            '--desde-cero', action='store_true',
+            help='Recalcula todos los días (p. ej. después de cambiar costos).',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        dias = actualizar(desde_cero=options['desde_cero'], dias_por_lote=options['lote'])
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{dias} día(s) de ventas recalculado(s) en {segundos:.2f} s."
+        ))
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('productos', '0011_producto_reservado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaAgregacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('hasta', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PedidosDiariosEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(max_length=20)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['fecha', 'estado'],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'estado'), name='pedidos_diarios_estado_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiariaCategoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='productos.categoria')),
+            ],
+            options={
+                'ordering': ['fecha', 'categoria'],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'categoria'), name='venta_diaria_categoria_unica')],
+            },
+        ),
+    ]
@@ -1,3 +1,76 @@
 from django.db import models
 
-# Create your models here.
+from productos.models import Categoria
+
+
+# Tablas de resumen del dashboard (ver panel/ventas.py). Se recalculan por
+# día completo, así que nunca se editan a mano.
+
+class VentaDiaria(models.Model):
+    """Ventas confirmadas (pagado=True, no fallidas) por día de creación del pedido."""
+    fecha = models.DateField(unique=True)
+    pedidos = models.PositiveIntegerField(default=0)
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['fecha']
+
+    def __str__(self):
+        return f'Ventas {self.fecha}'
+
+    @property
+    def margen(self):
+        return self.ingresos - self.costo
+
+
+class VentaDiariaCategoria(models.Model):
+    fecha = models.DateField()
+    categoria = models.ForeignKey(
+        Categoria,
+        on_delete=models.CASCADE,
+        related_name='ventas_diarias',
+    )
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['fecha', 'categoria']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'categoria'], name='venta_diaria_categoria_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Ventas {self.fecha} / {self.categoria_id}'
+
+
+class PedidosDiariosEstado(models.Model):
+    """Pedidos creados cada día, según el estado en que están hoy."""
+    fecha = models.DateField()
+    estado = models.CharField(max_length=20)
+    pedidos = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['fecha', 'estado']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'estado'], name='pedidos_diarios_estado_unico',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.fecha} {self.estado}: {self.pedidos}'
+
+
+class MarcaAgregacion(models.Model):
+    """Hasta qué `Pedido.actualizado` ya está reflejado en los resúmenes."""
+    nombre = models.CharField(max_length=50, unique=True)
+    hasta = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.nombre}: {self.hasta:%Y-%m-%d %H:%M}'
@@ -0,0 +1,143 @@
+"""
+Resúmenes diarios de ventas para el dashboard del panel.
+
+El dashboard lee solo VentaDiaria, VentaDiariaCategoria y
+PedidosDiariosEstado: unas pocas filas por día, sin importar cuántos
+pedidos haya. Se mantienen así:
+
+    1. `manage.py actualizar_ventas` (cron) busca los pedidos con
+       `actualizado` posterior a la marca, junta los días en que se
+       crearon esos pedidos y recalcula esos días completos.
+    2. La marca avanza hasta el momento en que empezó la corrida. Se
+       relee un pequeño solape hacia atrás para no perder pedidos cuya
+       transacción terminó justo durante la corrida anterior.
+    3. Opcionalmente (VENTAS_REFRESCO_AL_PAGAR) confirmar_pedido recalcula
+       el día del pedido apenas se hace el commit del pago.
+
+Recalcular un día completo es idempotente, así que correr de más nunca
+duplica nada. El costo usa el `precio_costo` actual del producto
+(PedidoDetalle no lo guarda); `--desde-cero` rehace todo si cambian costos
+o se borran pedidos pagados desde el admin.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from pedidos.models import Pedido, PedidoDetalle
+from .models import MarcaAgregacion, PedidosDiariosEstado, VentaDiaria, VentaDiariaCategoria
+
+
+MARCA = 'ventas'
+SOLAPE = timedelta(minutes=5)
+DIAS_POR_LOTE = 31
+
+# Los carritos y pendientes de pago son temporales (los borra
+# limpiar_pedidos), así que no se resumen
+ESTADOS_RESUMIDOS = ['pagado', 'enviado', 'entregado', 'fallido']
+
+
+def _en_dias(fechas, campo):
+    """Q con un rango [00:00, 00:00 del día siguiente) por fecha: usa los índices de `campo`."""
+    condicion = Q()
+    for fecha in fechas:
+        inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+        condicion |= Q(**{f'{campo}__gte': inicio, f'{campo}__lt': inicio + timedelta(days=1)})
+    return condicion
+
+
+@transaction.atomic
+def recalcular_dias(fechas):
+    """Rehace los resúmenes de `fechas` desde Pedido/PedidoDetalle. Devuelve cuántos días."""
+    fechas = sorted(set(fechas))
+    if not fechas:
+        return 0
+
+    # Serializa los recálculos (cron y refresco al pagar) sobre la fila de la marca
+    MarcaAgregacion.objects.select_for_update().filter(nombre=MARCA).first()
+
+    lineas = (
+        PedidoDetalle.objects
+        .filter(_en_dias(fechas, 'pedido__creado'), pedido__pagado=True)
+        .exclude(pedido__estado='fallido')
+        .annotate(fecha=TruncDate('pedido__creado'))
+    )
+    montos = {
+        'unidades': Sum('cantidad'),
+        'ingresos': Sum(F('cantidad') * F('precio_unitario')),
+        'costo': Sum(F('cantidad') * F('producto__precio_costo')),
+    }
+    por_dia = lineas.values('fecha').annotate(pedidos=Count('pedido', distinct=True), **montos)
+    por_categoria = lineas.values('fecha', 'producto__categoria').annotate(**montos)
+    por_estado = (
+        Pedido.objects
+        .filter(_en_dias(fechas, 'creado'), estado__in=ESTADOS_RESUMIDOS)
+        .annotate(fecha=TruncDate('creado'))
+        .values('fecha', 'estado')
+        .annotate(pedidos=Count('id'), total=Sum('total'))
+    )
+
+    VentaDiaria.objects.filter(fecha__in=fechas).delete()
+    VentaDiariaCategoria.objects.filter(fecha__in=fechas).delete()
+    PedidosDiariosEstado.objects.filter(fecha__in=fechas).delete()
+
+    VentaDiaria.objects.bulk_create([VentaDiaria(**fila) for fila in por_dia])
+    VentaDiariaCategoria.objects.bulk_create([
+        VentaDiariaCategoria(
+            fecha=fila['fecha'],
+            categoria_id=fila['producto__categoria'],
+            unidades=fila['unidades'],
+            ingresos=fila['ingresos'],
+            costo=fila['costo'],
+        )
+        for fila in por_categoria
+    ])
+    PedidosDiariosEstado.objects.bulk_create([PedidosDiariosEstado(**fila) for fila in por_estado])
+    return len(fechas)
+
+
+def actualizar(desde_cero=False, dias_por_lote=DIAS_POR_LOTE):
+    """
+    Recalcula los días con pedidos tocados desde la marca (o todos, con
+    `desde_cero`) y avanza la marca. Cada lote de días va en su propia
+    transacción. Devuelve cuántos días se recalcularon.
+    """
+    hasta = timezone.now()
+    marca = MarcaAgregacion.objects.filter(nombre=MARCA).first()
+
+    tocados = Pedido.objects.filter(actualizado__lte=hasta)
+    if marca and not desde_cero:
+        tocados = tocados.filter(actualizado__gt=marca.hasta - SOLAPE)
+    fechas = list(
+        tocados
+        .annotate(fecha=TruncDate('creado'))
+        .order_by('fecha')
+        .values_list('fecha', flat=True)
+        .distinct()
+    )
+
+    for i in range(0, len(fechas), dias_por_lote):
+        recalcular_dias(fechas[i:i + dias_por_lote])
+
+    if desde_cero:
+        # Días que ya no tienen pedidos (borrados desde el admin)
+        for modelo in (VentaDiaria, VentaDiariaCategoria, PedidosDiariosEstado):
+            modelo.objects.exclude(fecha__in=fechas).delete()
+
+    MarcaAgregacion.objects.update_or_create(nombre=MARCA, defaults={'hasta': hasta})
+    return len(fechas)
+
+
+def refrescar_al_pagar(pedido):
+    """
+    Llamar dentro de la transacción que marca el pedido como pagado. Si
+    VENTAS_REFRESCO_AL_PAGAR está activo, recalcula su día después del
+    commit; si falla, el pago no se ve afectado y el cron lo corrige.
+    """
+    if not getattr(settings, 'VENTAS_REFRESCO_AL_PAGAR', False):
+        return
+    fecha = timezone.localdate(pedido.creado)
+    transaction.on_commit(lambda: recalcular_dias([fecha]), robust=True)
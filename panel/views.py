@@ -1,14 +1,95 @@
+from datetime import timedelta
+
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.db.models import Sum
+from django.utils import timezone
+
+from pedidos.models import Pedido
+from .models import MarcaAgregacion, PedidosDiariosEstado, VentaDiaria, VentaDiariaCategoria
+from .ventas import MARCA, ESTADOS_RESUMIDOS
+
+
+PERIODOS = [7, 30, 90, 365]
+PERIODO_POR_DEFECTO = 30
+
+
+def _margen(ingresos, costo):
+    if not ingresos:
+        return 0
+    return round((ingresos - costo) * 100 / ingresos, 1)
+
 
 @login_required
 def home(request):
     """
-    Home del panel de administración.
-    Punto de entrada para gestión de pedidos y, después, análisis, etc.
+    Home del panel de administración: accesos a la gestión y KPIs de ventas.
+    Los KPIs salen solo de los resúmenes diarios (panel/ventas.py), así que
+    el costo no depende de cuántos pedidos haya.
     """
     if not request.user.is_staff:
         raise PermissionDenied()
 
-    return render(request, 'panel/home.html', {})
+    try:
+        dias = int(request.GET.get('dias', PERIODO_POR_DEFECTO))
+    except ValueError:
+        dias = PERIODO_POR_DEFECTO
+    if dias not in PERIODOS:
+        dias = PERIODO_POR_DEFECTO
+    desde = timezone.localdate() - timedelta(days=dias - 1)
+
+    serie = list(VentaDiaria.objects.filter(fecha__gte=desde).order_by('fecha'))
+    totales = {
+        'pedidos': sum(d.pedidos for d in serie),
+        'unidades': sum(d.unidades for d in serie),
+        'ingresos': sum(d.ingresos for d in serie),
+        'costo': sum(d.costo for d in serie),
+    }
+    totales['margen'] = totales['ingresos'] - totales['costo']
+    totales['margen_pct'] = _margen(totales['ingresos'], totales['costo'])
+    totales['ticket_promedio'] = (
+        totales['ingresos'] / totales['pedidos'] if totales['pedidos'] else 0
+    )
+
+    # Ancho de cada barra del gráfico, relativo al mejor día del período
+    maximo = max((d.ingresos for d in serie), default=0)
+    for d in serie:
+        d.ancho = int(d.ingresos * 100 / maximo) if maximo else 0
+
+    categorias = list(
+        VentaDiariaCategoria.objects
+        .filter(fecha__gte=desde)
+        .values('categoria__nombre')
+        .annotate(unidades=Sum('unidades'), ingresos=Sum('ingresos'), costo=Sum('costo'))
+        .order_by('-ingresos')[:10]
+    )
+    for c in categorias:
+        c['margen_pct'] = _margen(c['ingresos'], c['costo'])
+
+    por_estado = {
+        fila['estado']: fila
+        for fila in (
+            PedidosDiariosEstado.objects
+            .filter(fecha__gte=desde)
+            .values('estado')
+            .annotate(pedidos=Sum('pedidos'), total=Sum('total'))
+        )
+    }
+    etiquetas = dict(Pedido.ESTADO_CHOICES)
+    estados = [
+        (etiquetas[estado], por_estado.get(estado, {}).get('pedidos', 0))
+        for estado in ESTADOS_RESUMIDOS
+    ]
+
+    marca = MarcaAgregacion.objects.filter(nombre=MARCA).first()
+
+    return render(request, 'panel/home.html', {
+        'dias': dias,
+        'periodos': PERIODOS,
+        'serie': serie,
+        'totales': totales,
+        'categorias': categorias,
+        'estados': estados,
+        'actualizado_hasta': marca.hasta if marca else None,
+    })
@@ -6,6 +6,7 @@ from .models import (
     DatosEnvio,
     DatosFactura,
     DocumentoTributario,
+    SecuenciaFolio,
 )
 
 
@@ -34,3 +35,4 @@ admin.site.register(Cliente)
 admin.site.register(DatosEnvio)
 admin.site.register(DatosFactura)
 admin.site.register(DocumentoTributario)
+admin.site.register(SecuenciaFolio)
@@ -0,0 +1,155 @@
+"""
+Confirmación de un pedido pagado: descuenta el stock de todas sus líneas
+en una sola transacción.
+
+    1. Bloquea el pedido (SELECT ... FOR UPDATE). Si dos avisos de pago del
+       mismo pedido llegan a la vez, el segundo espera y ve pagado=True.
+    2. Bloquea sus reservas y después las filas de sus productos en orden de
+       id (reservas -> productos, igual que al liberar reservas). Todos los
+       pedidos bloquean en el mismo orden, así no hay deadlocks entre
+       pedidos que comparten productos.
+    3. Un UPDATE condicional por producto:
+           SET stock = stock - n, reservado = reservado - r
+           WHERE id = ? AND stock >= n
+       Si alguna línea no alcanza, se deshace todo el descuento y el pedido
+       queda 'fallido' con el pago aprobado, para devolver el dinero a mano.
+
+Las consultas no dependen de cuántos pedidos se confirmen a la vez: solo
+compiten los que comparten productos, y solo por esas filas.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+
+from panel.ventas import refrescar_al_pagar
+from productos.cache import invalidar_agotados
+from productos.models import Producto
+from . import estados
+from .models import Pedido, PedidoDetalle, ReservaStock
+from .reservas import liberar
+
+
+CONFIRMADO = 'confirmado'
+YA_PAGADO = 'ya_pagado'
+SIN_STOCK = 'sin_stock'
+
+
+class SinStock(Exception):
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        super().__init__(', '.join(faltantes))
+
+
+class Resultado:
+    def __init__(self, estado, pedido, faltantes=()):
+        self.estado = estado
+        self.pedido = pedido
+        self.faltantes = list(faltantes)
+
+    @property
+    def ok(self):
+        return self.estado in (CONFIRMADO, YA_PAGADO)
+
+    def __repr__(self):
+        return f'<Resultado {self.estado} pedido={self.pedido.pk}>'
+
+
+@transaction.atomic
+def confirmar_pedido(pedido_id, transaccion_id):
+    """
+    Marca el pedido como pagado y descuenta su stock. Es idempotente:
+    confirmar dos veces el mismo pedido no descuenta dos veces.
+    Devuelve un Resultado (CONFIRMADO, YA_PAGADO o SIN_STOCK).
+    """
+    pedido = Pedido.objects.select_for_update().get(pk=pedido_id)
+    if pedido.pagado:
+        return Resultado(YA_PAGADO, pedido)
+    if not estados.puede_pasar(pedido.estado, 'pagado'):
+        # Ya se intentó confirmar y quedó 'fallido' por falta de stock
+        return Resultado(SIN_STOCK, pedido)
+
+    try:
+        with transaction.atomic():
+            _descontar_stock(pedido.pk)
+    except SinStock as e:
+        # El pago entró pero no hay con qué cumplir: queda a la vista del staff
+        estados.aplicar(pedido, 'fallido', origen='pago')
+        pedido.estado_pago = 'aprobado'
+        pedido.transaccion_id = transaccion_id
+        pedido.save(update_fields=['estado', 'estado_pago', 'transaccion_id', 'actualizado'])
+        liberar(pedido.pk)
+        return Resultado(SIN_STOCK, pedido, e.faltantes)
+
+    estados.aplicar(pedido, 'pagado', origen='pago')
+    pedido.estado_pago = 'aprobado'
+    pedido.pagado = True
+    pedido.transaccion_id = transaccion_id
+    pedido.save(update_fields=['estado', 'estado_pago', 'pagado', 'transaccion_id', 'actualizado'])
+    refrescar_al_pagar(pedido)
+    return Resultado(CONFIRMADO, pedido)
+
+
+def _descontar_stock(pedido_id):
+    lineas = dict(
+        PedidoDetalle.objects
+        .filter(pedido_id=pedido_id)
+        .values('producto_id')
+        .annotate(total=Sum('cantidad'))
+        .values_list('producto_id', 'total')
+    )
+    # Mismo orden de bloqueo que liberar_pedidos y liberar_vencidas: primero
+    # las reservas, después los productos. Si el barrido de vencidas ya borró
+    # una reserva, aquí no aparece y sus unidades no se descuentan dos veces
+    reservas = list(
+        ReservaStock.objects
+        .select_for_update()
+        .filter(pedido_id=pedido_id)
+        .values_list('id', 'producto_id', 'cantidad')
+    )
+    reservadas = defaultdict(int)
+    for _, producto_id, cantidad in reservas:
+        reservadas[producto_id] += cantidad
+
+    # Productos en orden de id (en SQLite no hace nada: la escritura ya es exclusiva)
+    filas = list(
+        Producto.objects
+        .select_for_update()
+        .filter(pk__in=lineas)
+        .order_by('id')
+        .values_list('id', 'stock', 'reservado')
+    )
+
+    faltantes = []
+    for producto_id, _, _ in filas:
+        cantidad = lineas[producto_id]
+        descontado = (
+            Producto.objects
+            .filter(pk=producto_id, stock__gte=cantidad)
+            .update(
+                stock=F('stock') - cantidad,
+                reservado=Greatest(F('reservado') - reservadas[producto_id], 0),
+            )
+        )
+        if not descontado:
+            faltantes.append(producto_id)
+
+    if faltantes:
+        nombres = Producto.objects.filter(pk__in=faltantes).values_list('nombre', flat=True)
+        raise SinStock(list(nombres))
+
+    # Las unidades ya salieron del stock: las reservas se cumplieron
+    ReservaStock.objects.filter(id__in=[r[0] for r in reservas]).delete()
+
+    # Lo reservado ya no estaba disponible: solo cambia la disponibilidad de
+    # lo que se vendió sin reserva. Las páginas cacheadas la muestran en
+    # vivo; el catálogo se invalida solo si algún producto se agotó
+    invalidar_agotados(
+        {pk: stock - reservado for pk, stock, reservado in filas},
+        {
+            pk: (stock - lineas[pk]) - max(reservado - reservadas[pk], 0)
+            for pk, stock, reservado in filas
+        },
+    )
+
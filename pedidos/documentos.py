@@ -0,0 +1,154 @@
+"""
+Generación en lote de boletas y facturas (DocumentoTributario).
+
+    1. Cada lote toma hasta `lote` pedidos pagados sin documento con
+       SELECT ... FOR UPDATE SKIP LOCKED: varios procesos pueden correr a
+       la vez y cada uno se lleva pedidos distintos.
+    2. Los montos salen de Pedido.total (IVA incluido) con Decimal y
+       redondeo de pesos: neto = round(total / 1,19), iva = total - neto.
+    3. Los folios no se piden uno por documento a SecuenciaFolio: cada
+       proceso reserva un bloque consecutivo en una transacción propia y
+       cortísima, y después lo va gastando sin tocar esa fila. La fila del
+       contador se bloquea una vez por bloque, no una vez por documento.
+    4. Los documentos del lote se insertan con un solo bulk_create.
+
+Es idempotente: un pedido con documento ya no califica y el OneToOne de
+DocumentoTributario.pedido impide duplicarlo. Lo que queda de un bloque al
+terminar el proceso no se reutiliza (como con las secuencias de la base):
+puede haber saltos de folio, nunca folios repetidos.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from .models import DatosFactura, DocumentoTributario, Pedido, SecuenciaFolio
+
+
+IVA = Decimal('0.19')
+TAMANO_LOTE = 500
+TAMANO_BLOQUE = 1_000
+
+
+def calcular_montos(total):
+    """(neto, iva, total) en pesos enteros a partir de un total con IVA incluido."""
+    total = Decimal(total).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+    neto = (total / (1 + IVA)).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+    return neto, total - neto, total
+
+
+def reservar_folios(tipo_documento, cantidad):
+    """
+    Aparta `cantidad` folios consecutivos de `tipo_documento` y devuelve el
+    range. Llamar fuera de cualquier transacción: así el bloqueo de la fila
+    de la secuencia dura solo este SELECT + UPDATE.
+    """
+    with transaction.atomic():
+        secuencia, _ = (
+            SecuenciaFolio.objects
+            .select_for_update()
+            .get_or_create(tipo_documento=tipo_documento)
+        )
+        inicio = secuencia.siguiente
+        SecuenciaFolio.objects.filter(pk=secuencia.pk).update(siguiente=inicio + cantidad)
+    return range(inicio, inicio + cantidad)
+
+
+class Folios:
+    """Folios ya reservados por este proceso y aún sin usar, por tipo."""
+
+    def __init__(self, bloque=TAMANO_BLOQUE):
+        self.bloque = bloque
+        self.reservas = 0
+        self._rangos = defaultdict(list)
+
+    def disponibles(self, tipo_documento):
+        return sum(len(r) for r in self._rangos[tipo_documento])
+
+    def tomar(self, tipo_documento):
+        rangos = self._rangos[tipo_documento]
+        folio = rangos[0].start
+        rangos[0] = rangos[0][1:]
+        if not rangos[0]:
+            rangos.pop(0)
+        return folio
+
+    def completar(self, faltantes):
+        """Reserva bloques nuevos para cubrir {tipo: cantidad}."""
+        for tipo_documento, cantidad in faltantes.items():
+            self.reservas += 1
+            self._rangos[tipo_documento].append(
+                reservar_folios(tipo_documento, max(cantidad, self.bloque))
+            )
+
+
+def pedidos_sin_documento(pedidos=None):
+    return (
+        (Pedido.objects.all() if pedidos is None else pedidos)
+        .filter(pagado=True, documento_tributario__isnull=True)
+        .exclude(estado='fallido')
+    )
+
+
+@transaction.atomic
+def _generar_lote(lote, folios, pedidos):
+    """
+    Devuelve (creados, faltantes). Si no hay folios suficientes no inserta
+    nada y devuelve cuántos faltan por tipo, para reservarlos fuera de la
+    transacción y reintentar.
+    """
+    pendientes = list(
+        pedidos_sin_documento(pedidos)
+        .annotate(con_factura=Exists(DatosFactura.objects.filter(pedido=OuterRef('pk'))))
+        .select_for_update(
+            of=('self',),
+            skip_locked=connection.features.has_select_for_update_skip_locked,
+        )
+        .order_by('id')
+        .values_list('id', 'total', 'con_factura')[:lote]
+    )
+    if not pendientes:
+        return 0, {}
+
+    necesarios = Counter('factura' if factura else 'boleta' for _, _, factura in pendientes)
+    faltantes = {
+        tipo: cantidad - folios.disponibles(tipo)
+        for tipo, cantidad in necesarios.items()
+        if cantidad > folios.disponibles(tipo)
+    }
+    if faltantes:
+        return 0, faltantes
+
+    documentos = []
+    for pedido_id, total, factura in pendientes:
+        tipo = 'factura' if factura else 'boleta'
+        neto, iva, total = calcular_montos(total)
+        documentos.append(DocumentoTributario(
+            pedido_id=pedido_id,
+            tipo_documento=tipo,
+            folio=str(folios.tomar(tipo)),
+            neto=neto,
+            iva=iva,
+            total=total,
+        ))
+    DocumentoTributario.objects.bulk_create(documentos)
+    return len(documentos), {}
+
+
+def generar_documentos(lote=TAMANO_LOTE, folios=None, pedidos=None):
+    """
+    Emite los documentos de todos los pedidos pagados que no tienen (o solo
+    de los del queryset `pedidos`), en lotes de `lote`, cada uno en su
+    propia transacción. Devuelve cuántos creó.
+    """
+    folios = folios or Folios()
+    creados = 0
+    while True:
+        nuevos, faltantes = _generar_lote(lote, folios, pedidos)
+        if faltantes:
+            folios.completar(faltantes)
+            continue
+        if not nuevos:
+            return creados
+        creados += nuevos
@@ -0,0 +1,135 @@
+"""
+Máquina de estados del Pedido.
+
+    carrito ──> pendiente_pago ──> pagado ──> enviado ──> entregado
+       ^             │               │           │
+       └─────────────┘               └───────────┴──> fallido
+    (carrito y pendiente_pago también pueden pasar directo a pagado/fallido
+     cuando el aviso de pago llega tarde)
+
+Todo cambio de `Pedido.estado` pasa por acá y deja una fila en
+TransicionPedido (quién, desde, hasta, cuándo). El UPDATE siempre es
+condicional al estado de origen (WHERE estado = desde), así dos cambios
+simultáneos sobre el mismo pedido no se pisan.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Pedido, TransicionPedido
+
+
+TRANSICIONES = {
+    'carrito': ['pendiente_pago', 'pagado', 'fallido'],
+    'pendiente_pago': ['carrito', 'pagado', 'fallido'],
+    'pagado': ['enviado', 'fallido'],
+    'enviado': ['entregado', 'fallido'],
+    'entregado': [],
+    'fallido': [],
+}
+
+# Pedidos que el comprador todavía puede editar y pagar. Un pedido 'fallido'
+# (p. ej. sin stock al confirmar) ya no: el checkout parte uno nuevo
+EN_CURSO = ['carrito', 'pendiente_pago']
+
+# Lo que el vendedor puede hacer a mano desde el panel
+TRANSICIONES_PANEL = {
+    'pagado': ['enviado', 'fallido'],
+    'enviado': ['entregado', 'fallido'],
+}
+
+
+# Pedidos por UPDATE en los cambios masivos: un id__in más largo pasa el
+# límite de parámetros por sentencia de SQLite
+TAMANO_LOTE = 500
+
+
+class TransicionInvalida(Exception):
+    pass
+
+
+def puede_pasar(desde, hasta, transiciones=TRANSICIONES):
+    return hasta in transiciones.get(desde, [])
+
+
+def origenes(hasta, transiciones=TRANSICIONES):
+    """Estados desde los que se puede llegar a `hasta`."""
+    return [desde for desde, destinos in transiciones.items() if hasta in destinos]
+
+
+def aplicar(pedido, hasta, usuario=None, origen=''):
+    """
+    Para los flujos que ya guardan el pedido junto con otros campos
+    (checkout, confirmación de pago): valida, deja `hasta` en pedido.estado
+    (sin guardar) y registra la transición. Quedarse en el mismo estado
+    no se registra. Llamar dentro de la misma transacción que el save().
+    """
+    desde = pedido.estado
+    if desde == hasta:
+        return
+    if not puede_pasar(desde, hasta):
+        raise TransicionInvalida(f'Pedido {pedido.pk}: {desde} -> {hasta} no está permitido')
+
+    pedido.estado = hasta
+    TransicionPedido.objects.create(
+        pedido=pedido, desde=desde, hasta=hasta, usuario=usuario, origen=origen,
+    )
+
+
+@transaction.atomic
+def cambiar_estado(pedido, hasta, usuario=None, origen='', transiciones=TRANSICIONES):
+    """
+    Cambia el estado de un pedido con un UPDATE condicional. Devuelve True
+    si cambió; lanza TransicionInvalida si el paso no está permitido o si
+    otro proceso lo cambió antes.
+    """
+    desde = pedido.estado
+    if not puede_pasar(desde, hasta, transiciones):
+        raise TransicionInvalida(f'Pedido {pedido.pk}: {desde} -> {hasta} no está permitido')
+
+    ahora = timezone.now()
+    cambiados = (
+        Pedido.objects
+        .filter(pk=pedido.pk, estado=desde)
+        .update(estado=hasta, actualizado=ahora)
+    )
+    if not cambiados:
+        raise TransicionInvalida(f'Pedido {pedido.pk} ya no está en estado {desde}')
+
+    TransicionPedido.objects.create(
+        pedido=pedido, desde=desde, hasta=hasta, usuario=usuario, origen=origen,
+    )
+    pedido.estado = hasta
+    pedido.actualizado = ahora
+    return True
+
+
+@transaction.atomic
+def cambiar_estados(pedidos, hasta, usuario=None, origen='', transiciones=TRANSICIONES):
+    """
+    Cambio masivo: pasa a `hasta` todos los pedidos del queryset `pedidos`
+    que estén en un estado que lo permita. Un SELECT ... FOR UPDATE y después
+    un UPDATE y un INSERT para la bitácora por cada TAMANO_LOTE pedidos.
+    Devuelve la cantidad de pedidos cambiados.
+    """
+    validos = origenes(hasta, transiciones)
+    actuales = list(
+        pedidos
+        .filter(estado__in=validos)
+        .select_for_update(of=('self',))
+        .order_by('id')
+        .values_list('id', 'estado')
+    )
+    if not actuales:
+        return 0
+
+    ahora = timezone.now()
+    for inicio in range(0, len(actuales), TAMANO_LOTE):
+        lote = actuales[inicio:inicio + TAMANO_LOTE]
+        Pedido.objects.filter(id__in=[pk for pk, _ in lote], estado__in=validos).update(
+            estado=hasta, actualizado=ahora,
+        )
+        TransicionPedido.objects.bulk_create([
+            TransicionPedido(pedido_id=pk, desde=desde, hasta=hasta, usuario=usuario, origen=origen)
+            for pk, desde in lote
+        ])
+    return len(actuales)
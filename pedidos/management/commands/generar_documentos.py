@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pedidos.documentos import Folios, generar_documentos, TAMANO_BLOQUE, TAMANO_LOTE
+
+
+class Command(BaseCommand):
+    help = (
+        "Emite boleta o factura para los pedidos pagados que aún no tienen "
+        "documento tributario. Se puede correr en varios procesos a la vez y "
+        "repetir sin duplicar nada. Pensado para correr desde cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE,
+                            help='Pedidos por transacción.')
+        parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE,
+                            help='Folios que se reservan de una vez.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        creados = generar_documentos(lote=options['lote'], folios=Folios(options['bloque']))
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{creados} documento(s) tributario(s) emitido(s) en {segundos:.2f} s."
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pedidos.reservas import liberar_vencidas, TAMANO_LOTE
+
+
+class Command(BaseCommand):
+    help = (
+        "Devuelve al stock disponible las reservas de checkout vencidas, en "
+        "lotes. Pensado para correr cada pocos minutos desde cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE)
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        liberadas = liberar_vencidas(lote=options['lote'])
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{liberadas} reserva(s) vencida(s) liberada(s) en {segundos:.2f} s."
+        ))
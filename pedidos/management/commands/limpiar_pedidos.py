@@ -0,0 +1,86 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from pedidos.models import Pedido
+from pedidos.reservas import liberar_pedidos
+
+
+ESTADOS_ABANDONADOS = ['carrito', 'pendiente_pago']
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra los pedidos abandonados (estado 'carrito' o 'pendiente_pago', sin "
+        "pagar) que no se tocan hace más de --dias días. Avanza por id en lotes "
+        "cortos, cada uno en su propia transacción, para no bloquear las tablas. "
+        "Pensado para correr de noche desde cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=7)
+        parser.add_argument('--lote', type=int, default=500)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo cuenta cuántos pedidos se borrarían.',
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['dias'])
+        abandonados = (
+            Pedido.objects
+            .filter(
+                estado__in=ESTADOS_ABANDONADOS,
+                pagado=False,
+                actualizado__lt=limite,
+                # Nunca los que tienen boleta/factura (PROTECT) o un pago aprobado
+                documento_tributario__isnull=True,
+            )
+            .exclude(estado_pago='aprobado')
+        )
+
+        if options['dry_run']:
+            self.stdout.write(
+                f"Se borrarían {abandonados.count()} pedido(s) sin actividad desde "
+                f"{limite:%Y-%m-%d %H:%M}."
+            )
+            return
+
+        inicio = time.perf_counter()
+        filas = Counter()
+        ultimo_id = 0
+        while True:
+            ids = list(
+                abandonados
+                .filter(id__gt=ultimo_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:options['lote']]
+            )
+            if not ids:
+                break
+            ultimo_id = ids[-1]
+
+            with transaction.atomic():
+                # Re-filtramos dentro de la transacción: si alguno se pagó o
+                # se retomó recién, ya no cumple y no se toca.
+                ids = list(
+                    abandonados.select_for_update(of=('self',))
+                    .filter(id__in=ids).values_list('id', flat=True)
+                )
+                # Las reservas que sigan vivas devuelven sus unidades al disponible
+                liberar_pedidos(ids)
+                _, borradas = Pedido.objects.filter(id__in=ids).delete()
+            filas.update(borradas)
+
+        segundos = time.perf_counter() - inicio
+        detalle = ', '.join(
+            f'{modelo.split(".")[-1]}: {cantidad}' for modelo, cantidad in sorted(filas.items())
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{filas['pedidos.Pedido']} pedido(s) abandonado(s) borrado(s) en {segundos:.2f} s"
+            + (f" ({detalle})" if detalle else "") + "."
+        ))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0005_alter_datosfactura_ciudad_facturacion_and_more'),
+        ('productos', '0011_producto_reservado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('expira', models.DateTimeField(db_index=True)),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='pedidos.pedido')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='productos.producto')),
+            ],
+        ),
+    ]
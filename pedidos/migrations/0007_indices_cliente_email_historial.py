@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:27
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0006_reservastock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='cliente_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['cliente', '-creado', '-id'], name='pedido_cliente_creado_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def crear_indice_prefijo_email(apps, schema_editor):
+    # Búsqueda por comienzo de email en el panel: LOWER(email) LIKE 'abc%'.
+    # Postgres solo usa un índice para LIKE con varchar_pattern_ops; en
+    # SQLite la vista usa un rango sobre cliente_email_lower_idx.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS cliente_email_prefijo_idx '
+            'ON pedidos_cliente (LOWER(email) varchar_pattern_ops)'
+        )
+
+
+def borrar_indice_prefijo_email(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS cliente_email_prefijo_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0007_indices_cliente_email_historial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado', '-creado', '-id'], name='pedido_estado_creado_idx'),
+        ),
+        migrations.RunPython(crear_indice_prefijo_email, borrar_indice_prefijo_email),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0008_pedido_estado_creado_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransicionPedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('desde', models.CharField(choices=[('carrito', 'Carrito'), ('pendiente_pago', 'Pendiente de pago'), ('pagado', 'Pagado'), ('enviado', 'Enviado'), ('entregado', 'Entregado'), ('fallido', 'Fallido')], max_length=20)),
+                ('hasta', models.CharField(choices=[('carrito', 'Carrito'), ('pendiente_pago', 'Pendiente de pago'), ('pagado', 'Pagado'), ('enviado', 'Enviado'), ('entregado', 'Entregado'), ('fallido', 'Fallido')], max_length=20)),
+                ('origen', models.CharField(blank=True, max_length=30)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transiciones', to='pedidos.pedido')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transiciones_pedido', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['creado', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0009_transicionpedido'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['actualizado'], name='pedido_actualizado_idx'),
+        ),
+    ]
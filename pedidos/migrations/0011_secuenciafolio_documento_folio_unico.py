@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0010_pedido_pedido_actualizado_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaFolio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_documento', models.CharField(choices=[('boleta', 'Boleta'), ('factura', 'Factura')], max_length=10, unique=True)),
+                ('siguiente', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='documentotributario',
+            constraint=models.UniqueConstraint(condition=models.Q(('folio', ''), _negated=True), fields=('tipo_documento', 'folio'), name='documento_folio_unico'),
+        ),
+    ]
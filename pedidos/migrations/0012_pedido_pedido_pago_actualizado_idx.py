@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0011_secuenciafolio_documento_folio_unico'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado_pago', 'actualizado'], name='pedido_pago_actualizado_idx'),
+        ),
+    ]
@@ -1,4 +1,8 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce, Lower
 from productos.models import Producto
 from django.contrib.auth.models import User
 
@@ -13,6 +17,12 @@ class Cliente(models.Model):
     )
     email = models.EmailField(unique=True)
 
+    class Meta:
+        indexes = [
+            # Búsqueda por email sin importar mayúsculas: WHERE LOWER(email) = ...
+            models.Index(Lower('email'), name='cliente_email_lower_idx'),
+        ]
+
     def __str__(self):
         return self.email
     
@@ -84,12 +94,35 @@ class Pedido(models.Model):
 
     class Meta:
         ordering = ['-creado']
+        indexes = [
+            # Panel del vendedor: filtra por estado y pagina por (creado, id)
+            models.Index(
+                fields=['estado', '-creado', '-id'],
+                name='pedido_estado_creado_idx',
+            ),
+            # Historial de un cliente (mis_pedidos), paginado por (creado, id)
+            models.Index(
+                fields=['cliente', '-creado', '-id'],
+                name='pedido_cliente_creado_idx',
+            ),
+            # Resúmenes de ventas del panel: pedidos tocados desde la marca
+            models.Index(fields=['actualizado'], name='pedido_actualizado_idx'),
+            # Conciliación de pagos: pendientes que no se mueven hace rato
+            models.Index(fields=['estado_pago', 'actualizado'], name='pedido_pago_actualizado_idx'),
+        ]
 
     def __str__(self):
         return f'Pedido {self.id} ({self.estado})'
 
     def calcular_total(self):
-        return sum(detalle.subtotal for detalle in self.detalles.all())
+        # Un solo SUM en la base, sin traer los detalles
+        return self.detalles.aggregate(
+            total=Coalesce(
+                Sum(F('cantidad') * F('precio_unitario')),
+                Value(Decimal('0')),
+                output_field=models.DecimalField(),
+            )
+        )['total']
 
     def actualizar_total(self, save=True):
         self.total = self.calcular_total()
@@ -120,6 +153,59 @@ class PedidoDetalle(models.Model):
         return f'{self.producto.nombre} x {self.cantidad}'
 
 
+class TransicionPedido(models.Model):
+    """
+    Bitácora de cambios de estado de los pedidos (solo se agregan filas).
+    La escriben las funciones de pedidos/estados.py.
+    """
+    pedido = models.ForeignKey(
+        Pedido,
+        related_name='transiciones',
+        on_delete=models.CASCADE,
+    )
+    desde = models.CharField(max_length=20, choices=Pedido.ESTADO_CHOICES)
+    hasta = models.CharField(max_length=20, choices=Pedido.ESTADO_CHOICES)
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='transiciones_pedido',
+    )
+    # Quién originó el cambio cuando no es una persona: 'checkout', 'pago', 'panel'...
+    origen = models.CharField(max_length=30, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['creado', 'id']
+
+    def __str__(self):
+        return f'Pedido {self.pedido_id}: {self.desde} -> {self.hasta}'
+
+
+class ReservaStock(models.Model):
+    """
+    Unidades apartadas para un pedido mientras se paga. La suma de las
+    reservas vivas de un producto está en Producto.reservado, así el stock
+    disponible se lee de la misma fila sin agregar esta tabla.
+    """
+    producto = models.ForeignKey(
+        Producto,
+        related_name='reservas',
+        on_delete=models.CASCADE,
+    )
+    pedido = models.ForeignKey(
+        Pedido,
+        related_name='reservas',
+        on_delete=models.CASCADE,
+    )
+    cantidad = models.PositiveIntegerField()
+    expira = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f'{self.cantidad} x {self.producto_id} (pedido {self.pedido_id})'
+
+
 class DatosEnvio(models.Model):
     pedido = models.OneToOneField(
         Pedido,
@@ -203,6 +289,32 @@ class DocumentoTributario(models.Model):
 
     creado = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # Un folio nunca se repite dentro del mismo tipo de documento
+            models.UniqueConstraint(
+                fields=['tipo_documento', 'folio'],
+                condition=~models.Q(folio=''),
+                name='documento_folio_unico',
+            ),
+        ]
+
     def __str__(self):
         return f'{self.tipo_documento.upper()} #{self.folio or "SIN FOLIO"}'
 
+
+class SecuenciaFolio(models.Model):
+    """
+    Próximo folio libre por tipo de documento. Los procesos no lo piden de
+    a uno: reservan bloques (ver pedidos/documentos.py).
+    """
+    tipo_documento = models.CharField(
+        max_length=10,
+        choices=DocumentoTributario.TIPO_CHOICES,
+        unique=True,
+    )
+    siguiente = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f'{self.tipo_documento}: próximo folio {self.siguiente}'
+
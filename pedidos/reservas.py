@@ -0,0 +1,178 @@
+"""
+Reservas de stock durante el checkout.
+
+Al iniciar el checkout se apartan las unidades del pedido por
+RESERVA_STOCK_MINUTOS con un solo UPDATE condicional para todo el carrito:
+
+    UPDATE productos_producto
+       SET reservado = reservado + CASE id WHEN 1 THEN 2 WHEN 7 THEN 1 END
+     WHERE id IN (1, 7) AND stock >= reservado + CASE ... END
+
+Si el UPDATE toca menos filas que productos hay, a alguno le faltó stock y
+se deshace todo. Solo se bloquean las filas de los productos que se están
+comprando (nada de locks globales), y antes se toman en orden de id, así
+dos checkouts con los mismos productos no se bloquean en cruz.
+
+Producto.reservado es la suma de las reservas vivas, por eso el disponible
+(stock - reservado) sale de la misma fila. Las reservas vencidas las
+devuelve `manage.py liberar_reservas` en lotes. El catálogo cacheado
+muestra la disponibilidad en vivo: reservar o liberar solo lo invalida si
+un producto se agota o vuelve a tener stock (ver productos/cache.py).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from productos.cache import invalidar_agotados
+from productos.models import Producto
+from .models import ReservaStock
+
+
+TAMANO_LOTE = 500
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, producto_id, nombre=''):
+        self.producto_id = producto_id
+        self.nombre = nombre
+        super().__init__(f'No hay stock suficiente de "{nombre or producto_id}"')
+
+
+class _Faltante(Exception):
+    pass
+
+
+def duracion_reserva():
+    return timedelta(minutes=getattr(settings, 'RESERVA_STOCK_MINUTOS', 30))
+
+
+@transaction.atomic
+def reservar(pedido, lineas):
+    """
+    Aparta las unidades de `lineas` [(producto_id, cantidad), ...] para el
+    pedido. Todo o nada: si falta stock de un producto lanza
+    StockInsuficiente y se deshacen las reservas ya hechas.
+    """
+    cantidades = defaultdict(int)
+    for producto_id, cantidad in lineas:
+        cantidades[producto_id] += cantidad
+
+    try:
+        with transaction.atomic():
+            if not _sumar_reservado(cantidades, condicional=True):
+                raise _Faltante()
+    except _Faltante:
+        # Ya se deshizo lo que alcanzó a apartarse: buscamos a quién le faltó
+        for producto_id, nombre, stock, reservado in (
+            Producto.objects
+            .filter(pk__in=cantidades)
+            .values_list('pk', 'nombre', 'stock', 'reservado')
+        ):
+            if stock - reservado < cantidades[producto_id]:
+                raise StockInsuficiente(producto_id, nombre)
+        raise StockInsuficiente(next(iter(cantidades)))
+
+    expira = timezone.now() + duracion_reserva()
+    ReservaStock.objects.bulk_create([
+        ReservaStock(pedido=pedido, producto_id=producto_id, cantidad=cantidad, expira=expira)
+        for producto_id, cantidad in cantidades.items()
+    ])
+
+
+def _devolver(reservas):
+    """
+    Borra las reservas [(id, producto_id, cantidad), ...] y descuenta sus
+    unidades de Producto.reservado (un UPDATE por producto).
+    """
+    if not reservas:
+        return 0
+
+    por_producto = defaultdict(int)
+    for _, producto_id, cantidad in reservas:
+        por_producto[producto_id] += cantidad
+
+    ReservaStock.objects.filter(id__in=[r[0] for r in reservas]).delete()
+    _sumar_reservado({pk: -cantidad for pk, cantidad in por_producto.items()})
+    return len(reservas)
+
+
+def _sumar_reservado(cantidades, condicional=False):
+    """
+    Suma `cantidades` {producto_id: n} (n puede ser negativo) a
+    Producto.reservado en un solo UPDATE. Con `condicional`, solo donde
+    alcanza el stock; devuelve cuántas filas cambiaron.
+    """
+    if not cantidades:
+        return True
+
+    # Primero se bloquean las filas en orden de id (en SQLite no hace falta:
+    # la escritura ya es exclusiva)
+    filas = list(
+        Producto.objects.select_for_update()
+        .filter(pk__in=cantidades).order_by('pk').values_list('pk', 'stock', 'reservado')
+    )
+
+    delta = Case(
+        *[When(pk=pk, then=Value(n)) for pk, n in cantidades.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    productos = Producto.objects.filter(pk__in=cantidades)
+    if condicional:
+        productos = productos.filter(stock__gte=F('reservado') + delta)
+    actualizados = productos.update(reservado=Greatest(F('reservado') + delta, 0))
+
+    # Las páginas cacheadas muestran la disponibilidad en vivo; solo hay que
+    # invalidar si un producto se agotó o volvió a tener stock
+    invalidar_agotados(
+        {pk: stock - reservado for pk, stock, reservado in filas},
+        {pk: stock - max(reservado + cantidades[pk], 0) for pk, stock, reservado in filas},
+    )
+    return actualizados == len(cantidades)
+
+
+def _bloquear(queryset):
+    # En Postgres, SKIP LOCKED deja pasar a otro proceso que ya está
+    # liberando las mismas filas en vez de esperarlo.
+    return queryset.select_for_update(
+        skip_locked=connection.features.has_select_for_update_skip_locked
+    )
+
+
+def liberar(pedido_id):
+    """Devuelve todas las reservas de un pedido (pago rechazado, checkout reiniciado...)."""
+    return liberar_pedidos([pedido_id])
+
+
+@transaction.atomic
+def liberar_pedidos(pedido_ids):
+    """Devuelve las reservas de varios pedidos a la vez."""
+    reservas = list(
+        _bloquear(ReservaStock.objects.filter(pedido_id__in=pedido_ids))
+        .values_list('id', 'producto_id', 'cantidad')
+    )
+    return _devolver(reservas)
+
+
+def liberar_vencidas(lote=TAMANO_LOTE, ahora=None):
+    """
+    Devuelve las reservas vencidas en lotes de `lote` filas, cada lote en
+    su propia transacción corta. Retorna cuántas se liberaron.
+    """
+    ahora = ahora or timezone.now()
+    total = 0
+    while True:
+        with transaction.atomic():
+            reservas = list(
+                _bloquear(ReservaStock.objects.filter(expira__lte=ahora))
+                .order_by('expira', 'id')
+                .values_list('id', 'producto_id', 'cantidad')[:lote]
+            )
+            total += _devolver(reservas)
+        if len(reservas) < lote:
+            return total
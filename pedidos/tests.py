@@ -1,3 +1,180 @@
-from django.test import TestCase
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import connection, close_old_connections
+from django.db.models import Count, F
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from productos.models import Producto, Categoria
+from .confirmacion import confirmar_pedido, CONFIRMADO, SIN_STOCK
+from .documentos import Folios, generar_documentos
+from . import estados
+from .models import (
+    DatosFactura, DocumentoTributario, Pedido, PedidoDetalle, ReservaStock, SecuenciaFolio,
+    TransicionPedido,
+)
+from .reservas import reservar, liberar_vencidas
+
+
+def _en_hilos(tareas, hilos=8):
+    """Corre las funciones `tareas` a la vez, cada hilo con su propia conexión."""
+    def correr(tarea):
+        try:
+            return tarea()
+        finally:
+            close_old_connections()
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return list(pool.map(correr, tareas))
+
+
+class ConfirmacionConcurrenteTests(TransactionTestCase):
+    """
+    Commits reales y varias conexiones a la vez: en Postgres estos tests
+    detectan deadlocks y descuentos dobles; en SQLite las escrituras se
+    serializan (WAL + IMMEDIATE) y comprueban que nada falle por "locked".
+    """
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Prueba concurrencia')
+
+    def _producto(self, nombre, stock):
+        return Producto.objects.create(
+            nombre=nombre, precio=1_000, stock=stock, categoria=self.categoria, activo=False,
+        )
+
+    def _pedido(self, *productos):
+        pedido = Pedido.objects.create(estado='pendiente_pago', total=1_000 * len(productos))
+        PedidoDetalle.objects.bulk_create(
+            PedidoDetalle(pedido=pedido, producto=p, cantidad=1, precio_unitario=1_000)
+            for p in productos
+        )
+        return pedido
+
+    def _confirmar(self, pedido_id):
+        return lambda: confirmar_pedido(pedido_id, f'prueba-{pedido_id}').estado
+
+    def test_no_vende_de_mas(self):
+        a = self._producto('Prueba A', stock=20)
+        b = self._producto('Prueba B', stock=60)
+        # La mitad trae las líneas en orden inverso: sin el bloqueo ordenado
+        # por id esto produce deadlocks en Postgres
+        pedidos = [self._pedido(*((a, b) if i % 2 else (b, a))) for i in range(60)]
+
+        estados = Counter(_en_hilos([self._confirmar(p.pk) for p in pedidos]))
+
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual(estados, {CONFIRMADO: 20, SIN_STOCK: 40})
+        self.assertEqual(a.stock, 0)
+        self.assertEqual(b.stock, 40)
+        self.assertEqual(Pedido.objects.filter(pagado=True).count(), 20)
+
+    def test_confirmar_y_liberar_vencidas_no_descuentan_dos_veces(self):
+        producto = self._producto('Prueba reservas', stock=100)
+
+        # Reserva viva de otro comprador: nadie debe tocarla
+        ajeno = self._pedido(producto)
+        reservar(ajeno, [(producto.pk, 5)])
+
+        # Pedidos que se pagan justo cuando su reserva ya venció: el barrido
+        # de vencidas y la confirmación compiten por las mismas reservas
+        pedidos = [self._pedido(producto) for _ in range(30)]
+        for pedido in pedidos:
+            reservar(pedido, [(producto.pk, 1)])
+        ReservaStock.objects.filter(pedido__in=pedidos).update(
+            expira=timezone.now() - timedelta(minutes=1),
+        )
+
+        tareas = [self._confirmar(p.pk) for p in pedidos]
+        for i in range(0, len(tareas), 5):
+            tareas.insert(i, lambda: liberar_vencidas(lote=3))
+        _en_hilos(tareas)
+
+        producto.refresh_from_db()
+        self.assertEqual(Pedido.objects.filter(pk__in=[p.pk for p in pedidos], pagado=True).count(), 30)
+        self.assertEqual(producto.stock, 70)
+        # Cada reserva vencida se devolvió una sola vez (por el barrido o al
+        # confirmar): solo queda la del otro comprador
+        self.assertEqual(producto.reservado, 5)
+        self.assertEqual(
+            list(ReservaStock.objects.values_list('pedido_id', 'cantidad')),
+            [(ajeno.pk, 5)],
+        )
+
+
+class DocumentosConcurrentesTests(TransactionTestCase):
+    """Varios procesos de generar_documentos sobre los mismos pedidos y folios."""
+
+    def test_un_documento_por_pedido_sin_folios_repetidos(self):
+        pedidos = Pedido.objects.bulk_create(
+            Pedido(estado='pagado', pagado=True, estado_pago='aprobado', total=990 + i * 7)
+            for i in range(400)
+        )
+        # Uno de cada diez pide factura
+        DatosFactura.objects.bulk_create(
+            DatosFactura(pedido=p, rut_facturacion='11111111-1') for p in pedidos[::10]
+        )
+
+        # Bloques chicos: los hilos se reparten pedidos y reservan folios muchas veces
+        creados = _en_hilos([lambda: generar_documentos(lote=25, folios=Folios(30))] * 4, hilos=4)
+
+        documentos = DocumentoTributario.objects.all()
+        self.assertEqual(sum(creados), 400)
+        self.assertEqual(documentos.count(), 400)
+        self.assertEqual(documentos.filter(tipo_documento='factura').count(), 40)
+        self.assertFalse(
+            documentos.values('tipo_documento', 'folio').annotate(n=Count('id')).filter(n__gt=1)
+        )
+        self.assertFalse(documentos.exclude(total=F('neto') + F('iva')))
+        # Ningún folio emitido queda por delante de su secuencia
+        for tipo, siguiente in SecuenciaFolio.objects.values_list('tipo_documento', 'siguiente'):
+            folios = documentos.filter(tipo_documento=tipo).values_list('folio', flat=True)
+            self.assertLess(max(map(int, folios)), siguiente)
+
+        # Una segunda pasada no encuentra nada que emitir
+        self.assertEqual(generar_documentos(lote=25), 0)
+
+
+class CheckoutFallidoTests(TestCase):
+    """Un pedido que quedó 'fallido' (sin stock al confirmar) no se retoma."""
+
+    def setUp(self):
+        self.pedido = Pedido.objects.create(estado='fallido', estado_pago='aprobado', total=1_000)
+        sesion = self.client.session
+        sesion['checkout_pedido_id'] = self.pedido.pk
+        sesion.save()
+
+    def test_pedido_crear_lo_saca_de_la_sesion(self):
+        respuesta = self.client.post(reverse('pedidos:pedido_crear'), {'email': 'a@b.cl'})
+        self.assertRedirects(respuesta, reverse('carrito:detalle'), fetch_redirect_response=False)
+        self.assertNotIn('checkout_pedido_id', self.client.session)
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.estado, 'fallido')
+
+    def test_no_se_puede_volver_a_pagar(self):
+        for vista in ('pagos:pagar_mercadopago', 'pagos:transbank_iniciar'):
+            respuesta = self.client.get(reverse(vista, args=[self.pedido.pk]))
+            self.assertEqual(respuesta.status_code, 404)
+
+
+class CambioMasivoTests(TestCase):
+    def test_todos_los_del_estado_en_lotes(self):
+        Pedido.objects.bulk_create(Pedido(estado='pagado', pagado=True, total=1_000) for _ in range(7))
+        Pedido.objects.create(estado='enviado', pagado=True, total=1_000)
+        self.client.force_login(User.objects.create_user('vendedor', is_staff=True))
+
+        with mock.patch.object(estados, 'TAMANO_LOTE', 3):
+            self.client.post(reverse('pedidos:panel_pedidos_cambiar_estado'), {
+                'estado': 'enviado', 'todos': 'pagado',
+            })
+
+        self.assertEqual(Pedido.objects.filter(estado='enviado').count(), 8)
+        self.assertEqual(TransicionPedido.objects.filter(desde='pagado', hasta='enviado', origen='panel').count(), 7)
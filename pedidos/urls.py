@@ -16,6 +16,8 @@ urlpatterns = [
 
      # --- Panel vendedor ---
     path('panel/', views.panel_pedidos, name='panel_pedidos'),
+    path('panel/exportar/', views.panel_pedidos_exportar, name='panel_pedidos_exportar'),
+    path('panel/estado/', views.panel_pedidos_cambiar_estado, name='panel_pedidos_cambiar_estado'),
     path('panel/<int:pedido_id>/', views.panel_pedido_detalle, name='panel_pedido_detalle'),
     path('panel/<int:pedido_id>/estado/', views.panel_pedido_cambiar_estado, name='panel_pedido_cambiar_estado'),
 ]
\ No newline at end of file
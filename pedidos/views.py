@@ -1,15 +1,23 @@
+import tempfile
+from datetime import date
 from decimal import Decimal
 from urllib import request
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db import transaction
+from django.db import connection, transaction
+from django.http import FileResponse, StreamingHttpResponse
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 
 from .models import Pedido, PedidoDetalle, DatosEnvio, DatosFactura, Cliente
+from .reservas import reservar, liberar, StockInsuficiente
+from . import estados, reportes
 from .forms import ClienteEmailForm, DatosEnvioForm, DatosFacturaForm, PedidoPagoForm
 from carrito.cart import Cart
-from django.db.models import Q
+from django.db.models import Count, Q
+from django.db.models.functions import Lower
+from common.paginacion import paginar_keyset
 from usuarios.models import Perfil, PerfilFacturacion
 
 from django.core.exceptions import PermissionDenied
@@ -19,29 +27,47 @@ import mercadopago
 from django.conf import settings
 
 
-@login_required
-def mis_pedidos(request):
-    user = request.user
-    q = Q()
+def _usuario(request):
+    return request.user if request.user.is_authenticated else None
 
-    # 1) Si el user tiene Cliente asociado por OneToOne
-    cliente = getattr(user, 'cliente', None)
-    if cliente:
-        q |= Q(cliente=cliente)
 
-    # 2) Además, si el user tiene email, buscar por email del cliente
-    if user.email:
-        q |= Q(cliente__email__iexact=user.email.strip())
+# Pedidos por página en el historial del cliente
+PEDIDOS_POR_PAGINA = 20
 
-    pedidos = (
-        Pedido.objects
+
+def ids_cliente(user):
+    """
+    Ids de los Cliente del usuario: el vinculado por OneToOne y el que tenga
+    su email (sin importar mayúsculas, usando el índice sobre LOWER(email)).
+    Una sola consulta, sobre Cliente y no sobre los pedidos.
+    """
+    q = Q(user=user)
+    email = (user.email or '').strip().lower()
+    if email:
+        q |= Q(email_normalizado=email)
+
+    return list(
+        Cliente.objects
+        .annotate(email_normalizado=Lower('email'))
         .filter(q)
-        .prefetch_related('detalles__producto')
-        .order_by('-creado')
-        .distinct()
+        .values_list('id', flat=True)
     )
 
-    return render(request, 'pedidos/mis_pedidos.html', {'pedidos': pedidos})
+
+@login_required
+def mis_pedidos(request):
+    pedidos, siguiente_cursor = paginar_keyset(
+        Pedido.objects.filter(cliente_id__in=ids_cliente(request.user)),
+        request.GET.get('cursor'),
+        PEDIDOS_POR_PAGINA,
+        campo='creado',
+    )
+
+    return render(request, 'pedidos/mis_pedidos.html', {
+        'pedidos': pedidos,
+        'siguiente_cursor': siguiente_cursor,
+        'es_primera_pagina': not request.GET.get('cursor'),
+    })
 
 
 
@@ -50,11 +76,22 @@ def mis_pedidos(request):
 
 @transaction.atomic
 def checkout_iniciar(request):
+    """
+    Pasa el carrito a un Pedido en estado "carrito". Si en la sesión ya hay
+    un pedido sin pagar (doble clic, volver atrás y reintentar) se reutiliza
+    y se le reescriben las líneas, en vez de dejar un pedido huérfano por
+    cada intento. La cantidad de consultas no depende del tamaño del carrito.
+    """
     cart = Cart(request)
 
     if len(cart) == 0:
         return redirect('productos:index')
 
+    items = list(cart)
+    if not items:
+        # Carrito con productos que ya no existen
+        return redirect('carrito:detalle')
+
     # Si hay usuario logueado, intenta vincularlo a un Cliente
     cliente = None
     if request.user.is_authenticated:
@@ -66,30 +103,62 @@ def checkout_iniciar(request):
             cliente.user = request.user
             cliente.save(update_fields=['user'])
 
-    # 1) Crear Pedido EN ESTADO "carrito"
-    pedido = Pedido.objects.create(
-        cliente=cliente,          # puede ser None si es invitado
-        estado='carrito',
-        estado_pago='pendiente',
-        pagado=False,
-    )
+    # 1) Reutilizar el pedido en curso de la sesión, o crear uno en estado "carrito"
+    pedido = None
+    pedido_id = request.session.get('checkout_pedido_id')
+    if pedido_id:
+        pedido = (
+            Pedido.objects
+            .select_for_update()
+            .filter(id=pedido_id, pagado=False, estado__in=estados.EN_CURSO)
+            .first()
+        )
 
-    # 2) Crear detalles desde el carrito
-    for item in cart:
-        PedidoDetalle.objects.create(
+    if pedido is None:
+        pedido = Pedido.objects.create(
+            cliente=cliente,          # puede ser None si es invitado
+            estado='carrito',
+            estado_pago='pendiente',
+            pagado=False,
+        )
+    else:
+        # Las líneas y las reservas anteriores se reemplazan por las del carrito actual
+        pedido.detalles.all().delete()
+        liberar(pedido.id)
+
+    # 2) Crear todos los detalles en un solo INSERT
+    detalles = PedidoDetalle.objects.bulk_create([
+        PedidoDetalle(
             pedido=pedido,
             producto=item['producto'],
             precio_unitario=item['precio'],
             cantidad=item['quantity'],
         )
+        for item in items
+    ])
+
+    # 3) Apartar el stock mientras se paga (todo o nada)
+    try:
+        reservar(pedido, [(item['producto'].id, item['quantity']) for item in items])
+    except StockInsuficiente as e:
+        transaction.set_rollback(True)
+        messages.error(
+            request,
+            f'Ya no queda stock suficiente de “{e.nombre}”. Ajusta la cantidad en tu carrito.'
+        )
+        return redirect('carrito:detalle')
 
-    # 3) Calcular total
-    pedido.actualizar_total(save=True)
+    # 4) Total desde los valores recién insertados (sin releer los detalles)
+    pedido.cliente = pedido.cliente or cliente
+    pedido.total = sum(detalle.subtotal for detalle in detalles)
+    estados.aplicar(pedido, 'carrito', usuario=_usuario(request), origen='checkout')
+    pedido.estado_pago = 'pendiente'
+    pedido.save(update_fields=['cliente', 'total', 'estado', 'estado_pago', 'actualizado'])
 
-    # 4) Guardar el id del pedido en la sesión para usarlo en el checkout
+    # 5) Guardar el id del pedido en la sesión para usarlo en el checkout
     request.session['checkout_pedido_id'] = pedido.id
 
-    # 5) Redirigir a la vista que muestra el formulario de datos + pago
+    # 6) Redirigir a la vista que muestra el formulario de datos + pago
     return redirect('pedidos:pedido_crear')
 
 
@@ -97,19 +166,11 @@ def checkout_iniciar(request):
 
 @login_required
 def pedido_detalle(request, pedido_id):
-    user = request.user
-
     # Aseguramos que solo pueda ver pedidos suyos (mismo criterio que mis_pedidos)
-    q_cliente = Q()
-    cliente = getattr(user, 'cliente', None)
-    if cliente:
-        q_cliente |= Q(cliente=cliente)
-    if user.email:
-        q_cliente |= Q(cliente__email__iexact=user.email.strip())
-
     pedido = get_object_or_404(
         Pedido.objects.prefetch_related('detalles__producto'),
-        Q(id=pedido_id) & q_cliente
+        id=pedido_id,
+        cliente_id__in=ids_cliente(request.user),
     )
 
     envio = DatosEnvio.objects.filter(pedido=pedido).first()
@@ -134,7 +195,18 @@ def pedido_crear(request):
         messages.error(request, 'No se encontró un pedido en curso.')
         return redirect('carrito:detalle')
 
-    pedido = get_object_or_404(Pedido, id=pedido_id, pagado=False)
+    pedido = (
+        Pedido.objects
+        .select_for_update()
+        .filter(id=pedido_id, pagado=False, estado__in=estados.EN_CURSO)
+        .first()
+    )
+    if pedido is None:
+        # Pagado, o 'fallido' tras quedarse sin stock: ya no se puede volver
+        # a pagar, el próximo checkout crea un pedido nuevo
+        del request.session['checkout_pedido_id']
+        messages.error(request, 'Tu pedido anterior ya no se puede pagar. Revisa tu carrito y vuelve a intentarlo.')
+        return redirect('carrito:detalle')
 
     # Cliente asociado (puede venir de antes o ser None)
     cliente = pedido.cliente
@@ -237,7 +309,7 @@ def pedido_crear(request):
             factura.save()
 
         # 5) Cambiar estado del pedido
-        pedido.estado = 'pendiente_pago'
+        estados.aplicar(pedido, 'pendiente_pago', usuario=_usuario(request), origen='checkout')
         pedido.estado_pago = 'pendiente'
         pedido.pagado = False
         pedido.save()
@@ -276,42 +348,92 @@ def pedido_crear(request):
 #pedidos vendedor
 
 
+# Estados que ve el vendedor y pedidos por página en su panel
+ESTADOS_PANEL = ['pagado', 'enviado', 'entregado', 'fallido']
+PEDIDOS_PANEL_POR_PAGINA = 50
+# Máximo de clientes que puede traer una búsqueda por prefijo de email
+MAX_CLIENTES_BUSQUEDA = 500
+
+
+def _es_id(texto):
+    """Dígitos ASCII que caben en un id (bigint): '²' o '٣' no son ids."""
+    return texto.isascii() and texto.isdecimal() and int(texto) < 2 ** 63
+
+
+def ids_clientes_por_prefijo(prefijo):
+    """
+    Ids de los clientes cuyo email empieza con `prefijo` (sin importar
+    mayúsculas). En Postgres usa el índice LOWER(email) varchar_pattern_ops;
+    SQLite no usa índices para LIKE sobre expresiones, así que se agrega el
+    rango equivalente, que sí recorre el índice LOWER(email).
+    """
+    prefijo = prefijo.lower()
+    clientes = (
+        Cliente.objects
+        .annotate(email_normalizado=Lower('email'))
+        .filter(email_normalizado__startswith=prefijo)
+    )
+    if connection.vendor == 'sqlite':
+        clientes = clientes.filter(
+            email_normalizado__gte=prefijo,
+            email_normalizado__lt=prefijo + '\U0010ffff',
+        )
+    return list(clientes.values_list('id', flat=True)[:MAX_CLIENTES_BUSQUEDA])
+
+
 @login_required
 def panel_pedidos(request):
     """
     Panel para vendedor:
     Muestra solo pedidos en estados: pagado, enviado, entregado, fallido.
-    Permite filtrar por estado y buscar por ID o email cliente.
+    Permite filtrar por estado y buscar por ID exacto o por el comienzo del
+    email del cliente. Pagina por cursor sobre (creado, id).
     """
     if not request.user.is_staff:
         raise PermissionDenied()
 
-    estados_panel = ['pagado', 'enviado', 'entregado', 'fallido']
-
     estado = request.GET.get('estado', 'Todos')
     buscar = request.GET.get('q', '').strip()
 
-    pedidos = (
-        Pedido.objects
-        .filter(estado__in=estados_panel)
-        .select_related('cliente')
-        .order_by('-creado')
+    pedidos = Pedido.objects.filter(estado__in=ESTADOS_PANEL)
+
+    if _es_id(buscar.lstrip('#')):
+        # Número: búsqueda exacta por id (usa la clave primaria)
+        pedidos = pedidos.filter(id=int(buscar.lstrip('#')))
+    elif buscar:
+        pedidos = pedidos.filter(cliente_id__in=ids_clientes_por_prefijo(buscar))
+
+    # Contadores por estado (con la búsqueda aplicada): un solo GROUP BY
+    conteos = dict(
+        pedidos.order_by()
+        .values('estado')
+        .annotate(total=Count('id'))
+        .values_list('estado', 'total')
     )
 
-    if estado in estados_panel:
+    if estado in ESTADOS_PANEL:
         pedidos = pedidos.filter(estado=estado)
 
-    if buscar:
-        pedidos = pedidos.filter(
-            Q(id__icontains=buscar) |
-            Q(cliente__email__icontains=buscar)
-        )
+    pedidos, siguiente_cursor = paginar_keyset(
+        pedidos.select_related('cliente'),
+        request.GET.get('cursor'),
+        PEDIDOS_PANEL_POR_PAGINA,
+        campo='creado',
+    )
 
     context = {
         'pedidos': pedidos,
+        'siguiente_cursor': siguiente_cursor,
+        'es_primera_pagina': not request.GET.get('cursor'),
         'estado_actual': estado,
         'buscar': buscar,
-        'estados_panel': estados_panel,
+        'estados_panel': ESTADOS_PANEL,
+        'conteos': [
+            (valor, etiqueta, conteos.get(valor, 0))
+            for valor, etiqueta in Pedido.ESTADO_CHOICES
+            if valor in ESTADOS_PANEL
+        ],
+        'total_conteos': sum(conteos.values()),
     }
     return render(request, 'pedidos/panel_pedidos.html', context)
 
@@ -330,7 +452,7 @@ def panel_pedido_detalle(request, pedido_id):
 
     pedido = get_object_or_404(
         Pedido.objects
-        .prefetch_related('detalles__producto')
+        .prefetch_related('detalles__producto', 'transiciones__usuario')
         .select_related('cliente'),
         id=pedido_id
     )
@@ -354,7 +476,7 @@ def panel_pedido_detalle(request, pedido_id):
 def panel_pedido_cambiar_estado(request, pedido_id):
     """
     Cambia el estado de un pedido desde el panel.
-    Flujo permitido:
+    Flujo permitido (estados.TRANSICIONES_PANEL):
       - pagado   -> enviado, fallido
       - enviado  -> entregado, fallido
       - entregado / fallido -> sin cambios
@@ -365,18 +487,15 @@ def panel_pedido_cambiar_estado(request, pedido_id):
     pedido = get_object_or_404(Pedido, id=pedido_id)
     nuevo_estado = request.POST.get('estado')
 
-    transiciones_validas = {
-        'pagado': ['enviado', 'fallido'],
-        'enviado': ['entregado', 'fallido'],
-        'entregado': [],
-        'fallido': [],
-    }
-
-    if nuevo_estado not in transiciones_validas.get(pedido.estado, []):
+    try:
+        estados.cambiar_estado(
+            pedido, nuevo_estado,
+            usuario=request.user, origen='panel',
+            transiciones=estados.TRANSICIONES_PANEL,
+        )
+    except estados.TransicionInvalida:
         messages.error(request, 'Cambio de estado no permitido para este pedido.')
     else:
-        pedido.estado = nuevo_estado
-        pedido.save(update_fields=['estado'])
         messages.success(
             request,
             f'Pedido #{pedido.id} actualizado a {pedido.get_estado_display()}.'
@@ -386,6 +505,90 @@ def panel_pedido_cambiar_estado(request, pedido_id):
     return redirect(next_url)
 
 
+@require_POST
+@login_required
+def panel_pedidos_cambiar_estado(request):
+    """
+    Cambio de estado masivo desde el panel: los pedidos marcados, o todos
+    los del estado filtrado si viene `todos`. UPDATE condicional e INSERT en
+    la bitácora por lotes, no por pedido (ver estados.cambiar_estados).
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied()
+
+    nuevo_estado = request.POST.get('estado')
+    volver = request.POST.get('next') or reverse('pedidos:panel_pedidos')
+
+    if not estados.origenes(nuevo_estado, estados.TRANSICIONES_PANEL):
+        messages.error(request, 'Acción no válida.')
+        return redirect(volver)
+
+    todos_del_estado = request.POST.get('todos')
+    if todos_del_estado in estados.TRANSICIONES_PANEL:
+        pedidos = Pedido.objects.filter(estado=todos_del_estado)
+    else:
+        ids = [pk for pk in request.POST.getlist('pedidos') if _es_id(pk)]
+        if not ids:
+            messages.warning(request, 'No seleccionaste ningún pedido.')
+            return redirect(volver)
+        pedidos = Pedido.objects.filter(id__in=ids)
+
+    cambiados = estados.cambiar_estados(
+        pedidos, nuevo_estado,
+        usuario=request.user, origen='panel',
+        transiciones=estados.TRANSICIONES_PANEL,
+    )
+    etiqueta = dict(Pedido.ESTADO_CHOICES)[nuevo_estado]
+    if cambiados:
+        messages.success(request, f'{cambiados} pedido(s) pasaron a {etiqueta}.')
+    else:
+        messages.warning(request, f'Ninguno de los pedidos seleccionados puede pasar a {etiqueta}.')
+    return redirect(volver)
+
 
+def _fecha_get(request, nombre, defecto):
+    try:
+        return date.fromisoformat(request.GET.get(nombre) or '')
+    except ValueError:
+        return defecto
 
 
+@login_required
+def panel_pedidos_exportar(request):
+    """
+    Reporte de ventas para contabilidad (CSV o ?formato=xlsx) entre
+    ?desde= y ?hasta= (AAAA-MM-DD; por defecto el mes en curso). Sale en
+    streaming, sin cargar los pedidos en memoria (ver reportes.py).
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied()
+
+    hoy = timezone.localdate()
+    desde = _fecha_get(request, 'desde', hoy.replace(day=1))
+    hasta = _fecha_get(request, 'hasta', hoy)
+    if desde > hasta:
+        messages.error(request, 'La fecha "desde" no puede ser posterior a "hasta".')
+        return redirect('pedidos:panel_pedidos')
+
+    if request.GET.get('formato') == 'xlsx':
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            messages.error(request, 'Para exportar XLSX hay que instalar openpyxl.')
+            return redirect('pedidos:panel_pedidos')
+
+        temporal = tempfile.TemporaryFile()
+        reportes.guardar_xlsx(desde, hasta, temporal)
+        temporal.seek(0)
+        return FileResponse(
+            temporal, as_attachment=True,
+            filename=reportes.nombre_archivo(desde, hasta, 'xlsx'),
+        )
+
+    respuesta = StreamingHttpResponse(
+        reportes.csv_reporte(desde, hasta), content_type='text/csv; charset=utf-8',
+    )
+    respuesta['Content-Disposition'] = (
+        f'attachment; filename="{reportes.nombre_archivo(desde, hasta, "csv")}"'
+    )
+    return respuesta
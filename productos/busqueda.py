@@ -0,0 +1,156 @@
+"""
+Búsqueda de texto completo sobre Producto (nombre, descripcion, codigo_proveedor).
+
+Según el motor configurado en DATABASES:
+  - SQLite: tabla virtual FTS5 `productos_producto_fts` (rowid = id del producto),
+    que mantenemos nosotros al guardar productos (ver signals.py) y en las
+    cargas masivas.
+  - PostgreSQL: índice GIN sobre la expresión to_tsvector(...) de la tabla de
+    productos; Postgres lo mantiene solo, no hay que hacer nada al guardar.
+  - Otro motor: caemos al icontains de siempre.
+"""
+import re
+
+from django.db import connection
+
+from .models import Producto
+
+
+TABLA_FTS = 'productos_producto_fts'
+
+# Misma expresión que el índice GIN de la migración 0008 (si cambia acá,
+# hay que cambiarla allá, o Postgres no usa el índice)
+EXPRESION_TSVECTOR = (
+    "to_tsvector('spanish'::regconfig, "
+    "coalesce(nombre, '') || ' ' || coalesce(descripcion, '') || ' ' || "
+    "coalesce(codigo_proveedor, ''))"
+)
+
+RESULTADOS_POR_DEFECTO = 48
+
+# SQLite limita la cantidad de parámetros por consulta
+TAMANO_LOTE = 500
+
+
+def _consulta_fts5(texto):
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5 segura:
+    cada palabra entre comillas y como prefijo ("disco"* "ssd"*).
+    """
+    palabras = re.findall(r'\w+', texto, flags=re.UNICODE)
+    return ' '.join(f'"{p}"*' for p in palabras)
+
+
+def buscar_ids(texto, limite=RESULTADOS_POR_DEFECTO):
+    """
+    Devuelve los ids de productos activos que calzan con `texto`,
+    ordenados por relevancia (el más relevante primero).
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return []
+
+    if connection.vendor == 'sqlite':
+        consulta = _consulta_fts5(texto)
+        if not consulta:
+            return []
+        # bm25: menor = más relevante. Pesamos más nombre y código que descripción.
+        sql = (
+            f'SELECT p.id FROM {TABLA_FTS} '
+            f'JOIN productos_producto p ON p.id = {TABLA_FTS}.rowid '
+            f'WHERE {TABLA_FTS} MATCH %s AND p.activo '
+            f'ORDER BY bm25({TABLA_FTS}, 10.0, 1.0, 5.0) '
+            'LIMIT %s'
+        )
+        params = [consulta, limite]
+
+    elif connection.vendor == 'postgresql':
+        sql = (
+            f'SELECT id FROM productos_producto, '
+            "websearch_to_tsquery('spanish'::regconfig, %s) AS q "
+            f'WHERE {EXPRESION_TSVECTOR} @@ q AND activo '
+            f'ORDER BY ts_rank({EXPRESION_TSVECTOR}, q) DESC, id DESC '
+            'LIMIT %s'
+        )
+        params = [texto, limite]
+
+    else:
+        return list(
+            Producto.objects
+            .filter(activo=True, nombre__icontains=texto)
+            .values_list('id', flat=True)[:limite]
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def buscar_productos(texto, limite=RESULTADOS_POR_DEFECTO):
+    """
+    Igual que buscar_ids, pero devuelve los Producto (con categoría)
+    respetando el orden por relevancia.
+    """
+    ids = buscar_ids(texto, limite)
+    if not ids:
+        return []
+
+    productos = Producto.objects.select_related('categoria').in_bulk(ids)
+    return [productos[pk] for pk in ids if pk in productos]
+
+
+# ---------- Mantención del índice (solo SQLite) ----------
+
+def actualizar_indice(ids):
+    """
+    Re-indexa los productos indicados. Llamar después de guardar productos
+    por fuera de Producto.save() (bulk_create, bulk_update, update()).
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for i in range(0, len(ids), TAMANO_LOTE):
+            lote = ids[i:i + TAMANO_LOTE]
+            marcas = ', '.join(['%s'] * len(lote))
+            cursor.execute(
+                f'DELETE FROM {TABLA_FTS} WHERE rowid IN ({marcas})', lote
+            )
+            cursor.execute(
+                f'INSERT INTO {TABLA_FTS} (rowid, nombre, descripcion, codigo_proveedor) '
+                'SELECT id, nombre, descripcion, codigo_proveedor '
+                f'FROM productos_producto WHERE id IN ({marcas})',
+                lote,
+            )
+
+
+def quitar_del_indice(ids):
+    """
+    Saca productos borrados del índice. No es crítico: la búsqueda hace JOIN
+    con productos_producto, así que un id borrado nunca aparece en resultados.
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for i in range(0, len(ids), TAMANO_LOTE):
+            lote = ids[i:i + TAMANO_LOTE]
+            marcas = ', '.join(['%s'] * len(lote))
+            cursor.execute(
+                f'DELETE FROM {TABLA_FTS} WHERE rowid IN ({marcas})', lote
+            )
+
+
+def reconstruir_indice():
+    """Vacía y vuelve a llenar el índice completo (solo SQLite)."""
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_FTS}')
+        cursor.execute(
+            f'INSERT INTO {TABLA_FTS} (rowid, nombre, descripcion, codigo_proveedor) '
+            'SELECT id, nombre, descripcion, codigo_proveedor FROM productos_producto'
+        )
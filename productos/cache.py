@@ -0,0 +1,141 @@
+"""
+Cache de las páginas públicas del catálogo (inicio, listado y detalle).
+
+Solo se cachea el HTML del contenido central, nunca la página completa:
+base.html (carrito, mensajes, usuario) se sigue renderizando en cada request.
+El token CSRF de los formularios "Agregar al carrito" se guarda como un
+marcador y se reemplaza por el token real de quien pide la página.
+
+La disponibilidad (stock - reservado) cambia con cada checkout, así que
+tampoco queda fija: las tarjetas la marcan con los tags de
+templatetags/disponibilidad.py y al servir la página se completa con una
+sola consulta por todos los productos. El catálogo solo se invalida por
+stock cuando un producto se agota o vuelve a tener (invalidar_agotados):
+eso cambia el listado "en stock" y sus contadores.
+
+La clave incluye la versión del catálogo (VersionCatalogo, en la base de
+datos), así que invalidar = subir la versión con invalidar_catalogo(). Cada
+proceso recuerda la versión unos segundos para no consultarla en cada
+página. De la URL solo entran a la clave los parámetros que lee la vista:
+utm_*, fbclid y compañía no crean una entrada por visitante.
+"""
+import hashlib
+import re
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Producto, VersionCatalogo
+
+
+DURACION_CACHE = 60 * 15  # segundos
+
+MARCADOR_CSRF = 'G59-CSRF-TOKEN'
+
+# Marcadores de disponibilidad (los escribe templatetags/disponibilidad.py)
+MARCADOR_DISPONIBLE = '[[g59-disponible:{}]]'
+MARCADORES_STOCK = ('[[g59-con-stock:{}]]', '[[g59-sin-stock:{}]]', '[[g59-fin-stock:{}]]')
+_RE_DISPONIBLE = re.compile(r'\[\[g59-disponible:(\d+)\]\]')
+_RE_STOCK = re.compile(
+    r'\[\[g59-con-stock:(\d+)\]\](.*?)\[\[g59-sin-stock:\1\]\](.*?)\[\[g59-fin-stock:\1\]\]',
+    re.DOTALL,
+)
+
+# Cuánto puede tardar un worker en ver la versión que subió otro
+VIGENCIA_VERSION = 5  # segundos
+
+_version = {'valor': None, 'hasta': 0.0}
+
+
+def version_catalogo():
+    ahora = time.monotonic()
+    if _version['valor'] is None or ahora >= _version['hasta']:
+        version = (
+            VersionCatalogo.objects
+            .filter(pk=1)
+            .values_list('version', flat=True)
+            .first()
+        )
+        _version.update(valor=version or 0, hasta=ahora + VIGENCIA_VERSION)
+    return _version['valor']
+
+
+def invalidar_catalogo():
+    """
+    Sube la versión del catálogo. Llamar DESPUÉS de escribir los cambios.
+    Si hay una transacción abierta, espera al commit: así no bloqueamos la
+    fila de la versión durante una sync larga y nadie cachea datos viejos
+    con la versión nueva.
+    """
+    transaction.on_commit(_subir_version)
+
+
+def invalidar_agotados(antes, despues):
+    """
+    Invalida el catálogo si algún producto se agotó o volvió a tener stock.
+    `antes` y `despues` son {producto_id: disponible}; llamar dentro de la
+    transacción que hace el cambio (invalidar_catalogo espera al commit).
+    """
+    if any((disponible > 0) != (despues[pk] > 0) for pk, disponible in antes.items()):
+        invalidar_catalogo()
+
+
+def _subir_version():
+    actualizados = VersionCatalogo.objects.filter(pk=1).update(version=F('version') + 1)
+    if not actualizados:
+        VersionCatalogo.objects.get_or_create(pk=1)
+    # Este proceso ve su propio cambio al tiro; los demás, al vencer su copia
+    _version['valor'] = None
+
+
+def renderizar_cacheado(request, template_name, obtener_contexto, parametros=()):
+    """
+    Devuelve (titulo, html) del contenido de la página.
+
+    `obtener_contexto` solo se llama si no está en cache (ahí van las
+    consultas al ORM). El contexto puede traer 'titulo' para el <title>.
+    `parametros` son los de request.GET que usa la vista; los demás no
+    cambian el contenido y no entran a la clave.
+    """
+    usados = urlencode(sorted(
+        (nombre, request.GET[nombre]) for nombre in parametros if nombre in request.GET
+    ))
+    crudo = f'{version_catalogo()}|{request.path}|{usados}'
+    clave = 'catalogo:' + hashlib.md5(crudo.encode()).hexdigest()
+
+    guardado = cache.get(clave)
+    if guardado is None:
+        contexto = obtener_contexto()
+        # Pisamos el token de los context processors por el marcador
+        contexto['csrf_token'] = MARCADOR_CSRF
+        contexto['disponibilidad_en_vivo'] = True
+        html = render_to_string(template_name, contexto, request=request)
+        guardado = (str(contexto.get('titulo', '')), html)
+        cache.set(clave, guardado, DURACION_CACHE)
+
+    titulo, html = guardado
+    html = html.replace(MARCADOR_CSRF, get_token(request))
+    return titulo, mark_safe(_completar_disponibilidad(html))
+
+
+def _completar_disponibilidad(html):
+    """Cambia los marcadores de disponibilidad por la de ahora, con una consulta."""
+    ids = {int(pk) for pk in _RE_DISPONIBLE.findall(html)}
+    ids.update(int(pk) for pk, _, _ in _RE_STOCK.findall(html))
+    if not ids:
+        return html
+
+    disponibles = {
+        pk: max(stock - reservado, 0)
+        for pk, stock, reservado in Producto.objects.filter(pk__in=ids).values_list('pk', 'stock', 'reservado')
+    }
+    html = _RE_STOCK.sub(
+        lambda m: m[2] if disponibles.get(int(m[1]), 0) > 0 else m[3], html,
+    )
+    return _RE_DISPONIBLE.sub(lambda m: str(disponibles.get(int(m[1]), 0)), html)
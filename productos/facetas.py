@@ -0,0 +1,131 @@
+"""
+Filtros combinables del catálogo (facetas) y sus contadores.
+
+Todos los contadores salen de UNA sola consulta agrupada por categoría con
+COUNT condicionales, en vez de un COUNT por cada valor de cada faceta.
+Cada faceta cuenta aplicando los demás filtros activos, pero no el suyo
+(así "Hasta $20.000 (12)" dice cuántos verías si eliges esa banda).
+"""
+from django.db.models import Count, F, Q
+
+from .models import Producto
+
+
+ID_MAXIMO = 2 ** 63 - 1
+
+# (clave para la URL, etiqueta, precio mínimo, precio máximo) — mínimo incluido, máximo excluido
+BANDAS_PRECIO = [
+    ('hasta-20000', 'Hasta $20.000', None, 20_000),
+    ('20000-50000', '$20.000 a $50.000', 20_000, 50_000),
+    ('50000-100000', '$50.000 a $100.000', 50_000, 100_000),
+    ('100000-250000', '$100.000 a $250.000', 100_000, 250_000),
+    ('desde-250000', 'Más de $250.000', 250_000, None),
+]
+
+
+def leer_filtros(params):
+    """Lee los filtros desde request.GET, ignorando valores inválidos."""
+    categoria = params.get('categoria') or ''
+    # Solo dígitos ASCII y dentro del rango de un id (bigint positivo)
+    categoria = int(categoria) if categoria.isascii() and categoria.isdecimal() else 0
+    if not 0 < categoria <= ID_MAXIMO:
+        categoria = None
+
+    precio = params.get('precio')
+    if precio not in {clave for clave, *_ in BANDAS_PRECIO}:
+        precio = None
+
+    return {
+        'categoria': categoria,
+        'precio': precio,
+        'en_stock': params.get('en_stock') == '1',
+        'destacado': params.get('destacado') == '1',
+    }
+
+
+def _q_banda(clave):
+    for clave_banda, _, minimo, maximo in BANDAS_PRECIO:
+        if clave_banda == clave:
+            q = Q()
+            if minimo is not None:
+                q &= Q(precio__gte=minimo)
+            if maximo is not None:
+                q &= Q(precio__lt=maximo)
+            return q
+    return Q()
+
+
+def _condiciones(filtros, excepto=()):
+    """Q con todos los filtros activos salvo los de las facetas en `excepto`."""
+    q = Q()
+    if filtros['categoria'] and 'categoria' not in excepto:
+        q &= Q(categoria_id=filtros['categoria'])
+    if filtros['precio'] and 'precio' not in excepto:
+        q &= _q_banda(filtros['precio'])
+    if filtros['en_stock'] and 'en_stock' not in excepto:
+        q &= Q(stock__gt=F('reservado'))
+    if filtros['destacado'] and 'destacado' not in excepto:
+        q &= Q(destacado=True)
+    return q
+
+
+def filtrar(queryset, filtros):
+    return queryset.filter(_condiciones(filtros))
+
+
+def contar_facetas(filtros):
+    """
+    Devuelve:
+      {
+        'categorias': [{'id', 'nombre', 'total'}, ...],
+        'precios': [{'clave', 'etiqueta', 'total'}, ...],
+        'en_stock': n,
+        'destacados': n,
+      }
+    """
+    # La categoría es la columna de agrupación: las demás facetas se cuentan
+    # por categoría sin el filtro de categoría, y abajo se suma solo la fila
+    # de la categoría elegida (o todas, si no hay).
+    agregados = {
+        'total': Count('id', filter=_condiciones(filtros, {'categoria'})),
+        'en_stock': Count(
+            'id', filter=_condiciones(filtros, {'categoria', 'en_stock'}) & Q(stock__gt=F('reservado'))
+        ),
+        'destacados': Count(
+            'id', filter=_condiciones(filtros, {'categoria', 'destacado'}) & Q(destacado=True)
+        ),
+    }
+    for clave, *_ in BANDAS_PRECIO:
+        agregados[f'precio_{clave}'] = Count(
+            'id', filter=_condiciones(filtros, {'categoria', 'precio'}) & _q_banda(clave)
+        )
+
+    filas = list(
+        Producto.objects
+        .filter(activo=True)
+        .values('categoria_id', 'categoria__nombre')
+        .annotate(**agregados)
+        .order_by('categoria__nombre')
+    )
+
+    elegidas = [
+        f for f in filas
+        if not filtros['categoria'] or f['categoria_id'] == filtros['categoria']
+    ]
+
+    return {
+        'categorias': [
+            {'id': f['categoria_id'], 'nombre': f['categoria__nombre'], 'total': f['total']}
+            for f in filas
+        ],
+        'precios': [
+            {
+                'clave': clave,
+                'etiqueta': etiqueta,
+                'total': sum(f[f'precio_{clave}'] for f in elegidas),
+            }
+            for clave, etiqueta, *_ in BANDAS_PRECIO
+        ],
+        'en_stock': sum(f['en_stock'] for f in elegidas),
+        'destacados': sum(f['destacados'] for f in elegidas),
+    }
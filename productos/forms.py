@@ -5,3 +5,17 @@ class ProductoForm(forms.ModelForm):
     class Meta:
         model = Producto
         fields = ['nombre', 'descripcion', 'precio', 'stock', 'imagen', 'categoria', 'destacado']
+
+
+class ImportarProductosForm(forms.Form):
+    archivo = forms.FileField(
+        label='Archivo CSV o XLSX',
+        help_text='Columnas: codigo_proveedor, nombre, descripcion, precio, precio_costo, '
+                  'stock, categoria, destacado, activo, url_proveedor.',
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('El archivo debe ser .csv o .xlsx.')
+        return archivo
@@ -0,0 +1,120 @@
+"""
+Variantes redimensionadas de Producto.imagen (grilla, detalle, zoom).
+
+Cada variante se guarda en WebP y en JPEG (respaldo para navegadores sin
+WebP) con un nombre que incluye el hash del archivo original:
+
+    productos/derivados/<hash>-<variante>.<webp|jpg>
+
+Como el nombre depende del contenido, una imagen nueva nunca pisa a una
+vieja en el cache del navegador/CDN, y generar dos veces lo mismo no hace
+nada. Lo que se generó queda anotado en Producto.imagen_variantes:
+
+    {'origen': 'productos/foto.jpg', 'hash': '...',
+     'tamanos': {'grid': [400, 300], 'detalle': [800, 600], 'zoom': [1600, 1200]}}
+
+Las genera `manage.py generar_imagenes` (cron), nunca el request que guarda
+el producto: hasta entonces las páginas muestran la imagen original.
+"""
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+
+# Ancho máximo de cada variante (nunca agrandamos el original)
+VARIANTES = {
+    'grid': 400,
+    'detalle': 800,
+    'zoom': 1600,
+}
+
+FORMATOS = [
+    ('webp', 'WEBP', {'quality': 80, 'method': 6}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+
+CARPETA = 'productos/derivados'
+
+
+def ruta_variante(hash_imagen, variante, extension):
+    return f'{CARPETA}/{hash_imagen}-{variante}.{extension}'
+
+
+def variantes_al_dia(producto):
+    """True si las variantes guardadas corresponden a la imagen actual."""
+    variantes = producto.imagen_variantes or {}
+    return bool(producto.imagen) and variantes.get('origen') == producto.imagen.name
+
+
+def generar_variantes(nombre_imagen):
+    """
+    Genera (si no existen) todas las variantes del archivo `nombre_imagen`
+    del storage y devuelve el dict para Producto.imagen_variantes.
+
+    No toca la base de datos: se puede correr en otro proceso.
+    """
+    with default_storage.open(nombre_imagen, 'rb') as archivo:
+        datos = archivo.read()
+
+    hash_imagen = hashlib.sha256(datos).hexdigest()[:16]
+
+    original = Image.open(BytesIO(datos))
+    original = ImageOps.exif_transpose(original)
+
+    tamanos = {}
+    for variante, ancho_max in VARIANTES.items():
+        imagen = original
+        if original.width > ancho_max:
+            alto = round(original.height * ancho_max / original.width)
+            imagen = original.resize((ancho_max, alto), Image.LANCZOS)
+
+        tamanos[variante] = [imagen.width, imagen.height]
+
+        for extension, formato, opciones in FORMATOS:
+            ruta = ruta_variante(hash_imagen, variante, extension)
+            if default_storage.exists(ruta):
+                continue
+
+            salida = imagen
+            if formato == 'JPEG' and salida.mode != 'RGB':
+                # JPEG no tiene transparencia: fondo blanco
+                fondo = Image.new('RGB', salida.size, 'white')
+                if salida.mode in ('RGBA', 'LA', 'P'):
+                    salida = salida.convert('RGBA')
+                    fondo.paste(salida, mask=salida.getchannel('A'))
+                else:
+                    fondo.paste(salida.convert('RGB'))
+                salida = fondo
+
+            buffer = BytesIO()
+            salida.save(buffer, formato, **opciones)
+            default_storage.save(ruta, ContentFile(buffer.getvalue()))
+
+    return {
+        'origen': nombre_imagen,
+        'hash': hash_imagen,
+        'tamanos': tamanos,
+    }
+
+
+def guardar_variantes(resultados):
+    """
+    Anota en la base [(producto_id, nombre_imagen, variantes), ...]. Si a un
+    producto le cambiaron la imagen mientras se generaban, no se le escriben
+    (quedan para la próxima pasada). Devuelve cuántos se guardaron.
+    """
+    from .models import Producto
+
+    guardados = 0
+    with transaction.atomic():
+        for producto_id, nombre_imagen, variantes in resultados:
+            guardados += (
+                Producto.objects
+                .filter(pk=producto_id, imagen=nombre_imagen)
+                .update(imagen_variantes=variantes)
+            )
+    return guardados
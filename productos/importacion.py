@@ -0,0 +1,318 @@
+"""
+Importación y exportación masiva del catálogo (CSV / XLSX).
+
+Columnas (las mismas en ambos sentidos, así un export se puede re-importar):
+
+    codigo_proveedor, nombre, descripcion, precio, precio_costo, stock,
+    categoria, destacado, activo, url_proveedor
+
+La clave es codigo_proveedor: si existe se actualiza, si no se crea.
+Las filas se leen de a una (nunca se carga el archivo entero) y se aplican
+en lotes con bulk_create / bulk_update. Las filas inválidas no detienen la
+importación: quedan en el reporte de errores con su número de fila.
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+from django.db.backends.base.operations import BaseDatabaseOperations
+
+from common.exportacion import csv_streaming
+
+from .busqueda import actualizar_indice
+from .cache import invalidar_catalogo
+from .models import Producto, Categoria
+
+
+COLUMNAS = [
+    'codigo_proveedor', 'nombre', 'descripcion', 'precio', 'precio_costo',
+    'stock', 'categoria', 'destacado', 'activo', 'url_proveedor',
+]
+
+# Campos de Producto que escribe la importación (para bulk_update)
+CAMPOS = [
+    'nombre', 'descripcion', 'precio', 'precio_costo', 'stock',
+    'categoria', 'destacado', 'activo', 'url_proveedor',
+]
+
+TAMANO_LOTE = 1_000
+
+VERDADEROS = {'1', 'si', 'sí', 'true', 'verdadero', 'x'}
+FALSOS = {'0', 'no', 'false', 'falso', ''}
+
+
+class ErrorFila(Exception):
+    pass
+
+
+# ---------- Lectura ----------
+
+def leer_filas(archivo, nombre_archivo):
+    """
+    Genera dicts {columna: valor} a partir de un archivo subido,
+    fila por fila. Soporta .csv (UTF-8, con o sin BOM) y .xlsx.
+    """
+    if nombre_archivo.lower().endswith('.xlsx'):
+        yield from _leer_xlsx(archivo)
+    else:
+        yield from _leer_csv(archivo)
+
+
+def _leer_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    for fila in csv.DictReader(texto, dialect=dialecto):
+        yield {(k or '').strip().lower(): v for k, v in fila.items()}
+
+
+def _leer_xlsx(archivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErrorFila('Para importar XLSX hay que instalar openpyxl. Usa CSV mientras tanto.')
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = [str(c or '').strip().lower() for c in next(filas, [])]
+        for valores in filas:
+            yield dict(zip(encabezado, valores))
+    finally:
+        libro.close()
+
+
+# ---------- Validación ----------
+
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+def _numero(valor, campo):
+    texto = _texto(valor).replace('$', '').replace(' ', '')
+    try:
+        numero = Decimal(texto)
+    except InvalidOperation:
+        raise ErrorFila(f'{campo} no es un número: "{texto}"')
+    # Decimal acepta NaN e Infinity
+    if not numero.is_finite():
+        raise ErrorFila(f'{campo} no es un número: "{texto}"')
+    if numero < 0:
+        raise ErrorFila(f'{campo} no puede ser negativo')
+    return numero
+
+
+def _decimal(valor, campo):
+    """Número no negativo que cabe en el DecimalField `campo` de Producto."""
+    numero = _numero(valor, campo)
+    modelo = Producto._meta.get_field(campo)
+    try:
+        numero = numero.quantize(Decimal(1).scaleb(-modelo.decimal_places), ROUND_HALF_UP)
+    except InvalidOperation:
+        numero = None
+    if numero is None or numero >= 10 ** (modelo.max_digits - modelo.decimal_places):
+        raise ErrorFila(f'{campo} es demasiado grande')
+    return numero
+
+
+def _entero(valor, campo):
+    """Entero no negativo dentro del rango del campo `campo` de Producto."""
+    numero = _numero(valor, campo)
+    if numero != numero.to_integral_value():
+        raise ErrorFila(f'{campo} debe ser un número entero')
+    # Los rangos estándar (los de Postgres); SQLite no tiene límite y
+    # guardaría lo que fuera
+    _, maximo = BaseDatabaseOperations.integer_field_ranges[
+        Producto._meta.get_field(campo).get_internal_type()
+    ]
+    if numero > maximo:
+        raise ErrorFila(f'{campo} es demasiado grande (máximo {maximo})')
+    return int(numero)
+
+
+def _largo(texto, campo, modelo=Producto, columna=None):
+    """El texto, si cabe en el CharField `campo` de `modelo`."""
+    maximo = modelo._meta.get_field(campo).max_length
+    if len(texto) > maximo:
+        raise ErrorFila(f'{columna or campo} tiene más de {maximo} caracteres')
+    return texto
+
+
+def _url(texto, campo):
+    """La URL (o None si viene vacía), validada como la del URLField."""
+    if not texto:
+        return None
+    try:
+        URLValidator()(_largo(texto, campo))
+    except ValidationError:
+        raise ErrorFila(f'{campo} no es una URL válida: "{texto}"')
+    return texto
+
+
+def _booleano(valor, campo, por_defecto):
+    if valor is None:
+        return por_defecto
+    if isinstance(valor, bool):
+        return valor
+    texto = _texto(valor).lower()
+    if texto in VERDADEROS:
+        return True
+    if texto in FALSOS:
+        return por_defecto if texto == '' else False
+    raise ErrorFila(f'{campo} debe ser sí/no: "{texto}"')
+
+
+def validar_fila(fila):
+    """
+    Devuelve (codigo_proveedor, dict de campos) o lanza ErrorFila. La
+    categoría queda por nombre en 'categoria': las nuevas se crean al
+    aplicar el lote, solo para filas que pasaron la validación.
+    """
+    codigo = _largo(_texto(fila.get('codigo_proveedor')), 'codigo_proveedor')
+    if not codigo:
+        raise ErrorFila('falta codigo_proveedor')
+
+    nombre = _largo(_texto(fila.get('nombre')), 'nombre')
+    if not nombre:
+        raise ErrorFila('falta nombre')
+
+    nombre_categoria = _texto(fila.get('categoria'))
+    if not nombre_categoria:
+        raise ErrorFila('falta categoria')
+    _largo(nombre_categoria, 'nombre', Categoria, columna='categoria')
+
+    return codigo, {
+        'nombre': nombre,
+        'descripcion': _texto(fila.get('descripcion')),
+        'precio': _decimal(fila.get('precio'), 'precio'),
+        'precio_costo': _decimal(fila.get('precio_costo') or 0, 'precio_costo'),
+        'stock': _entero(fila.get('stock') or 0, 'stock'),
+        'categoria': nombre_categoria,
+        'destacado': _booleano(fila.get('destacado'), 'destacado', False),
+        'activo': _booleano(fila.get('activo'), 'activo', True),
+        'url_proveedor': _url(_texto(fila.get('url_proveedor')), 'url_proveedor'),
+    }
+
+
+# ---------- Aplicación en lotes ----------
+
+def importar_productos(filas):
+    """
+    Valida y aplica las filas. Devuelve un resumen:
+      {'creados', 'actualizados', 'sin_cambios', 'errores': [(fila, mensaje), ...]}
+    """
+    resumen = {'creados': 0, 'actualizados': 0, 'sin_cambios': 0, 'errores': []}
+    # {nombre en minúsculas: Categoria}; las nuevas se agregan al crearlas
+    categorias = {c.nombre.lower(): c for c in Categoria.objects.all()}
+
+    lote = {}
+    try:
+        # La fila 1 es el encabezado
+        for numero, fila in enumerate(filas, start=2):
+            try:
+                codigo, datos = validar_fila(fila)
+            except ErrorFila as e:
+                resumen['errores'].append((numero, str(e)))
+                continue
+
+            lote[codigo] = datos  # si un código se repite, gana la última fila
+            if len(lote) >= TAMANO_LOTE:
+                _aplicar_lote(lote, categorias, resumen)
+                lote = {}
+    except ErrorFila as e:
+        # Error del archivo completo (p. ej. falta openpyxl)
+        resumen['errores'].append((0, str(e)))
+    except (UnicodeDecodeError, csv.Error):
+        resumen['errores'].append((0, 'No se pudo leer el archivo: usa CSV en UTF-8 o XLSX.'))
+
+    if lote:
+        _aplicar_lote(lote, categorias, resumen)
+
+    if resumen['creados'] or resumen['actualizados']:
+        invalidar_catalogo()
+
+    return resumen
+
+
+def _resolver_categorias(lote, categorias):
+    """Cambia el nombre de la categoría de cada fila por su id, creando las nuevas en un INSERT."""
+    nuevas = {}
+    for datos in lote.values():
+        clave = datos['categoria'].lower()
+        if clave not in categorias:
+            nuevas.setdefault(clave, Categoria(nombre=datos['categoria']))
+    for categoria in Categoria.objects.bulk_create(nuevas.values()):
+        categorias[categoria.nombre.lower()] = categoria
+    for datos in lote.values():
+        datos['categoria_id'] = categorias[datos.pop('categoria').lower()].id
+
+
+@transaction.atomic
+def _aplicar_lote(lote, categorias, resumen):
+    _resolver_categorias(lote, categorias)
+    existentes = Producto.objects.in_bulk(list(lote), field_name='codigo_proveedor')
+
+    nuevos = []
+    cambiados = []
+    for codigo, datos in lote.items():
+        producto = existentes.get(codigo)
+        if producto is None:
+            nuevos.append(Producto(codigo_proveedor=codigo, **datos))
+            continue
+
+        # Solo escribimos las filas que realmente cambian
+        if all(getattr(producto, campo) == valor for campo, valor in datos.items()):
+            resumen['sin_cambios'] += 1
+            continue
+
+        for campo, valor in datos.items():
+            setattr(producto, campo, valor)
+        cambiados.append(producto)
+
+    if nuevos:
+        Producto.objects.bulk_create(nuevos, batch_size=500)
+    if cambiados:
+        Producto.objects.bulk_update(cambiados, CAMPOS, batch_size=500)
+
+    resumen['creados'] += len(nuevos)
+    resumen['actualizados'] += len(cambiados)
+
+    # bulk_create/bulk_update no disparan post_save: re-indexamos a mano
+    if nuevos or cambiados:
+        actualizar_indice(
+            Producto.objects
+            .filter(codigo_proveedor__in=[p.codigo_proveedor for p in nuevos + cambiados])
+            .values_list('id', flat=True)
+        )
+
+
+# ---------- Exportación ----------
+
+def filas_exportacion(chunk_size=2_000):
+    """Genera las filas del catálogo completo, sin cargarlo en memoria."""
+    yield COLUMNAS
+    consulta = (
+        Producto.objects
+        .order_by('id')
+        .values_list(
+            'codigo_proveedor', 'nombre', 'descripcion', 'precio', 'precio_costo',
+            'stock', 'categoria__nombre', 'destacado', 'activo', 'url_proveedor',
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    for fila in consulta:
+        fila = list(fila)
+        fila[7] = 'si' if fila[7] else 'no'
+        fila[8] = 'si' if fila[8] else 'no'
+        yield fila
+
+
+def csv_exportacion():
+    return csv_streaming(filas_exportacion())
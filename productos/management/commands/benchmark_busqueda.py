@@ -0,0 +1,98 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from productos.busqueda import buscar_ids, actualizar_indice
+from productos.models import Producto, Categoria
+
+
+PALABRAS = [
+    'disco', 'duro', 'externo', 'ssd', 'nvme', 'procesador', 'memoria', 'ram',
+    'notebook', 'monitor', 'teclado', 'mouse', 'gamer', 'usb', 'tipo', 'portatil',
+    'kingston', 'seagate', 'western', 'samsung', 'intel', 'amd', 'ryzen', 'core',
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la búsqueda indexada contra el LIKE '%x%' de siempre sobre un "
+        "catálogo sintético. Todo corre dentro de una transacción que se "
+        "deshace al final: no deja datos en la base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=100_000)
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.correr(options['productos'], options['repeticiones'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def correr(self, cantidad, repeticiones):
+        rnd = random.Random(59)
+        # Modelos/SKU: vocabulario grande, como un catálogo real
+        modelos = [f'modelo{n}' for n in range(5_000)]
+        vocabulario = PALABRAS + modelos
+        categoria = Categoria.objects.create(nombre='Benchmark')
+
+        self.stdout.write(f"Creando {cantidad} productos sintéticos...")
+        ultimo_id = Producto.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        Producto.objects.bulk_create(
+            (
+                Producto(
+                    nombre=' '.join(rnd.choices(PALABRAS, k=3) + rnd.choices(modelos, k=1)),
+                    descripcion=' '.join(rnd.choices(vocabulario, k=30)),
+                    precio=rnd.randint(1_000, 900_000),
+                    categoria=categoria,
+                    codigo_proveedor=f'BENCH-{i}',
+                )
+                for i in range(cantidad)
+            ),
+            batch_size=2_000,
+        )
+        actualizar_indice(
+            Producto.objects.filter(id__gt=ultimo_id).values_list('id', flat=True)
+        )
+
+        # Palabras genéricas: aparecen en casi todo el catálogo
+        comunes = [rnd.choice(PALABRAS) for _ in range(repeticiones)]
+        # Modelos: lo que la gente realmente busca
+        especificos = [rnd.choice(modelos) for _ in range(repeticiones)]
+        # Términos que no existen: el peor caso del LIKE, recorre la tabla entera
+        inexistentes = [f'noexiste{i}' for i in range(repeticiones)]
+
+        for etiqueta, terminos in (
+            ('genéricos', comunes),
+            ('de modelo', especificos),
+            ('inexistentes', inexistentes),
+        ):
+            ms_like = self.medir(terminos, self.buscar_like)
+            ms_indice = self.medir(terminos, buscar_ids)
+            self.stdout.write(f"Términos {etiqueta}:")
+            self.stdout.write(f"  LIKE '%x%' (nombre + descripcion): {ms_like:.1f} ms/búsqueda")
+            self.stdout.write(f"  Índice de texto completo:           {ms_indice:.1f} ms/búsqueda")
+
+    def medir(self, terminos, buscar):
+        inicio = time.perf_counter()
+        for termino in terminos:
+            buscar(termino)
+        return (time.perf_counter() - inicio) * 1000 / len(terminos)
+
+    def buscar_like(self, termino):
+        # Lo mismo que hace hoy search_fields = ('nombre', 'descripcion')
+        return list(
+            Producto.objects
+            .filter(Q(nombre__icontains=termino) | Q(descripcion__icontains=termino))
+            .values_list('id', flat=True)[:48]
+        )
@@ -0,0 +1,93 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from productos.cache import invalidar_catalogo
+from productos.imagenes import generar_variantes, guardar_variantes
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las variantes de imagen (grid, detalle, zoom en WebP + JPEG) "
+        "de los productos que todavía no las tienen, en varios procesos. "
+        "Pensado para cron, p. ej. cada 5 minutos: guardar un producto no las genera."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos', type=int, default=os.cpu_count() or 1,
+            help="Procesos en paralelo (por defecto, uno por CPU).",
+        )
+        parser.add_argument(
+            '--todos', action='store_true',
+            help="Regenerar también las que ya están al día.",
+        )
+        parser.add_argument(
+            '--lote', type=int, default=200,
+            help="Cada cuántos productos se guarda el resultado en la base.",
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+
+        pendientes = [
+            (pk, nombre)
+            for pk, nombre, variantes in (
+                Producto.objects
+                .exclude(imagen='')
+                .exclude(imagen__isnull=True)
+                .values_list('id', 'imagen', 'imagen_variantes')
+                .iterator(chunk_size=2_000)
+            )
+            if options['todos'] or (variantes or {}).get('origen') != nombre
+        ]
+
+        if not pendientes:
+            self.stdout.write("Todas las imágenes ya tienen sus variantes.")
+            return
+
+        self.stdout.write(
+            f"Generando variantes para {len(pendientes)} producto(s) "
+            f"con {options['procesos']} proceso(s)..."
+        )
+
+        # Los procesos hijos no deben heredar conexiones abiertas a la base
+        connections.close_all()
+
+        generados = 0
+        errores = 0
+        por_guardar = []
+        nombres = dict(pendientes)
+
+        with ProcessPoolExecutor(max_workers=options['procesos']) as pool:
+            futuros = {
+                pool.submit(generar_variantes, nombre): pk
+                for pk, nombre in pendientes
+            }
+            for futuro in as_completed(futuros):
+                pk = futuros[futuro]
+                try:
+                    variantes = futuro.result()
+                except Exception as e:
+                    errores += 1
+                    self.stderr.write(self.style.ERROR(f"Producto {pk}: {e}"))
+                    continue
+
+                por_guardar.append((pk, nombres[pk], variantes))
+                if len(por_guardar) >= options['lote']:
+                    generados += guardar_variantes(por_guardar)
+                    por_guardar = []
+
+        generados += guardar_variantes(por_guardar)
+
+        if generados:
+            invalidar_catalogo()
+
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo: {generados} generado(s), {errores} con error, en {segundos:.1f} s."
+        ))
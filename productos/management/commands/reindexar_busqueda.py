@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from productos.busqueda import reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de productos (FTS5 en SQLite)."
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(
+                "En PostgreSQL el índice GIN se mantiene solo; no hay nada que hacer."
+            )
+            return
+
+        with transaction.atomic():
+            reconstruir_indice()
+
+        self.stdout.write(self.style.SUCCESS("Índice de búsqueda reconstruido."))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0006_producto_activo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['activo', '-creado_en', '-id'], name='producto_activo_creado_idx'),
+        ),
+    ]
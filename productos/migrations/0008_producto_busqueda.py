@@ -0,0 +1,50 @@
+from django.db import migrations
+
+
+# Debe coincidir con productos.busqueda.EXPRESION_TSVECTOR
+EXPRESION_TSVECTOR = (
+    "to_tsvector('spanish'::regconfig, "
+    "coalesce(nombre, '') || ' ' || coalesce(descripcion, '') || ' ' || "
+    "coalesce(codigo_proveedor, ''))"
+)
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS productos_producto_fts USING fts5('
+            'nombre, descripcion, codigo_proveedor, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            'INSERT INTO productos_producto_fts (rowid, nombre, descripcion, codigo_proveedor) '
+            'SELECT id, nombre, descripcion, codigo_proveedor FROM productos_producto'
+        )
+
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS producto_busqueda_gin '
+            f'ON productos_producto USING gin (({EXPRESION_TSVECTOR}))'
+        )
+
+
+def borrar_indice_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS productos_producto_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS producto_busqueda_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0007_producto_indice_catalogo'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_busqueda, borrar_indice_busqueda),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:12
+
+from django.db import migrations, models
+
+
+def crear_fila_version(apps, schema_editor):
+    VersionCatalogo = apps.get_model('productos', 'VersionCatalogo')
+    VersionCatalogo.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0008_producto_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(crear_fila_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0009_versioncatalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0010_producto_imagen_variantes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='reservado',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
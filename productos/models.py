@@ -15,6 +15,8 @@ class Producto(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     precio_costo = models.DecimalField(max_digits=10, decimal_places=0, default=0)
     stock = models.PositiveIntegerField(default=0)
+    # Unidades apartadas por checkouts en curso (ver pedidos/reservas.py)
+    reservado = models.PositiveIntegerField(default=0, editable=False)
     imagen = models.ImageField(upload_to='productos/', blank=True, null=True)
     categoria = models.ForeignKey(
         Categoria,
@@ -31,7 +33,34 @@ class Producto(models.Model):
     )
     url_proveedor = models.URLField(blank=True, null=True)
     activo = models.BooleanField(default=True)
+    # Variantes redimensionadas de `imagen` (ver productos/imagenes.py)
+    imagen_variantes = models.JSONField(default=dict, blank=True, editable=False)
 
+    class Meta:
+        indexes = [
+            # Catálogo público: filtra activo y pagina por (creado_en, id)
+            models.Index(
+                fields=['activo', '-creado_en', '-id'],
+                name='producto_activo_creado_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.nombre
+
+    @property
+    def disponible(self):
+        """Stock que todavía se puede vender (descontando reservas)."""
+        return max(self.stock - self.reservado, 0)
+
+
+class VersionCatalogo(models.Model):
+    """
+    Una sola fila (pk=1) con un número que sube cada vez que cambia algo del
+    catálogo. Las páginas cacheadas usan este número en la clave, así que al
+    subirlo quedan invalidadas en todos los workers a la vez.
+    """
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self) -> str:
+        return f'Catálogo v{self.version}'
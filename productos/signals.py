@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .busqueda import actualizar_indice
+from .cache import invalidar_catalogo
+from .models import Producto, Categoria
+
+
+@receiver(post_save, sender=Producto)
+def producto_guardado(sender, instance, **kwargs):
+    # Cubre el panel, el admin y los update_or_create de las syncs de proveedores
+    actualizar_indice([instance.pk])
+    # Las variantes de una imagen nueva no se generan acá: el guardado no
+    # espera a Pillow, las genera `manage.py generar_imagenes` (cron)
+    invalidar_catalogo()
+
+
+# Ojo: no escuchamos post_delete de Producto a propósito. Un receptor ahí
+# obliga a Django a cargar cada producto antes de un borrado masivo; las
+# vistas que borran productos llaman a invalidar_catalogo() ellas mismas.
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def categoria_cambiada(sender, instance, **kwargs):
+    invalidar_catalogo()
@@ -0,0 +1,54 @@
+from django import template
+
+from productos.cache import MARCADOR_DISPONIBLE, MARCADORES_STOCK
+
+register = template.Library()
+
+
+def _en_vivo(context):
+    # Lo activa renderizar_cacheado: la página se guarda y la disponibilidad
+    # se completa al servirla (ver productos/cache.py)
+    return context.get('disponibilidad_en_vivo', False)
+
+
+@register.simple_tag(takes_context=True)
+def disponible(context, producto):
+    """Unidades que se pueden comprar ahora."""
+    if _en_vivo(context):
+        return MARCADOR_DISPONIBLE.format(producto.pk)
+    return producto.disponible
+
+
+@register.tag
+def con_stock(parser, token):
+    """
+    {% con_stock producto %} ... {% sin_stock %} ... {% endcon_stock %}
+
+    Como un {% if producto.disponible > 0 %}, pero en una página cacheada
+    guarda las dos ramas y se elige al servirla.
+    """
+    try:
+        _, producto = token.split_contents()
+    except ValueError:
+        raise template.TemplateSyntaxError('con_stock recibe un producto')
+    con = parser.parse(('sin_stock', 'endcon_stock'))
+    sin = template.NodeList()
+    if parser.next_token().contents == 'sin_stock':
+        sin = parser.parse(('endcon_stock',))
+        parser.delete_first_token()
+    return ConStockNode(parser.compile_filter(producto), con, sin)
+
+
+class ConStockNode(template.Node):
+    def __init__(self, producto, con, sin):
+        self.producto = producto
+        self.con = con
+        self.sin = sin
+
+    def render(self, context):
+        producto = self.producto.resolve(context)
+        if not _en_vivo(context):
+            rama = self.con if producto.disponible > 0 else self.sin
+            return rama.render(context)
+        con, sin, fin = (marcador.format(producto.pk) for marcador in MARCADORES_STOCK)
+        return f'{con}{self.con.render(context)}{sin}{self.sin.render(context)}{fin}'
@@ -0,0 +1,62 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from productos.imagenes import VARIANTES, ruta_variante, variantes_al_dia
+
+register = template.Library()
+
+
+def _srcset(hash_imagen, tamanos, extension):
+    candidatos = []
+    anchos_vistos = set()
+    for variante in VARIANTES:
+        if variante not in tamanos:
+            continue
+        ancho = tamanos[variante][0]
+        # Con originales chicos varias variantes quedan del mismo ancho
+        if ancho in anchos_vistos:
+            continue
+        anchos_vistos.add(ancho)
+        url = default_storage.url(ruta_variante(hash_imagen, variante, extension))
+        candidatos.append(f'{url} {ancho}w')
+    return ', '.join(candidatos)
+
+
+@register.simple_tag
+def imagen_producto(producto, variante='grid', sizes='100vw', clase=''):
+    """
+    <picture> con srcset en WebP + respaldo JPEG para la imagen del producto:
+
+        {% imagen_producto producto 'grid' sizes='(min-width: 640px) 25vw, 100vw' clase='h-40 w-full' %}
+
+    `variante` define el src por defecto y el width/height del <img>
+    (evita saltos de layout). Si todavía no hay variantes generadas,
+    usa la imagen original como antes.
+    """
+    if not producto.imagen:
+        return ''
+
+    if not variantes_al_dia(producto):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">',
+            producto.imagen.url, producto.nombre, clase,
+        )
+
+    datos = producto.imagen_variantes
+    hash_imagen = datos['hash']
+    tamanos = datos['tamanos']
+    ancho, alto = tamanos[variante]
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" '
+        'alt="{}" class="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        _srcset(hash_imagen, tamanos, 'webp'), sizes,
+        default_storage.url(ruta_variante(hash_imagen, variante, 'jpg')),
+        _srcset(hash_imagen, tamanos, 'jpg'), sizes,
+        ancho, alto,
+        producto.nombre, clase,
+    )
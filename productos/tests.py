@@ -1,3 +1,164 @@
-from django.test import TestCase
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from pedidos.confirmacion import confirmar_pedido
+from pedidos.models import Pedido, PedidoDetalle
+from pedidos.reservas import liberar, reservar
+from PIL import Image
+
+from . import cache as cache_catalogo
+from .imagenes import generar_variantes, guardar_variantes
+from .importacion import importar_productos
+from .models import Categoria, Producto
+
+
+class ImportacionTests(TestCase):
+    def fila(self, codigo, **extra):
+        return {'codigo_proveedor': codigo, 'nombre': f'Producto {codigo}', 'precio': '1990',
+                'stock': '3', 'categoria': 'Poleras', **extra}
+
+    def test_filas_invalidas_no_dejan_categorias_ni_truncan(self):
+        resumen = importar_productos([
+            self.fila('A1', categoria='Nueva'),
+            self.fila('A2', categoria='Nueva'),
+            self.fila('B1', categoria='Basura', precio='abc'),
+            self.fila('B2', categoria='Otra basura', nombre='x' * 201),
+            self.fila('B3', categoria='Más basura', url_proveedor='no es una url'),
+            self.fila('A3', url_proveedor='https://proveedor.cl/p/A3'),
+        ])
+
+        self.assertEqual(resumen['creados'], 3)
+        self.assertEqual([fila for fila, _ in resumen['errores']], [4, 5, 6])
+        self.assertIn('nombre tiene más de 200', resumen['errores'][1][1])
+        self.assertIn('url_proveedor no es una URL', resumen['errores'][2][1])
+        self.assertEqual(sorted(Categoria.objects.values_list('nombre', flat=True)), ['Nueva', 'Poleras'])
+        self.assertEqual(
+            dict(Producto.objects.values_list('codigo_proveedor', 'categoria__nombre')),
+            {'A1': 'Nueva', 'A2': 'Nueva', 'A3': 'Poleras'},
+        )
+
+
+class PanelEliminarTests(TestCase):
+    def test_borra_los_libres_y_deja_los_que_tienen_pedidos(self):
+        categoria = Categoria.objects.create(nombre='Poleras')
+        productos = [
+            Producto.objects.create(nombre=f'Polera {i}', precio=1_000, stock=1, categoria=categoria)
+            for i in range(3)
+        ]
+        pedido = Pedido.objects.create(total=1_000)
+        PedidoDetalle.objects.create(pedido=pedido, producto=productos[0], cantidad=1, precio_unitario=1_000)
+        self.client.force_login(User.objects.create_user('vendedor', is_staff=True))
+
+        respuesta = self.client.post(reverse('productos:panel_productos'), {
+            'accion': 'eliminar', 'productos': [p.pk for p in productos],
+        }, follow=True)
+
+        self.assertEqual(list(Producto.objects.values_list('pk', flat=True)), [productos[0].pk])
+        self.assertContains(respuesta, 'Se eliminaron 2 producto(s).')
+
+
+class CacheCatalogoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_catalogo._version['valor'] = None
+        categoria = Categoria.objects.create(nombre='Poleras')
+        self.producto = Producto.objects.create(nombre='Polera', precio=1_000, stock=1, categoria=categoria)
+
+    def version(self):
+        return cache_catalogo.VersionCatalogo.objects.filter(pk=1).values_list('version', flat=True).first()
+
+    def test_parametros_de_campana_comparten_la_entrada(self):
+        url = reverse('productos:index')
+        self.client.get(url, {'en_stock': '1', 'precio': 'hasta-20000'})
+
+        # Mismos filtros en otro orden, con parámetros de campaña: del cache,
+        # sin consultar la versión; solo la disponibilidad en vivo
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(
+                url, {'utm_source': 'ig', 'precio': 'hasta-20000', 'fbclid': 'x1', 'en_stock': '1'},
+            )
+        self.assertContains(respuesta, 'Polera')
+
+    def test_invalidar_se_ve_al_tiro_en_el_mismo_proceso(self):
+        url = reverse('productos:index')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.update(nombre='Polera nueva')
+            cache_catalogo.invalidar_catalogo()
+
+        self.assertContains(self.client.get(url), 'Polera nueva')
+
+    def test_la_disponibilidad_se_ve_en_vivo(self):
+        Producto.objects.filter(pk=self.producto.pk).update(stock=5)
+        url = reverse('productos:detalle', args=[self.producto.pk])
+        self.assertContains(self.client.get(url), 'max="5"')
+        version = self.version()
+
+        pedidos = [Pedido.objects.create(total=1_000) for _ in range(2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            reservar(pedidos[0], [(self.producto.pk, 2)])
+        # Misma entrada del cache, con la disponibilidad de ahora
+        self.assertContains(self.client.get(url), 'max="3"')
+        self.assertEqual(self.version(), version)
+
+        # Se agota: ahí sí cambia el catálogo ("en stock", contadores)
+        with self.captureOnCommitCallbacks(execute=True):
+            reservar(pedidos[1], [(self.producto.pk, 3)])
+        respuesta = self.client.get(url)
+        self.assertContains(respuesta, 'Sin stock')
+        self.assertNotContains(respuesta, 'Agregar al carrito')
+        self.assertNotEqual(self.version(), version)
+
+        # Pagar lo reservado no cambia la disponibilidad: no invalida
+        version = self.version()
+        PedidoDetalle.objects.create(pedido=pedidos[0], producto=self.producto, cantidad=2, precio_unitario=1_000)
+        with self.captureOnCommitCallbacks(execute=True):
+            confirmar_pedido(pedidos[0].pk, 'prueba')
+        self.assertEqual(self.version(), version)
+
+        # Vuelve a haber stock
+        with self.captureOnCommitCallbacks(execute=True):
+            liberar(pedidos[1].pk)
+        self.assertContains(self.client.get(url), 'max="3"')
+        self.assertNotEqual(self.version(), version)
+
+
+class ImagenesTests(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.producto = Producto.objects.create(
+            nombre='Polera', precio=1_000, categoria=Categoria.objects.create(nombre='Poleras'),
+        )
+
+    def subir(self, nombre, color):
+        datos = BytesIO()
+        Image.new('RGB', (1200, 900), color).save(datos, 'JPEG')
+        self.producto.imagen.save(nombre, ContentFile(datos.getvalue()))
+        return self.producto.imagen.name
+
+    def test_guardar_no_genera_variantes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subir('polera.jpg', 'red')
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.imagen_variantes, {})
+
+    def test_no_anota_variantes_de_una_imagen_reemplazada(self):
+        vieja = self.subir('vieja.jpg', 'red')
+        variantes = generar_variantes(vieja)
+        # Mientras se generaban, subieron otra imagen
+        nueva = self.subir('nueva.jpg', 'blue')
+
+        self.assertEqual(guardar_variantes([(self.producto.pk, vieja, variantes)]), 0)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.imagen_variantes, {})
+
+        self.assertEqual(guardar_variantes([(self.producto.pk, nueva, generar_variantes(nueva))]), 1)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.imagen_variantes['origen'], nueva)
+        self.assertEqual(self.producto.imagen_variantes['tamanos']['grid'], [400, 300])
@@ -1,42 +1,105 @@
+import tempfile
+
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Producto, Categoria
-from .forms import ProductoForm
+from .models import Producto
+from .forms import ProductoForm, ImportarProductosForm
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden, HttpResponse
+from django.http import HttpResponseForbidden, HttpResponse, StreamingHttpResponse, FileResponse
 
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
 from django.db.models.deletion import ProtectedError
 from django.contrib import messages
 
+from common.paginacion import paginar_keyset
+from pedidos.models import PedidoDetalle
+from .busqueda import buscar_productos, quitar_del_indice
+from .facetas import leer_filtros, filtrar, contar_facetas
+from .cache import renderizar_cacheado, invalidar_catalogo
+from .importacion import leer_filas, importar_productos, filas_exportacion, csv_exportacion
+
+
+# Productos por página en el catálogo público
+PRODUCTOS_POR_PAGINA = 24
+
+# Parámetros de la URL que cambian el listado (los de leer_filtros + el cursor)
+PARAMETROS_INDEX = ('categoria', 'precio', 'en_stock', 'destacado', 'cursor')
+
 
 def inicio(request):
-    # Hasta 8 productos marcados como destacados
-    productos_destacados = Producto.objects.filter(destacado=True)[:8]
-    return render(request, 'inicio.html', {
-        'productos_destacados': productos_destacados,
-    })
+    def contexto():
+        # Hasta 8 productos marcados como destacados
+        productos_destacados = (
+            Producto.objects
+            .filter(destacado=True)
+            .select_related('categoria')[:8]
+        )
+        return {'productos_destacados': productos_destacados}
+
+    _, contenido = renderizar_cacheado(request, '_inicio.html', contexto)
+    return render(request, 'inicio.html', {'contenido': contenido})
 
 
 
 def index(request):
-    categoria_id = request.GET.get('categoria')
+    def contexto():
+        filtros = leer_filtros(request.GET)
+
+        # Solo las columnas que usa la grilla + la categoría en el mismo JOIN
+        productos = (
+            Producto.objects
+            .filter(activo=True)
+            .select_related('categoria')
+            .only(
+                'id', 'nombre', 'precio', 'stock', 'reservado', 'imagen', 'imagen_variantes', 'creado_en',
+                'categoria', 'categoria__nombre',
+            )
+        )
+        productos = filtrar(productos, filtros)
+
+        productos, siguiente_cursor = paginar_keyset(
+            productos,
+            request.GET.get('cursor'),
+            PRODUCTOS_POR_PAGINA,
+        )
+
+        return {
+            'productos': productos,
+            'siguiente_cursor': siguiente_cursor,
+            'es_primera_pagina': not request.GET.get('cursor'),
+            'facetas': contar_facetas(filtros),
+            'filtros': filtros,
+            'categoria_seleccionada': filtros['categoria'],
+        }
 
-    productos = Producto.objects.filter(activo=True)
-    if categoria_id:
-        productos = productos.filter(categoria_id=categoria_id)
+    _, contenido = renderizar_cacheado(request, 'productos/_index.html', contexto, PARAMETROS_INDEX)
+    return render(request, 'productos/index.html', {'contenido': contenido})
 
-    categorias = Categoria.objects.all()
 
-    contexto = {
+def buscar(request):
+    q = request.GET.get('q', '').strip()
+
+    # Resultados ordenados por relevancia (FTS5 en SQLite, tsvector en Postgres)
+    productos = buscar_productos(q) if q else []
+
+    return render(request, 'productos/buscar.html', {
         'productos': productos,
-        'categorias': categorias,
-        'categoria_seleccionada': int(categoria_id) if categoria_id else None,
-    }
-    return render(request, 'productos/index.html', contexto)
+        'q': q,
+    })
 
 
 def detalle(request, producto_id):
-    producto = get_object_or_404(Producto, id=producto_id)
-    return render(request, 'productos/detalle.html', {'producto': producto})
+    def contexto():
+        producto = get_object_or_404(
+            Producto.objects.select_related('categoria'), id=producto_id
+        )
+        return {'producto': producto, 'titulo': producto.nombre}
+
+    titulo, contenido = renderizar_cacheado(request, 'productos/_detalle.html', contexto)
+    return render(request, 'productos/detalle.html', {
+        'titulo': titulo,
+        'contenido': contenido,
+    })
 
 # ---------- PANEL DE PRODUCTOS (solo staff) ----------
 
@@ -57,32 +120,82 @@ def panel_productos(request):
         productos_sel = Producto.objects.filter(pk__in=ids)
 
         if accion == 'eliminar':
-            eliminados = 0
-            protegidos = []
+            desactivar_protegidos = request.POST.get('desactivar_protegidos') == '1'
+
+            # Una sola consulta para saber cuáles tienen pedidos (PROTECT)
+            protegidos = set(
+                PedidoDetalle.objects
+                .filter(producto_id__in=productos_sel.values('pk'))
+                .values_list('producto_id', flat=True)
+                .distinct()
+            )
+            libres = list(
+                productos_sel.exclude(pk__in=protegidos).values_list('pk', flat=True)
+            )
 
-            for p in productos_sel:
+            eliminados = 0
+            if libres:
+                # El NOT EXISTS repite la protección en la misma consulta por si
+                # alguien compró uno de estos recién; si igual se cuela uno, el
+                # PROTECT de PedidoDetalle lanza ProtectedError y no se borra nada.
+                borrables = (
+                    Producto.objects
+                    .filter(pk__in=libres)
+                    .exclude(Exists(PedidoDetalle.objects.filter(producto=OuterRef('pk'))))
+                )
                 try:
-                    p.delete()
-                    eliminados += 1
-                except ProtectedError:
-                    protegidos.append(p.nombre)
+                    with transaction.atomic():
+                        _, por_modelo = borrables.delete()
+                        eliminados = por_modelo.get(Producto._meta.label, 0)
+                        quitar_del_indice(libres)
+                except IntegrityError:
+                    eliminados = 0
+                    messages.error(
+                        request,
+                        'No se pudo eliminar la selección porque algún producto tiene '
+                        'datos asociados. Vuelve a intentarlo.'
+                    )
 
             if eliminados:
+                invalidar_catalogo()
                 messages.success(request, f'Se eliminaron {eliminados} producto(s).')
 
-            if protegidos:
+            if protegidos and desactivar_protegidos:
+                desactivados = (
+                    Producto.objects
+                    .filter(pk__in=protegidos, activo=True)
+                    .update(activo=False)
+                )
+                invalidar_catalogo()
+                messages.info(
+                    request,
+                    f'{len(protegidos)} producto(s) tienen pedidos asociados y no se pueden '
+                    f'eliminar; se desactivaron {desactivados}.'
+                )
+            elif protegidos:
+                nombres = list(
+                    Producto.objects
+                    .filter(pk__in=protegidos)
+                    .order_by('nombre')
+                    .values_list('nombre', flat=True)[:10]
+                )
+                resto = len(protegidos) - len(nombres)
                 messages.error(
                     request,
                     'No se pudieron eliminar estos productos porque tienen pedidos asociados: '
-                    + ', '.join(protegidos)
+                    + ', '.join(nombres)
+                    + (f' y {resto} más' if resto > 0 else '')
+                    + '. Puedes marcar "desactivar los que tengan pedidos".'
                 )
 
         elif accion == 'activar':
             actualizados = productos_sel.update(activo=True)
+            invalidar_catalogo()
             messages.success(request, f'Se activaron {actualizados} producto(s).')
 
         elif accion == 'desactivar':
             actualizados = productos_sel.update(activo=False)
+            invalidar_catalogo()
             messages.success(request, f'Se desactivaron {actualizados} producto(s).')
 
         else:
@@ -102,6 +215,68 @@ def panel_productos(request):
 
 
 
+# Cuántos errores mostramos en pantalla después de importar
+ERRORES_VISIBLES = 500
+
+
+@login_required
+def panel_importar(request):
+    """Importación masiva de productos desde CSV/XLSX (clave: codigo_proveedor)."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+
+    resumen = None
+    if request.method == 'POST':
+        form = ImportarProductosForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            resumen = importar_productos(leer_filas(archivo, archivo.name))
+            messages.success(
+                request,
+                f"Importación terminada: {resumen['creados']} creado(s), "
+                f"{resumen['actualizados']} actualizado(s), "
+                f"{resumen['sin_cambios']} sin cambios, "
+                f"{len(resumen['errores'])} fila(s) con error."
+            )
+    else:
+        form = ImportarProductosForm()
+
+    return render(request, 'productos/panel_importar.html', {
+        'form': form,
+        'resumen': resumen,
+        'errores': resumen['errores'][:ERRORES_VISIBLES] if resumen else [],
+        'errores_ocultos': max(len(resumen['errores']) - ERRORES_VISIBLES, 0) if resumen else 0,
+    })
+
+
+@login_required
+def panel_exportar(request):
+    """Descarga el catálogo completo sin cargarlo en memoria (CSV o ?formato=xlsx)."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+
+    if request.GET.get('formato') == 'xlsx':
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            messages.error(request, 'Para exportar XLSX hay que instalar openpyxl.')
+            return redirect('productos:panel_productos')
+
+        # write_only va escribiendo a disco fila por fila
+        libro = Workbook(write_only=True)
+        hoja = libro.create_sheet('productos')
+        for fila in filas_exportacion():
+            hoja.append(fila)
+        temporal = tempfile.TemporaryFile()
+        libro.save(temporal)
+        temporal.seek(0)
+        return FileResponse(temporal, as_attachment=True, filename='productos.xlsx')
+
+    respuesta = StreamingHttpResponse(csv_exportacion(), content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = 'attachment; filename="productos.csv"'
+    return respuesta
+
+
 @login_required
 def formulario(request):
     """Crear nuevo producto desde el panel."""
@@ -154,6 +329,7 @@ def eliminar_producto(request, producto_id):
     if request.method == 'POST':
         try:
             producto.delete()
+            invalidar_catalogo()
             messages.success(request, f'El producto "{producto.nombre}" fue eliminado.')
         except ProtectedError:
             messages.error(
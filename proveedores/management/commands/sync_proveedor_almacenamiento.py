@@ -14,6 +14,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
 from productos.models import Producto, Categoria
+from productos.cache import invalidar_catalogo
 
 
 class Command(BaseCommand):
@@ -111,6 +112,9 @@ class Command(BaseCommand):
             except Exception:
                 break
 
+        # Invalida el cache del catálogo cuando se confirme la transacción de la sync
+        invalidar_catalogo()
+
     # -------------------------------------------------------------------------
 
     def process_product_element(self, elemento, categoria):
@@ -7,6 +7,7 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 
 from productos.models import Producto, Categoria
+from productos.cache import invalidar_catalogo
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -225,6 +226,9 @@ class Command(BaseCommand):
                 self.stdout.write("  No se encontró botón de página siguiente. Fin.")
                 break
 
+        # Invalida el cache del catálogo cuando se confirme la transacción de la sync
+        invalidar_catalogo()
+
     # ------------------------------------------------------------------ #
     #  EXTRACCIÓN DE UN PRODUCTO
     # ------------------------------------------------------------------ #
@@ -10,8 +10,8 @@ from django.contrib.auth.tokens import default_token_generator
 from .forms import RegistroForm, PerfilForm, PerfilFacturacionForm
 from .models import Perfil, PerfilFacturacion
 
-from common.email_utils import send_email
-from django.db import IntegrityError
+from common.email_utils import queue_email
+from django.db import IntegrityError, transaction
 
 from django.urls import reverse  # <-- arriba del archivo
 
@@ -20,38 +20,41 @@ def registrarse(request):
         form = RegistroForm(request.POST)
         if form.is_valid():
             try:
-                user = form.save(commit=False)
-                user.is_active = False
-                user.save()
+                # La cuenta y su correo de activación se guardan juntos: el
+                # correo lo envía `manage.py enviar_correos`, no esta vista
+                with transaction.atomic():
+                    user = form.save(commit=False)
+                    user.is_active = False
+                    user.save()
+
+                    uid = urlsafe_base64_encode(force_bytes(user.pk))
+                    token = default_token_generator.make_token(user)
+
+                    domain = request.get_host()
+                    protocol = 'https' if request.is_secure() else 'http'
+
+                    # 🔴 ANTES: armabas la URL a mano con /usuarios/...
+                    # activation_link = f"{protocol}://{domain}/usuarios/activar/{uid}/{token}/"
+
+                    # ✅ AHORA: dejamos que Django construya el path correcto
+                    path_activacion = reverse(
+                        'activar_cuenta',
+                        kwargs={'uidb64': uid, 'token': token}
+                    )
+                    activation_link = f"{protocol}://{domain}{path_activacion}"
+
+                    queue_email(
+                        to_email=user.email,
+                        subject='Activa tu cuenta en G59 Store',
+                        template_name='emails/activar_cuenta.html',
+                        context={
+                            'user': user,
+                            'activation_link': activation_link,
+                        },
+                    )
             except IntegrityError:
                 form.add_error('email', 'Ya existe una cuenta con este correo.')
             else:
-                uid = urlsafe_base64_encode(force_bytes(user.pk))
-                token = default_token_generator.make_token(user)
-
-                domain = request.get_host()
-                protocol = 'https' if request.is_secure() else 'http'
-
-                # 🔴 ANTES: armabas la URL a mano con /usuarios/...
-                # activation_link = f"{protocol}://{domain}/usuarios/activar/{uid}/{token}/"
-
-                # ✅ AHORA: dejamos que Django construya el path correcto
-                path_activacion = reverse(
-                    'activar_cuenta',
-                    kwargs={'uidb64': uid, 'token': token}
-                )
-                activation_link = f"{protocol}://{domain}{path_activacion}"
-
-                send_email(
-                    to_email=user.email,
-                    subject='Activa tu cuenta en G59 Store',
-                    template_name='emails/activar_cuenta.html',
-                    context={
-                        'user': user,
-                        'activation_link': activation_link,
-                    },
-                )
-
                 messages.success(request, 'Cuenta creada. Revisa tu correo para activarla.')
                 return redirect('login')
     else: